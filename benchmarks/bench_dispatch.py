@@ -0,0 +1,126 @@
+"""
+bench_dispatch.py
+-----------------
+Per-message cost of the reader's dispatch on mixed traffic: the previous
+is_* if/elif chain vs the tag -> (decoder, handler) table. Messages are
+already-parsed dicts, so this isolates dispatch + decode. Run from the repo
+root:
+
+    python benchmarks/bench_dispatch.py [messages]
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.device.pico_serial import PicoSerialClient
+from src.device.protocol import HelloInfo, Heartbeat, KeyEvent, EncoderEvent, ButtonEvent
+
+
+# The message checks the chain used (no longer part of protocol.py)
+def is_hello(msg) -> bool:
+    return msg.get("t") == "hello"
+
+
+def is_hb(msg) -> bool:
+    return msg.get("t") == "hb"
+
+
+def is_key(msg) -> bool:
+    return msg.get("t") == "key" and "k" in msg and "edge" in msg
+
+
+def is_enc(msg) -> bool:
+    return msg.get("t") == "enc" and "id" in msg and "d" in msg
+
+
+def is_btn(msg) -> bool:
+    return msg.get("t") == "btn" and "id" in msg and "edge" in msg
+
+
+def make_msgs(n: int):
+    pattern = [
+        {"t": "enc", "id": 0, "d": 1, "pos": 1, "ts": 0.1},
+        {"t": "enc", "id": 0, "d": -1, "pos": 0, "ts": 0.2},
+        {"t": "key", "k": 2, "edge": "down", "ts": 0.3},
+        {"t": "key", "k": 2, "edge": "up", "ts": 0.4},
+        {"t": "btn", "id": 0, "edge": "down", "ts": 0.5},
+        {"t": "btn", "id": 0, "edge": "up", "ts": 0.6},
+        {"t": "hb", "ts": 0.7},
+        {"t": "enc", "id": 0, "d": 1, "pos": 1, "ts": 0.8},
+    ]
+    return [pattern[i % len(pattern)] for i in range(n)]
+
+
+def chain_dispatch(client: PicoSerialClient, msg) -> None:
+    """The reader's dispatch before the registry (kept here for comparison)."""
+    if is_hello(msg):
+        info = HelloInfo.from_msg(msg)
+        client.key_state = [False] * max(0, info.keys)
+        client.hello.emit(info)
+    elif is_hb(msg):
+        client.heartbeat.emit(Heartbeat.from_msg(msg).ts)
+    elif is_key(msg):
+        ev = KeyEvent.from_msg(msg)
+        if 0 <= ev.k < len(client.key_state):
+            client.key_state[ev.k] = (ev.edge == "down")
+        client.key_event.emit(ev)
+    elif is_enc(msg):
+        client.encoder_event.emit(EncoderEvent.from_msg(msg))
+    elif is_btn(msg):
+        client.button_event.emit(ButtonEvent.from_msg(msg))
+
+
+def chain_route(msg, sink) -> None:
+    if is_hello(msg):
+        sink(HelloInfo.from_msg(msg))
+    elif is_hb(msg):
+        sink(Heartbeat.from_msg(msg))
+    elif is_key(msg):
+        sink(KeyEvent.from_msg(msg))
+    elif is_enc(msg):
+        sink(EncoderEvent.from_msg(msg))
+    elif is_btn(msg):
+        sink(ButtonEvent.from_msg(msg))
+
+
+def bench(name, fn, msgs, repeat: int = 5):
+    dt = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for m in msgs:
+            fn(m)
+        dt = min(dt, time.perf_counter() - t0)
+    ns = dt / len(msgs) * 1e9
+    print(f"{name:<14} {ns:>8.0f} ns/msg")
+    return ns
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    msgs = make_msgs(n)
+    client = PicoSerialClient()
+    client.key_state.resize(12)
+
+    print("with signal emission:")
+    a = bench("  chain", lambda m: chain_dispatch(client, m), msgs)
+    b = bench("  table", client._handle_msg, msgs)
+    print(f"  table saves {a - b:.0f} ns/msg ({(a - b) / a:.0%})")
+
+    # Same comparison with the Qt emit stubbed out, i.e. routing + decode only.
+    def sink(ev):
+        pass
+
+    routed = PicoSerialClient()
+    for t in (HelloInfo, Heartbeat, KeyEvent, EncoderEvent, ButtonEvent):
+        routed.register_handler(t, sink)
+
+    print("routing + decode only:")
+    a = bench("  chain", lambda m: chain_route(m, sink), msgs)
+    b = bench("  table", routed._handle_msg, msgs)
+    print(f"  table saves {a - b:.0f} ns/msg ({(a - b) / a:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+bench_gui_load.py
+-----------------
+Keypress-to-injection latency with and without a busy GUI thread, for the two
+dispatch paths:
+
+    gui     events reach the dispatcher through the batched Qt signal, i.e.
+            on the GUI thread (how MainWindow used to fire macros)
+    reader  InputDispatcher runs inline on the serial reader thread
+
+"Busy" blocks the Qt event loop for busy_ms out of every period_ms, the way a
+long repaint, resize or drag does. The busy loop is pure Python and holds the
+GIL (real Qt painting mostly doesn't), so the reader path still sees some
+GIL switch-interval delay: a worst case. Uses the PTY virtual Pico (Linux/macOS)
+and the null injection backend, so the numbers are pure dispatch + queue.
+Run from the repo root:
+
+    python benchmarks/bench_gui_load.py [seconds] [busy_ms] [period_ms]
+"""
+
+import sys
+import os
+import logging
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from PyQt6.QtCore import QCoreApplication, QTimer
+
+import src.utils.macro_executor as mx
+from src.device.pico_serial import PicoSerialClient
+from src.device.simulator import SimConfig, VirtualPico
+from src.utils.injection_backends import NullBackend
+from src.utils.injection_queue import InjectionQueue
+from src.utils.input_dispatcher import InputDispatcher
+from src.utils.latency import LATENCY
+from src.utils.profile_store import ProfileStore
+
+BINDINGS = {
+    "K1": "macro_copy", "K2": "macro_paste", "K3": "macro_cut",
+    "_rate_limits": {"*": {"policy": "none"}},
+}
+
+
+def run(app, path: str, seconds: float, busy_ms: float, period_ms: int):
+    sim = VirtualPico(SimConfig(hb_interval_s=0.5, key_rate_hz=100, enc_rate_hz=0, seed=1))
+    port = sim.start()
+
+    queue = InjectionQueue(max_depth=256)
+    queue.start()
+    store = ProfileStore()
+    store.load({"bench": BINDINGS})
+    dispatcher = InputDispatcher(queue, store)
+    dispatcher.select("bench")
+    client = PicoSerialClient(batch=True)
+    if path == "reader":
+        client.set_inline_handler(dispatcher.handle)
+    else:
+        client.events_batch.connect(lambda events: [dispatcher.handle(ev) for ev in events])
+
+    def busy():
+        end = time.monotonic() + busy_ms / 1000.0
+        while time.monotonic() < end:
+            pass
+
+    load = QTimer()
+    load.timeout.connect(busy)
+    if busy_ms > 0:
+        load.start(period_ms)
+
+    LATENCY.reset()
+    client.start(port)
+    sim.send_hello()
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec()
+
+    load.stop()
+    client.stop()
+    sim.stop()
+    time.sleep(0.05)
+    queue.stop()
+
+    h = LATENCY.histogram("end_to_end").summary()
+    label = f"{path:<6} gui busy {busy_ms:>3.0f}/{period_ms} ms"
+    print(f"{label:<26} fired={dispatcher.fired:>5}  end-to-end p50={h['p50_ms']:6.2f}ms  "
+          f"p99={h['p99_ms']:6.2f}ms  max={h['max_ms']:6.2f}ms")
+    return h
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    busy_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 40.0
+    period_ms = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    logging.disable(logging.INFO)  # one log line per macro would dominate
+    mx.set_backend(NullBackend(record=False))
+    app = QCoreApplication(sys.argv[:1])
+
+    results = {}
+    for path in ("gui", "reader"):
+        for busy in (0.0, busy_ms):
+            results[path, busy] = run(app, path, seconds, busy, period_ms)
+
+    print()
+    for path in ("gui", "reader"):
+        idle, loaded = results[path, 0.0], results[path, busy_ms]
+        print(f"{path:<6} p99 under GUI load: {loaded['p99_ms'] / max(idle['p99_ms'], 1e-3):5.1f}x idle")
+
+
+if __name__ == "__main__":
+    main()
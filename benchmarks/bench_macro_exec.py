@@ -0,0 +1,131 @@
+"""
+bench_macro_exec.py
+-------------------
+Per-fire overhead of execute_macro_by_id: the previous path that re-parsed
+macro tokens through _to_key on every fire vs walking the precompiled
+MacroPlan. Both inject into nothing (counting stubs / the null backend) and
+INFO logging is off, so this measures only the executor's own work. Run from the
+repo root:
+
+    python benchmarks/bench_macro_exec.py [fires]
+"""
+
+import sys
+import os
+import logging
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import src.utils.macro_executor as mx
+from src.utils.injection_backends import NullBackend
+
+
+class CountingController:
+    def __init__(self):
+        self.calls = 0
+
+    def press(self, _k):
+        self.calls += 1
+
+    def release(self, _k):
+        self.calls += 1
+
+    def scroll(self, _dx, _dy):
+        self.calls += 1
+
+
+_keyboard = CountingController()
+_mouse = CountingController()
+
+
+def legacy_execute(macro_id: str) -> None:
+    """execute_macro_by_id before plans (kept here for comparison)."""
+    macro_id = (macro_id or "").strip()
+    if not macro_id:
+        return
+    macro = mx._MACRO_INDEX.get(macro_id)
+    if not macro:
+        return
+    if isinstance(macro, list):
+        macro = {"type": "hotkey", "keys": macro}
+    mtype = str(macro.get("type", "hotkey")).strip().lower()
+    try:
+        if mtype == "mouse_scroll":
+            dy = int(macro.get("dy", 0))
+            if dy == 0:
+                return
+            _mouse.scroll(0, dy)
+            mx.logger.info(f"Executed macro: {macro_id} -> mouse_scroll dy={dy}")
+            return
+        if mtype == "media":
+            token = str(macro.get("key", "")).strip()
+            k = mx._to_key(token)
+            _keyboard.press(k)
+            _keyboard.release(k)
+            mx.logger.info(f"Executed macro: {macro_id} -> media {token}")
+            return
+        seq = macro.get("keys", [])
+        keys = [mx._to_key(t) for t in seq]
+        keys = [k for k in keys if k is not None]
+        modifiers = mx._MODIFIERS
+        held = []
+        for k in keys[:-1]:
+            if k in modifiers:
+                _keyboard.press(k)
+                held.append(k)
+            else:
+                _keyboard.press(k)
+                _keyboard.release(k)
+        final = keys[-1]
+        _keyboard.press(final)
+        _keyboard.release(final)
+        mx.logger.info(f"Executed macro: {macro_id} -> {seq}")
+    finally:
+        if mtype == "hotkey":
+            for k in reversed(locals().get("held", [])):
+                _keyboard.release(k)
+
+
+def bench(name, fn, ids, repeat: int = 5):
+    dt = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for mid in ids:
+            fn(mid)
+        dt = min(dt, time.perf_counter() - t0)
+    ns = dt / len(ids) * 1e9
+    print(f"{name:<10} {ns:>8.0f} ns/fire")
+    return ns
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    backend = NullBackend(record=False)
+    mx.set_backend(backend)
+    mx.logger.setLevel(logging.WARNING)
+
+    # The legacy path only knew hotkey / media / mouse_scroll macros
+    valid = [
+        mid for mid, plan in mx._MACRO_PLANS.items()
+        if plan is not None and plan.kind in ("hotkey", "media", "mouse_scroll")
+    ]
+    if not valid:
+        print("no hotkey/media/scroll macros in MACRO_LIBRARY")
+        return
+    ids = [valid[i % len(valid)] for i in range(n)]
+    print(f"{len(valid)} macros, {len(mx.INVALID_MACROS)} invalid, {n} fires")
+
+    # Both paths must drive the controllers identically.
+    for mid in valid:
+        _keyboard.calls = _mouse.calls = backend.events = 0
+        legacy_execute(mid)
+        mx.execute_macro_by_id(mid)
+        assert _keyboard.calls + _mouse.calls == backend.events, mid
+
+    a = bench("legacy", legacy_execute, ids)
+    b = bench("plan", mx.execute_macro_by_id, ids)
+    print(f"plan saves {a - b:.0f} ns/fire ({(a - b) / a:.0%})")
+
+
+if __name__ == "__main__":
+    main()
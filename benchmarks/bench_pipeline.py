@@ -0,0 +1,94 @@
+"""
+bench_pipeline.py
+-----------------
+End-to-end input pipeline load test against the PTY virtual Pico (Linux/macOS):
+simulator -> pty -> PicoSerialClient reader -> Qt event loop -> handler.
+
+Reports delivered events/s, parse errors and wire-to-handler latency
+(simulator timestamps are host monotonic time). Run from the repo root:
+
+    python benchmarks/bench_pipeline.py [seconds] [enc_rate_hz]
+"""
+
+import sys
+import os
+import statistics
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from PyQt6.QtCore import QCoreApplication, QTimer
+
+from src.device.pico_serial import PicoSerialClient
+from src.device.protocol import EncoderEvent, KeyEvent
+from src.device.simulator import SimConfig, VirtualPico
+from src.utils.latency import LATENCY
+
+
+def run(app, seconds, enc_rate, **client_kw):
+    sim = VirtualPico(SimConfig(
+        hb_interval_s=0.5, key_rate_hz=20, enc_rate_hz=enc_rate,
+        burst_every_s=0.5, burst_size=200, malformed_rate=0.001, seed=1,
+    ))
+    port = sim.start()
+
+    LATENCY.reset()
+    client = PicoSerialClient(**client_kw)
+    stats = {"events": 0, "delta": 0, "errors": 0, "signals": 0}
+    lat = []
+
+    def handle(ev):
+        if isinstance(ev, (KeyEvent, EncoderEvent)):
+            stats["events"] += 1
+            if isinstance(ev, EncoderEvent):
+                stats["delta"] += abs(ev.d)
+            if ev.ts is not None:
+                lat.append(time.monotonic() - ev.ts)
+
+    def on_single(ev):
+        stats["signals"] += 1
+        handle(ev)
+
+    def on_batch(events):
+        stats["signals"] += 1
+        for ev in events:
+            handle(ev)
+
+    client.key_event.connect(on_single)
+    client.encoder_event.connect(on_single)
+    client.events_batch.connect(on_batch)
+    client.parse_error.connect(lambda _t: stats.__setitem__("errors", stats["errors"] + 1))
+
+    client.start(port)
+    sim.send_hello()  # opening the port flushed the boot-time hello
+
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec()
+    binary = client.binary_active
+    client.stop()
+    sim.stop()
+
+    lat.sort()
+    p = (lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] * 1000) if lat else (lambda q: float("nan"))
+    label = ", ".join(f"{k}={v}" for k, v in client_kw.items()) + (" [bin1]" if binary else "")
+    print(f"{label:<46} events/s={stats['events'] / seconds:>9,.0f}  enc steps={stats['delta']:>7}  "
+          f"signals={stats['signals']:>7}  errors={stats['errors']:>4}  "
+          f"latency p50={p(0.5):.2f}ms p99={p(0.99):.2f}ms")
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    enc_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 1000.0
+    app = QCoreApplication(sys.argv[:1])
+    for kw in (
+        {"read_mode": "line", "wire": "json"},
+        {"read_mode": "bulk", "wire": "json"},
+        {"read_mode": "bulk", "wire": "auto"},
+        {"read_mode": "bulk", "wire": "auto", "batch": True},
+    ):
+        run(app, seconds, enc_rate, **kw)
+    print("\nreader stages, last run:")
+    print(LATENCY.format_table())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+bench_reader.py
+---------------
+Throughput of the serial reader: legacy readline() loop vs the bulk framer.
+
+Both paths read from the same in-memory port that behaves like pyserial
+(readline() falls back to io's byte-at-a-time read, in_waiting reports the
+unread byte count). Run from the repo root:
+
+    python benchmarks/bench_reader.py [events]
+"""
+
+import io
+import json
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.device.framing import LineFramer, decode_lines
+
+
+class FakePort(io.RawIOBase):
+    """Minimal stand-in for serial.Serial over a fixed byte stream."""
+
+    def __init__(self, data: bytes):
+        super().__init__()
+        self._data = memoryview(data)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._data) - self._pos)
+        b[:n] = self._data[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    @property
+    def in_waiting(self):
+        return len(self._data) - self._pos
+
+
+def make_stream(events: int) -> bytes:
+    out = []
+    for i in range(events):
+        out.append(json.dumps({"t": "enc", "id": 0, "d": 1, "pos": i, "ts": i * 0.001}))
+    return ("\n".join(out) + "\n").encode("utf-8")
+
+
+def run_readline(port: FakePort) -> int:
+    n = 0
+    while True:
+        raw = port.readline()
+        if not raw:
+            break
+        json.loads(raw.decode("utf-8").strip())
+        n += 1
+    return n
+
+
+def run_bulk(port: FakePort, chunk: int) -> int:
+    framer = LineFramer()
+    n = 0
+    while True:
+        data = port.read(min(port.in_waiting, chunk) or 1)
+        if not data:
+            break
+        msgs, _ = decode_lines(framer.feed(data))
+        n += len(msgs)
+    return n
+
+
+def bench(name, fn, stream):
+    port = FakePort(stream)
+    t0 = time.perf_counter()
+    n = fn(port)
+    dt = time.perf_counter() - t0
+    print(f"{name:<22} {n:>8} events  {n / dt:>12,.0f} events/s")
+    return n / dt
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    stream = make_stream(events)
+
+    base = bench("readline", run_readline, stream)
+    # Chunk sizes approximate how much a fast spin leaves in the OS buffer
+    # between reads at 115200 baud.
+    for chunk in (64, 512, 4096):
+        rate = bench(f"bulk (chunk={chunk})", lambda p, c=chunk: run_bulk(p, c), stream)
+        print(f"{'':<22} speedup x{rate / base:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+bench_text.py
+-------------
+Text macro injection throughput: one key edge per backend call (how a
+hotkey-style plan would type text) vs the chunked type_text() path.
+
+Uses the uinput backend writing into /dev/null when python-evdev is
+installed, so the numbers include the real per-write() syscall cost, plus
+the null backend for pure executor overhead. Run from the repo root:
+
+    python benchmarks/bench_text.py [chars]
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import src.utils.macro_executor as mx
+from src.utils.injection_backends import NullBackend, UinputBackend, UInput
+
+
+def per_key(backend, text):
+    for ch in text:
+        backend.press(ch)
+        backend.release(ch)
+
+
+def bench(name, fn, backend, text, repeat: int = 5):
+    dt = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(backend, text)
+        dt = min(dt, time.perf_counter() - t0)
+    writes = getattr(backend, "writes", None)
+    print(f"  {name:<22} {len(text) / dt:>12,.0f} chars/s" + (f"  ({writes // repeat} writes)" if writes else ""))
+    if writes is not None:
+        backend.writes = 0
+    return dt
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    text = ("the quick brown fox jumps over the lazy dog 0123456789\n" * (n // 55 + 1))[:n]
+
+    backends = [("null", NullBackend(record=False))]
+    if UInput is not None:
+        backends.append(("uinput -> /dev/null", UinputBackend(fd=os.open(os.devnull, os.O_WRONLY))))
+    else:
+        print("python-evdev not installed: skipping the uinput backend")
+
+    for label, backend in backends:
+        print(f"{label}:")
+        mx.set_backend(backend)
+        a = bench("per key edge", per_key, backend, text)
+        for chunk in (8, mx.TEXT_CHUNK, 256):
+            plan = mx._compile_macro("bench", {"type": "text", "text": text, "chunk": chunk, "strategy": "type"})
+            b = bench(f"type_text chunk={chunk}", lambda be, _t: mx.run_plan(plan), backend, text)
+        if not isinstance(backend, NullBackend):  # null type_text is O(1): no fair ratio
+            print(f"  chunked is {a / b:.1f}x per-key throughput")
+
+    print(f"text_stats: {mx.text_stats()}")
+
+
+if __name__ == "__main__":
+    main()
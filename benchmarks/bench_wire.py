@@ -0,0 +1,98 @@
+"""
+bench_wire.py
+-------------
+JSON lines vs the negotiated "bin1" binary framing: bytes per event and
+decode throughput from raw bytes to event dataclasses. Run from the repo root:
+
+    python benchmarks/bench_wire.py [events]
+"""
+
+import json
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.device.binary_protocol import encode_msg
+from src.device.framing import LineFramer, decode_lines
+from src.device.protocol import MESSAGE_TYPES
+
+
+def decode_msg(msg):
+    """Message dict -> event object via the registry (None for unknown tags)."""
+    mt = MESSAGE_TYPES.get(msg.get("t"))
+    return mt.decode(msg, None) if mt else None
+
+
+def make_msgs(events: int):
+    msgs = []
+    for i in range(events):
+        ts = round(i * 0.001, 3)
+        r = i % 10
+        if r < 7:
+            msgs.append({"t": "enc", "id": 0, "d": 1 if r % 2 else -1, "pos": i, "ts": ts})
+        elif r < 9:
+            msgs.append({"t": "key", "k": i % 12, "edge": "down" if r == 7 else "up", "ts": ts})
+        else:
+            msgs.append({"t": "hb", "ts": ts})
+    return msgs
+
+
+def chunks(data: bytes, size: int = 512):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def run_json(parts):
+    framer = LineFramer()
+    n = 0
+    for part in parts:
+        msgs, _ = decode_lines(framer.feed(part))
+        for m in msgs:
+            decode_msg(m)
+            n += 1
+    return n
+
+
+def run_json_per_line(parts):
+    framer = LineFramer()
+    n = 0
+    for part in parts:
+        for line in framer.feed(part):
+            m = json.loads(line)
+            decode_msg(m)
+            n += 1
+    return n
+
+
+def run_binary(parts):
+    framer = LineFramer()
+    n = 0
+    for part in parts:
+        _, events, _ = framer.feed_mixed(part)
+        n += len(events)
+    return n
+
+
+def bench(name, fn, parts, total_bytes):
+    t0 = time.perf_counter()
+    n = fn(parts)
+    dt = time.perf_counter() - t0
+    print(f"{name:<10} {total_bytes / n:>6.1f} B/event  {n / dt:>12,.0f} events/s")
+    return n / dt
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    msgs = make_msgs(events)
+
+    json_stream = b"".join((json.dumps(m, separators=(",", ":")) + "\n").encode() for m in msgs)
+    bin_stream = b"".join(encode_msg(m)[1] for m in msgs)
+
+    bench("json/line", run_json_per_line, chunks(json_stream), len(json_stream))
+    a = bench("json", run_json, chunks(json_stream), len(json_stream))
+    b = bench("bin1", run_binary, chunks(bin_stream), len(bin_stream))
+    print(f"bytes x{len(json_stream) / len(bin_stream):.1f} smaller, decode x{b / a:.1f} faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,10 @@ MACRO_LIBRARY = {
         {"id": "macro_select_all", "name": "Select All", "type": "hotkey", "keys": ["Ctrl", "A"]},
         {"id": "macro_find", "name": "Find", "type": "hotkey", "keys": ["Ctrl", "F"]},
         {"id": "macro_save", "name": "Save", "type": "hotkey", "keys": ["Ctrl", "S"]},
+        {"id": "macro_duplicate_line", "name": "Duplicate Line", "type": "sequence", "steps": [
+            {"keys": ["Home"]}, {"keys": ["Shift", "End"]}, {"macro": "macro_copy"},
+            {"wait_ms": 30}, {"keys": ["End"]}, {"keys": ["Enter"]}, {"macro": "macro_paste"},
+        ]},
     ],
 
     "Navigation": [
@@ -0,0 +1,175 @@
+# src/device/binary_protocol.py
+"""
+Compact binary framing ("bin1") for high-rate device events.
+
+Negotiation:
+    - the device lists "bin1" in hello["caps"]
+    - the host answers with the JSON line {"t":"proto","v":"bin1"}
+    - from then on the device may send key/enc/btn/hb as binary frames;
+      hello and anything new still travel as JSON lines (the fallback)
+
+Frame layout (little-endian):
+    0xA5 | type:u8 | len:u8 | payload[len] | crc16:u16
+
+crc16 is CRC-CCITT (binascii.crc_hqx, init 0xFFFF) over type, len and
+payload. Timestamps travel as u32 milliseconds and are exposed as float
+seconds so events look the same as their JSON counterparts.
+"""
+from __future__ import annotations
+
+import json
+import struct
+from binascii import crc_hqx
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .protocol import ButtonEvent, EncoderEvent, Heartbeat, KeyEvent, fast_event
+
+CAP_BIN1 = "bin1"
+PROTO_REQUEST = b'{"t":"proto","v":"bin1"}\n'
+
+SYNC = 0xA5
+HEADER = struct.Struct("<BBB")
+CRC = struct.Struct("<H")
+HEADER_SIZE = HEADER.size
+CRC_SIZE = CRC.size
+CRC_INIT = 0xFFFF
+
+T_KEY = 0x01
+T_ENC = 0x02
+T_BTN = 0x03
+T_HB = 0x04
+
+_KEY = struct.Struct("<BBI")   # k, down, ts_ms
+_ENC = struct.Struct("<BbiI")  # id, d, pos, ts_ms
+_BTN = struct.Struct("<BBI")   # id, down, ts_ms
+_HB = struct.Struct("<I")      # ts_ms
+
+_EDGES = ("up", "down")
+
+
+class FrameError(ValueError):
+    def __init__(self, reason: str, size: int = 0):
+        super().__init__(reason)
+        self.size = size
+
+
+def _decode_key(buf, off: int, rx: Optional[float]) -> KeyEvent:
+    k, down, ts = _KEY.unpack_from(buf, off)
+    return fast_event(KeyEvent, {"k": k, "edge": _EDGES[down != 0], "ts": ts / 1000.0, "rx": rx})
+
+
+def _decode_enc(buf, off: int, rx: Optional[float]) -> EncoderEvent:
+    eid, d, pos, ts = _ENC.unpack_from(buf, off)
+    return fast_event(EncoderEvent, {"id": eid, "d": d, "pos": pos, "ts": ts / 1000.0, "rx": rx})
+
+
+def _decode_btn(buf, off: int, rx: Optional[float]) -> ButtonEvent:
+    bid, down, ts = _BTN.unpack_from(buf, off)
+    return fast_event(ButtonEvent, {"id": bid, "edge": _EDGES[down != 0], "ts": ts / 1000.0, "rx": rx})
+
+
+def _decode_hb(buf, off: int, rx: Optional[float]) -> Heartbeat:
+    (ts,) = _HB.unpack_from(buf, off)
+    return fast_event(Heartbeat, {"ts": ts / 1000.0})
+
+
+# type -> (payload size, decoder(buf, offset, rx))
+_DECODERS: Dict[int, Tuple[int, Callable[[Any, int, Optional[float]], Any]]] = {
+    T_KEY: (_KEY.size, _decode_key),
+    T_ENC: (_ENC.size, _decode_enc),
+    T_BTN: (_BTN.size, _decode_btn),
+    T_HB: (_HB.size, _decode_hb),
+}
+
+
+def frame_size(buf, start: int = 0) -> int:
+    """Total size of the frame starting at buf[start], or 0 if the header is incomplete."""
+    if len(buf) - start < HEADER_SIZE:
+        return 0
+    return HEADER_SIZE + buf[start + 2] + CRC_SIZE
+
+
+def decode_at(buf, pos: int, rx: Optional[float] = None):
+    """
+    Decode the frame starting at buf[pos] without copying it out first;
+    rx (host read time) goes into the event.
+
+    Returns (size, event); size is 0 when the frame is still incomplete.
+    Raises FrameError (with .size set so the caller can skip it) when the
+    frame is complete but invalid.
+    """
+    end = len(buf)
+    if end - pos < HEADER_SIZE:
+        return 0, None
+    ftype = buf[pos + 1]
+    length = buf[pos + 2]
+    body_end = pos + HEADER_SIZE + length
+    size = HEADER_SIZE + length + CRC_SIZE
+    if body_end + CRC_SIZE > end:
+        return 0, None
+
+    if crc_hqx(buf[pos + 1:body_end], CRC_INIT) != CRC.unpack_from(buf, body_end)[0]:
+        raise FrameError("crc mismatch", size)
+
+    entry = _DECODERS.get(ftype)
+    if entry is None:
+        raise FrameError(f"unknown frame type 0x{ftype:02x}", size)
+    expected, decoder = entry
+    if length != expected:
+        raise FrameError(f"bad payload length {length} for type 0x{ftype:02x}", size)
+    return size, decoder(buf, pos + HEADER_SIZE, rx)
+
+
+def decode_frame(frame: bytes, rx: Optional[float] = None):
+    """Validate one complete frame and return the event object it carries."""
+    if not frame or frame[0] != SYNC:
+        raise FrameError("bad sync byte", len(frame))
+    size, ev = decode_at(frame, 0, rx)
+    if size != len(frame):
+        raise FrameError("length mismatch", len(frame))
+    return ev
+
+
+# ---- Encoders (simulator / benchmarks / firmware reference) ----
+def _frame(ftype: int, payload: bytes) -> bytes:
+    body = bytes((ftype, len(payload))) + payload
+    return bytes((SYNC,)) + body + CRC.pack(crc_hqx(body, CRC_INIT))
+
+
+def _ms(ts: float | None) -> int:
+    return int((ts or 0.0) * 1000.0) & 0xFFFFFFFF
+
+
+def encode_key(k: int, edge: str, ts: float | None = None) -> bytes:
+    return _frame(T_KEY, _KEY.pack(k, edge == "down", _ms(ts)))
+
+
+def encode_enc(eid: int, d: int, pos: int = 0, ts: float | None = None) -> bytes:
+    return _frame(T_ENC, _ENC.pack(eid, d, pos, _ms(ts)))
+
+
+def encode_btn(bid: int, edge: str, ts: float | None = None) -> bytes:
+    return _frame(T_BTN, _BTN.pack(bid, edge == "down", _ms(ts)))
+
+
+def encode_hb(ts: float | None = None) -> bytes:
+    return _frame(T_HB, _HB.pack(_ms(ts)))
+
+
+def encode_msg(msg: Dict[str, Any]) -> Tuple[bool, bytes]:
+    """
+    Encode a JSON-shaped message as a binary frame when it has a binary form.
+    Returns (is_binary, data); messages without one come back as a JSON line.
+    """
+    t = msg.get("t")
+    ts = msg.get("ts")
+    if t == "key":
+        return True, encode_key(int(msg["k"]), str(msg["edge"]), ts)
+    if t == "enc":
+        return True, encode_enc(int(msg["id"]), int(msg["d"]), int(msg.get("pos", 0)), ts)
+    if t == "btn":
+        return True, encode_btn(int(msg["id"]), str(msg["edge"]), ts)
+    if t == "hb":
+        return True, encode_hb(ts)
+
+    return False, (json.dumps(msg, separators=(",", ":")) + "\n").encode("utf-8")
@@ -0,0 +1,204 @@
+# src/device/chord_engine.py
+"""
+Chord recognition on top of key edges.
+
+Chord bindings are profile entries like "K1+K3": "macro_x" (UI key numbers,
+1-based). They're compiled into bitmask tables:
+
+    chords     mask -> binding name           (exact chord)
+    prefixes   set of masks that are a strict subset of some chord
+    chord_keys mask of every key used by any chord
+
+so each event is a couple of int ops and set/dict lookups.
+
+Keys that aren't part of any chord pass straight through (no added
+latency). A key that is part of a chord is held for at most window_s while
+the engine waits to see whether the rest of a chord follows; it's released
+as a plain press when the window runs out, when it goes up, or when
+another press rules the chord out. That hold is the only latency the engine
+adds, is bounded by window_s and is recorded as the "chord_hold" stage.
+
+The engine is pure logic: the caller passes event times, and calls poll()
+at next_deadline() (InputDispatcher's chord timer thread does) and flush()
+before switching away from the profile.
+"""
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.utils.latency import LATENCY
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+CHORD_WINDOW_KEY = "_chord_window_ms"
+DEFAULT_WINDOW_MS = 50.0
+
+# ("key", KeyEvent) for a plain press, ("chord", binding_name, KeyEvent) for a chord
+Output = Tuple[Any, ...]
+
+
+def parse_chord(name: str) -> Optional[int]:
+    """ "K1+K3" -> bitmask of device keys (bit 0 = K1); None if not a chord name."""
+    parts = name.split("+")
+    if len(parts) < 2:
+        return None
+    mask = 0
+    for p in parts:
+        p = p.strip().upper()
+        if not p.startswith("K") or not p[1:].isdigit() or int(p[1:]) < 1:
+            return None
+        mask |= 1 << (int(p[1:]) - 1)
+    return mask if bin(mask).count("1") >= 2 else None
+
+
+class ChordEngine:
+    def __init__(self, window_ms: float = DEFAULT_WINDOW_MS):
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self._chords: Dict[int, str] = {}
+        self._prefixes: Set[int] = set()
+        self._chord_keys = 0
+
+        self._pending: List[Tuple[int, Any, float]] = []  # (k, ev, t_down)
+        self._pending_mask = 0
+        self._deadline: Optional[float] = None
+        self._consumed = 0  # keys whose press went into a chord: swallow their up
+
+        self.chords_fired = 0
+        self.singles_held = 0
+        self.singles_passed = 0
+
+    # ---- Configuration ----
+    def configure(self, bindings: Dict[str, Any], window_ms: Optional[float] = None) -> None:
+        """Compile chord bindings ("K1+K3": macro_id) from a profile binding map."""
+        if window_ms is not None:
+            self.window_s = max(0.0, float(window_ms)) / 1000.0
+        chords: Dict[int, str] = {}
+        for name, macro_id in (bindings or {}).items():
+            if "+" not in name or not str(macro_id or "").strip():
+                continue
+            mask = parse_chord(name)
+            if mask is None:
+                logger.warning(f"Ignoring invalid chord binding: {name!r}")
+                continue
+            chords[mask] = name
+
+        prefixes: Set[int] = set()
+        keys = 0
+        for mask in chords:
+            keys |= mask
+            # every non-empty strict subset of the chord
+            sub = (mask - 1) & mask
+            while sub:
+                prefixes.add(sub)
+                sub = (sub - 1) & mask
+        self._chords = chords
+        self._prefixes = prefixes
+        self._chord_keys = keys
+        self.reset()
+
+    def reset(self) -> None:
+        self._pending.clear()
+        self._pending_mask = 0
+        self._deadline = None
+        self._consumed = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self._chords)
+
+    def next_deadline(self) -> Optional[float]:
+        return self._deadline
+
+    # ---- Events ----
+    def on_key(self, k: int, down: bool, ev: Any, now: Optional[float] = None) -> List[Output]:
+        if now is None:
+            now = time.monotonic()
+        out: List[Output] = []
+        bit = 1 << k
+
+        if not down:
+            if self._consumed & bit:
+                self._consumed &= ~bit
+            elif self._pending_mask & bit:
+                # Released inside the window: resolve with what's pending
+                self._resolve(now, out)
+                self._consumed &= ~bit
+            return out
+
+        self._consumed &= ~bit  # a new press: its up belongs to this press
+        if not (self._chord_keys & bit):
+            self._resolve(now, out)
+            self.singles_passed += 1
+            LATENCY.record("chord_hold", 0.0)
+            out.append(("key", ev))
+            return out
+
+        mask = self._pending_mask | bit
+        if self._pending and mask not in self._chords and mask not in self._prefixes:
+            # This press can't complete anything with what's pending
+            self._resolve(now, out)
+            mask = bit
+
+        self._pending.append((k, ev, now))
+        self._pending_mask = mask
+        if mask in self._chords and mask not in self._prefixes:
+            self._fire_chord(out)  # complete and unambiguous
+        elif self._deadline is None:
+            self._deadline = now + self.window_s
+        return out
+
+    def poll(self, now: Optional[float] = None) -> List[Output]:
+        """Release whatever is pending once its window has passed."""
+        if now is None:
+            now = time.monotonic()
+        out: List[Output] = []
+        if self._deadline is not None and now >= self._deadline:
+            self._resolve(now, out)
+        return out
+
+    def flush(self, now: Optional[float] = None) -> List[Output]:
+        """Resolve whatever is pending right away (e.g. before a layer switch)."""
+        if now is None:
+            now = time.monotonic()
+        out: List[Output] = []
+        self._resolve(now, out)
+        return out
+
+    # ---- Internals ----
+    def _resolve(self, now: float, out: List[Output]) -> None:
+        if not self._pending:
+            return
+        if self._pending_mask in self._chords:
+            self._fire_chord(out)
+            return
+        for _k, ev, t_down in self._pending:
+            LATENCY.record("chord_hold", now - t_down)
+            self.singles_held += 1
+            out.append(("key", ev))
+        self._clear()
+
+    def _fire_chord(self, out: List[Output]) -> None:
+        name = self._chords[self._pending_mask]
+        self.chords_fired += 1
+        self._consumed |= self._pending_mask
+        out.append(("chord", name, self._pending[-1][1]))
+        self._clear()
+
+    def _clear(self) -> None:
+        self._pending.clear()
+        self._pending_mask = 0
+        self._deadline = None
+
+    def stats(self) -> Dict[str, float]:
+        hold = LATENCY.histogram("chord_hold")
+        return {
+            "chords": len(self._chords),
+            "window_ms": self.window_s * 1000.0,
+            "chords_fired": self.chords_fired,
+            "singles_held": self.singles_held,
+            "singles_passed": self.singles_passed,
+            "hold_p99_ms": hold.percentile(99),
+            "hold_max_ms": hold.max_us / 1000.0,
+        }
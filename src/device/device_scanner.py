@@ -2,7 +2,8 @@
 from __future__ import annotations
 from PyQt6.QtCore import QObject, QThread, pyqtSignal
 
-from src.device.port_finder import find_pico_data_port
+from src.device.port_cache import load_cached_identity, save_cached_identity
+from src.device.port_finder import find_pico_port_identity
 
 
 class _ScanWorker(QObject):
@@ -11,15 +12,19 @@ class _ScanWorker(QObject):
     error = pyqtSignal(str)
     finished = pyqtSignal()
 
-    def __init__(self, timeout_s: float):
+    def __init__(self, timeout_s: float, use_cache: bool = True):
         super().__init__()
         self.timeout_s = timeout_s
+        self.use_cache = use_cache
 
     def run(self):
         try:
-            port = find_pico_data_port(timeout_s=self.timeout_s)
-            if port:
-                self.found.emit(port)
+            cached = load_cached_identity() if self.use_cache else None
+            ident = find_pico_port_identity(timeout_s=self.timeout_s, cached=cached)
+            if ident:
+                if self.use_cache and ident != cached:
+                    save_cached_identity(ident)
+                self.found.emit(ident.device)
             else:
                 self.not_found.emit()
         except Exception as e:
@@ -34,9 +39,11 @@ class DeviceScanner(QObject):
     error = pyqtSignal(str)
     scanning = pyqtSignal(bool)
 
-    def __init__(self, timeout_s: float = 1.0):
+    def __init__(self, timeout_s: float = 1.0, use_cache: bool = True):
         super().__init__()
         self.timeout_s = timeout_s
+        # Try the last good port/USB identity (config/macropad.json) first
+        self.use_cache = use_cache
         self._busy = False
         self._thread: QThread | None = None
         self._worker: _ScanWorker | None = None
@@ -52,7 +59,7 @@ class DeviceScanner(QObject):
         self.scanning.emit(True)
 
         self._thread = QThread()
-        self._worker = _ScanWorker(timeout_s=self.timeout_s)
+        self._worker = _ScanWorker(timeout_s=self.timeout_s, use_cache=self.use_cache)
         self._worker.moveToThread(self._thread)
 
         self._thread.started.connect(self._worker.run)
@@ -0,0 +1,278 @@
+# src/device/encoder_engine.py
+"""
+Per-encoder state machine: detent deltas -> macro actions.
+
+Every encoder id is a slot in a set of flat arrays (position, timestamp,
+smoothed velocity, fractional accumulator, curve index), so an event is a
+few array reads/writes and no dicts are created or resized per event.
+Slots grow on first use.
+
+For each EncoderEvent the engine:
+
+    1. recovers lost deltas from pos: if the firmware's running position moved
+       further than d (same direction, within max_gap) some events were
+       dropped and the position difference is used instead. A position that
+       never moves, jumps backwards or jumps too far (firmware restart,
+       firmware that doesn't track pos) is ignored and d is used.
+    2. estimates velocity in detents/s from the firmware ts (falls back to
+       host receive time), smoothed with an EMA; a pause longer than idle_ms
+       starts again from rest.
+    3. multiplies the delta by the encoder's acceleration curve at that
+       velocity and adds it to a fractional accumulator (reset on direction
+       change), which pending()/take() quantize into whole actions.
+
+Profile config ("_encoder" in macros.json), all keys optional; "E<n>" entries
+override the top-level values for one encoder:
+
+    "_encoder": {
+        "steps_per_action": 1,
+        "curve": "none" | "linear" | "power" | "table",
+        "threshold": 8,      detents/s where acceleration starts
+        "gain": 0.25,        linear: extra multiplier per detent/s above threshold
+        "exponent": 1.5,     power: (v / threshold) ** exponent
+        "points": [[0, 1], [20, 2], [60, 6]],   table: piecewise linear
+        "max": 8,            multiplier cap
+        "E1": {"curve": "none"}
+    }
+"""
+from __future__ import annotations
+
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ENCODER_CONFIG_KEY = "_encoder"
+
+# Curves are compiled into a multiplier per whole detent/s up to this speed
+_V_MAX = 256
+# Binary frames carry ts as u32 milliseconds
+_TS_WRAP_S = 2 ** 32 / 1000.0
+
+_DEFAULT_SPEC: Dict[str, Any] = {
+    "steps_per_action": 1,
+    "curve": "none",
+    "threshold": 8.0,
+    "gain": 0.25,
+    "exponent": 1.5,
+    "max": 8.0,
+}
+
+
+def compile_curve(spec: Dict[str, Any]) -> array:
+    """Curve spec -> multiplier table indexed by int(velocity)."""
+    curve = str(spec.get("curve", "none")).strip().lower()
+    cap = float(spec.get("max", _DEFAULT_SPEC["max"]))
+    threshold = float(spec.get("threshold", _DEFAULT_SPEC["threshold"]))
+    if cap < 1.0 or threshold < 0.0:
+        raise ValueError(f"need max >= 1 and threshold >= 0: {spec!r}")
+
+    if curve == "none":
+        return array("d", [1.0] * (_V_MAX + 1))
+
+    if curve == "linear":
+        gain = float(spec.get("gain", _DEFAULT_SPEC["gain"]))
+        f = lambda v: 1.0 + gain * max(0.0, v - threshold)
+    elif curve == "power":
+        exponent = float(spec.get("exponent", _DEFAULT_SPEC["exponent"]))
+        if threshold <= 0.0:
+            raise ValueError("power curve needs threshold > 0")
+        f = lambda v: (v / threshold) ** exponent if v > threshold else 1.0
+    elif curve == "table":
+        points = sorted((float(v), float(m)) for v, m in spec.get("points") or [])
+        if not points:
+            raise ValueError("table curve needs points")
+
+        def f(v: float) -> float:
+            if v <= points[0][0]:
+                return points[0][1]
+            for (v0, m0), (v1, m1) in zip(points, points[1:]):
+                if v <= v1:
+                    return m0 + (m1 - m0) * (v - v0) / (v1 - v0) if v1 > v0 else m1
+            return points[-1][1]
+    else:
+        raise ValueError(f"unknown encoder curve: {curve!r}")
+
+    return array("d", (min(cap, max(1.0, f(float(v)))) for v in range(_V_MAX + 1)))
+
+
+class EncoderEngine:
+    def __init__(
+        self,
+        count: int = 0,
+        steps_per_action: int = 1,
+        idle_ms: float = 150.0,
+        smoothing: float = 0.5,
+        max_gap: int = 32,
+    ):
+        self.idle_s = idle_ms / 1000.0
+        self.smoothing = smoothing      # EMA weight of the newest sample
+        self.max_gap = max_gap          # largest pos jump treated as lost deltas
+        self._default_steps = max(1, int(steps_per_action))
+        self._config: Dict[str, Any] = {}
+        self._curves: List[array] = [compile_curve(_DEFAULT_SPEC)]
+        self._curve_ids: Dict[Tuple[float, ...], int] = {tuple(self._curves[0]): 0}
+
+        # Per-encoder state, indexed by encoder id
+        self._pos = array("q")
+        self._pos_ok = array("b")       # -1 no pos yet, 0 untrusted, 1 tracked d consistently
+        self._ts = array("d")
+        self._vel = array("d")          # smoothed detents/s
+        self._accum = array("d")        # scaled steps not yet turned into actions
+        self._steps = array("l")        # steps per action
+        self._curve = array("H")        # index into self._curves
+        self.recovered = array("L")     # deltas recovered from pos
+        self.resyncs = array("L")       # pos ignored (jump/restart)
+        self._count = 0
+        self.ensure(count - 1)
+
+    # ---- Configuration ----
+    def configure(self, config: Optional[Dict[str, Any]] = None, steps_per_action: Optional[int] = None) -> None:
+        """Apply a profile's "_encoder" map; resets all encoder state."""
+        self._config = dict(config or {}) if isinstance(config, dict) else {}
+        if steps_per_action is not None:
+            self._default_steps = max(1, int(steps_per_action))
+        self._curves = [compile_curve(_DEFAULT_SPEC)]
+        self._curve_ids = {tuple(self._curves[0]): 0}
+        bad = [f"E{eid}" for eid in range(self._count) if not self._apply(eid, warn=False)]
+        if bad:
+            logger.warning(f"Invalid encoder config for {', '.join(bad)}; using defaults")
+        self.reset()
+
+    def _apply(self, eid: int, warn: bool = True) -> bool:
+        spec = dict(_DEFAULT_SPEC, steps_per_action=self._default_steps)
+        spec.update({k: v for k, v in self._config.items() if not k.startswith("E")})
+        own = self._config.get(f"E{eid}")
+        if isinstance(own, dict):
+            spec.update(own)
+        try:
+            steps = max(1, int(spec.get("steps_per_action", 1)))
+            curve = compile_curve(spec)
+        except (TypeError, ValueError) as e:
+            if warn:
+                logger.warning(f"Invalid encoder config for E{eid} ({e}); using defaults")
+            self._steps[eid] = self._default_steps
+            self._curve[eid] = 0
+            return False
+
+        # Encoders with the same curve share one table
+        key = tuple(curve)
+        idx = self._curve_ids.get(key)
+        if idx is None:
+            idx = len(self._curves)
+            self._curves.append(curve)
+            self._curve_ids[key] = idx
+        self._steps[eid] = steps
+        self._curve[eid] = idx
+        return True
+
+    def ensure(self, eid: int) -> None:
+        """Grow the state arrays to cover encoder eid."""
+        while self._count <= eid:
+            self._pos.append(0)
+            self._pos_ok.append(-1)
+            self._ts.append(-1.0)           # < 0: no event yet
+            self._vel.append(0.0)
+            self._accum.append(0.0)
+            self._steps.append(self._default_steps)
+            self._curve.append(0)
+            self.recovered.append(0)
+            self.resyncs.append(0)
+            self._count += 1
+            self._apply(self._count - 1)
+
+    def reset(self, eid: Optional[int] = None) -> None:
+        ids = range(self._count) if eid is None else (eid,)
+        for i in ids:
+            self._pos_ok[i] = -1
+            self._ts[i] = -1.0
+            self._vel[i] = 0.0
+            self._accum[i] = 0.0
+
+    # ---- Events ----
+    def feed(self, eid: int, d: int, pos: Optional[int] = None, ts: Optional[float] = None) -> int:
+        """
+        Apply one event's delta (ts in seconds, firmware clock if available).
+        Returns the delta actually applied (d plus anything recovered from pos).
+        """
+        if not 0 <= eid < self._count:
+            if eid < 0:
+                return 0
+            self.ensure(eid)
+
+        # 1. Lost deltas from the running position
+        delta = d
+        if pos is not None:
+            ok = self._pos_ok[eid]
+            if ok >= 0:
+                moved = pos - self._pos[eid]
+                if moved == d:
+                    self._pos_ok[eid] = 1
+                elif ok and 0 < moved * d and abs(moved) <= self.max_gap:
+                    delta = moved
+                    self.recovered[eid] += abs(moved - d)
+                else:
+                    self._pos_ok[eid] = 0
+                    self.resyncs[eid] += 1
+            else:
+                self._pos_ok[eid] = 0
+            self._pos[eid] = pos
+        if delta == 0:
+            return 0
+
+        # 2. Velocity from event timestamps
+        if ts is None:
+            ts = time.monotonic()
+        last = self._ts[eid]
+        self._ts[eid] = ts
+        dt = ts - last
+        if last < 0.0:
+            dt = -1.0
+        elif dt < 0.0:
+            dt += _TS_WRAP_S
+        if 0.0 < dt <= self.idle_s:
+            a = self.smoothing
+            vel = a * (abs(delta) / dt) + (1.0 - a) * self._vel[eid]
+        else:
+            vel = 0.0  # first event or after a pause: from rest
+        self._vel[eid] = vel
+
+        # 3. Acceleration and accumulation
+        table = self._curves[self._curve[eid]]
+        mult = table[int(vel) if vel < _V_MAX else _V_MAX]
+        accum = self._accum[eid]
+        if accum * delta < 0.0:
+            accum = 0.0  # direction change drops the partial step
+        self._accum[eid] = accum + delta * mult
+        return delta
+
+    def pending(self, eid: int) -> int:
+        """Whole actions ready on eid: > 0 clockwise, < 0 counter-clockwise."""
+        if not 0 <= eid < self._count:
+            return 0
+        return int(self._accum[eid] / self._steps[eid])
+
+    def take(self, eid: int) -> int:
+        """Like pending(), and consumes them (the fraction stays accumulated)."""
+        actions = self.pending(eid)
+        if actions:
+            self._accum[eid] -= actions * self._steps[eid]
+        return actions
+
+    # ---- Stats ----
+    def velocity(self, eid: int) -> float:
+        return self._vel[eid] if 0 <= eid < self._count else 0.0
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            f"E{i}": {
+                "velocity": round(self._vel[i], 2),
+                "recovered": self.recovered[i],
+                "resyncs": self.resyncs[i],
+                "steps_per_action": self._steps[i],
+            }
+            for i in range(self._count)
+        }
@@ -0,0 +1,71 @@
+# src/device/event_batcher.py
+from __future__ import annotations
+
+import threading
+from typing import Any, List, Optional
+
+from .protocol import EncoderEvent, Heartbeat, fast_event
+
+
+class EventBatcher:
+    """
+    Reader-side buffer for batched delivery to the GUI thread.
+
+    - consecutive encoder events for the same id merge into one (d summed,
+      pos/ts taken from the newest), so a fast spin costs one entry
+    - only the newest heartbeat is kept, and once the buffer holds
+      shed_after entries new heartbeats are dropped entirely
+    - key/button events are never merged or dropped and keep their order
+    """
+
+    def __init__(self, shed_after: int = 256) -> None:
+        self.shed_after = shed_after
+        self._lock = threading.Lock()
+        self._buf: List[Any] = []
+        self._hb_index: Optional[int] = None
+
+        self.coalesced = 0
+        self.shed = 0
+
+    def add(self, ev: Any) -> bool:
+        """Buffer ev. Returns True if the buffer went from empty to non-empty."""
+        with self._lock:
+            buf = self._buf
+            was_empty = not buf
+
+            if isinstance(ev, EncoderEvent):
+                if buf:
+                    last = buf[-1]
+                    if isinstance(last, EncoderEvent) and last.id == ev.id:
+                        buf[-1] = fast_event(EncoderEvent, {
+                            "id": ev.id,
+                            "d": last.d + ev.d,
+                            "pos": ev.pos if ev.pos is not None else last.pos,
+                            "ts": ev.ts if ev.ts is not None else last.ts,
+                            "rx": last.rx,  # oldest read time: worst-case latency
+                        })
+                        self.coalesced += 1
+                        return False
+
+            elif isinstance(ev, Heartbeat):
+                if len(buf) >= self.shed_after:
+                    self.shed += 1
+                    return False
+                if self._hb_index is not None:
+                    buf[self._hb_index] = ev
+                    self.shed += 1
+                    return False
+                self._hb_index = len(buf)
+
+            buf.append(ev)
+            return was_empty
+
+    def drain(self) -> List[Any]:
+        with self._lock:
+            batch = self._buf
+            self._buf = []
+            self._hb_index = None
+        return batch
+
+    def __len__(self) -> int:
+        return len(self._buf)
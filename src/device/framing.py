@@ -0,0 +1,132 @@
+# src/device/framing.py
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from .binary_protocol import SYNC, FrameError, decode_at
+
+_LINE_START = ord("{")
+
+
+class LineFramer:
+    """
+    Incremental newline framer for the Pico JSON-lines stream.
+
+    Bytes are appended to one reusable buffer; every complete line is split off
+    and returned, while a trailing partial line is carried over to the next
+    feed(). Lines longer than max_line without a newline are discarded so a
+    noisy port can't grow the buffer forever.
+    """
+
+    def __init__(self, max_line: int = 4096) -> None:
+        self._buf = bytearray()
+        self.max_line = max_line
+        self.dropped = 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        buf = self._buf
+        buf += data
+
+        end = buf.rfind(b"\n")
+        if end < 0:
+            if len(buf) > self.max_line:
+                self.dropped += 1
+                buf.clear()
+            return []
+
+        chunk = bytes(buf[:end])
+        del buf[:end + 1]
+        return [ln for ln in chunk.split(b"\n") if ln.strip()]
+
+    def feed_mixed(
+        self, data: bytes, rx: Optional[float] = None
+    ) -> Tuple[List[bytes], List[Any], List[Tuple[bytes, str]]]:
+        """
+        Split a stream that interleaves JSON lines and binary frames.
+
+        Used once the binary wire format has been negotiated. A frame starts
+        with the SYNC byte and is decoded in place; a line starts with '{'.
+        Anything else is noise and is skipped up to the next plausible start
+        so a corrupted byte can't swallow the frames that follow it. rx (host
+        read time) goes into the decoded events.
+
+        Returns (lines, events, errors).
+        """
+        buf = self._buf
+        buf += data
+        lines: List[bytes] = []
+        events: List[Any] = []
+        errors: List[Tuple[bytes, str]] = []
+        pos = 0
+        n = len(buf)
+
+        while pos < n:
+            b0 = buf[pos]
+            if b0 == SYNC:
+                try:
+                    size, ev = decode_at(buf, pos, rx)
+                except FrameError as e:
+                    errors.append((bytes(buf[pos:pos + e.size]), str(e)))
+                    pos += 1  # resync on the next start byte
+                    continue
+                if not size:
+                    break
+                events.append(ev)
+                pos += size
+            elif b0 == _LINE_START:
+                end = buf.find(b"\n", pos)
+                if end < 0:
+                    if n - pos > self.max_line:
+                        self.dropped += 1
+                        pos = n
+                    break
+                lines.append(bytes(buf[pos:end]))
+                pos = end + 1
+            else:
+                nxt = [i for i in (buf.find(SYNC, pos), buf.find(_LINE_START, pos)) if i >= 0]
+                pos = min(nxt) if nxt else n
+
+        del buf[:pos]
+        return lines, events, errors
+
+    def pending(self) -> int:
+        return len(self._buf)
+
+    def reset(self) -> None:
+        self._buf.clear()
+
+
+def decode_lines(lines: List[bytes]) -> Tuple[List[Dict[str, Any]], List[Tuple[bytes, str]]]:
+    """
+    Decode a batch of JSON lines.
+
+    The whole batch is parsed with a single json.loads by joining it into an
+    array; if that fails (one malformed line poisons the batch) we fall back to
+    per-line parsing so the good lines still get through.
+
+    Returns (messages, errors) where errors is a list of (raw_line, reason).
+    """
+    if not lines:
+        return [], []
+
+    try:
+        msgs = json.loads(b"[" + b",".join(lines) + b"]")
+        if len(msgs) == len(lines) and all(isinstance(m, dict) for m in msgs):
+            return msgs, []
+    except Exception:
+        pass
+
+    msgs: List[Dict[str, Any]] = []
+    errors: List[Tuple[bytes, str]] = []
+    for raw in lines:
+        try:
+            msg = json.loads(raw)
+        except Exception as e:
+            errors.append((raw, str(e)))
+            continue
+        if isinstance(msg, dict):
+            msgs.append(msg)
+        else:
+            errors.append((raw, "not a JSON object"))
+    return msgs, errors
@@ -0,0 +1,285 @@
+# src/device/hotplug.py
+"""
+Serial port hotplug watching and automatic re-attach.
+
+HotplugMonitor polls a pluggable backend and diffs successive enumerations
+into port_added / port_removed signals. AutoReconnector uses those (plus the
+client's own disconnected signal) to re-run the scanner with debounced
+exponential backoff, and measures how long it takes from re-plug until the
+first keypress is handled again.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import serial
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from serial.tools import list_ports
+
+from src.utils.logger import setup_logger
+from .port_cache import KNOWN_VIDS, PortIdentity
+from .protocol import KeyEvent
+
+logger = setup_logger(__name__)
+
+
+# ---- Backends ----
+class PortBackend(ABC):
+    """Enumerates serial ports as {device: PortIdentity}."""
+
+    @abstractmethod
+    def snapshot(self) -> Dict[str, PortIdentity]:
+        ...
+
+
+class ListPortsBackend(PortBackend):
+    """Portable backend: full pyserial enumeration every poll."""
+
+    def snapshot(self) -> Dict[str, PortIdentity]:
+        return {p.device: PortIdentity.from_port_info(p) for p in list_ports.comports()}
+
+
+class LinuxTtyBackend(PortBackend):
+    """
+    Cheap Linux backend: a poll is one listdir of /dev filtered to USB serial
+    nodes. The (sysfs-walking) pyserial enumeration only runs when that set
+    of names actually changes, to fill in USB metadata.
+    """
+
+    PREFIXES = ("ttyACM", "ttyUSB")
+
+    def __init__(self) -> None:
+        self._names: frozenset = frozenset()
+        self._cache: Dict[str, PortIdentity] = {}
+
+    def snapshot(self) -> Dict[str, PortIdentity]:
+        try:
+            names = frozenset(
+                "/dev/" + n for n in os.listdir("/dev") if n.startswith(self.PREFIXES)
+            )
+        except OSError:
+            names = frozenset()
+
+        if names != self._names:
+            self._names = names
+            full = {p.device: PortIdentity.from_port_info(p) for p in list_ports.comports()}
+            self._cache = {d: full.get(d, PortIdentity(device=d)) for d in names}
+        return dict(self._cache)
+
+
+def default_backend() -> PortBackend:
+    if sys.platform.startswith("linux") and os.path.isdir("/dev"):
+        return LinuxTtyBackend()
+    return ListPortsBackend()
+
+
+# ---- Monitor ----
+class HotplugMonitor(QObject):
+    port_added = pyqtSignal(object)    # PortIdentity
+    port_removed = pyqtSignal(str)     # device
+
+    def __init__(self, backend: Optional[PortBackend] = None, interval_ms: int = 500):
+        super().__init__()
+        self.backend = backend or default_backend()
+        self._ports: Dict[str, PortIdentity] = {}
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self.poll)
+
+    def start(self) -> None:
+        self._ports = self._safe_snapshot()
+        self._timer.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+
+    def ports(self) -> Dict[str, PortIdentity]:
+        return dict(self._ports)
+
+    def poll(self) -> None:
+        current = self._safe_snapshot()
+        previous = self._ports
+        self._ports = current
+
+        for dev in previous.keys() - current.keys():
+            self.port_removed.emit(dev)
+        for dev in current.keys() - previous.keys():
+            self.port_added.emit(current[dev])
+
+    def _safe_snapshot(self) -> Dict[str, PortIdentity]:
+        try:
+            return self.backend.snapshot()
+        except Exception as e:
+            logger.warning(f"Port enumeration failed: {e}")
+            return dict(self._ports)
+
+
+# ---- Auto reconnect ----
+class AutoReconnector(QObject):
+    """
+    Re-attaches the client after an unplug without user action.
+
+    States: idle (suspended / never connected), connected, lost.
+    While lost, a scan is attempted debounce_ms after a matching port shows
+    up, and otherwise on an exponential backoff (initial_backoff_s doubling
+    up to max_backoff_s). The scanner's found signal is expected to start the
+    client through attach(), as MainWindow does, so a port that can't be
+    opened counts as a failed scan and the backoff carries on.
+
+    Only a lost session counts: the client emits disconnected once per
+    session and not when it's restarted on a live link (link reset, Connect
+    while connected), so a restart is neither a loss nor a re-attach.
+    """
+
+    reattached = pyqtSignal(float)          # seconds from re-plug (or loss) to connected
+    first_input_after_reattach = pyqtSignal(float)  # seconds from re-plug to first handled key
+
+    def __init__(
+        self,
+        client,
+        scanner,
+        monitor: Optional[HotplugMonitor] = None,
+        debounce_ms: int = 300,
+        initial_backoff_s: float = 0.5,
+        max_backoff_s: float = 8.0,
+    ):
+        super().__init__()
+        self.client = client
+        self.scanner = scanner
+        self.monitor = monitor or HotplugMonitor()
+        self.debounce_ms = debounce_ms
+        self.initial_backoff_s = initial_backoff_s
+        self.max_backoff_s = max_backoff_s
+
+        self.state = "idle"
+        self.suspended = False
+        self.port: Optional[str] = None
+        self.reconnects = 0
+        self.last_reattach_s: Optional[float] = None
+        self.last_replug_to_input_s: Optional[float] = None
+
+        self._backoff_s = initial_backoff_s
+        # Reference time for the measurements: the re-plug if we saw one,
+        # otherwise the moment the link was lost.
+        self._t_plug: Optional[float] = None
+        self._await_input = False
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._attempt)
+
+        client.connected.connect(self._on_connected)
+        client.disconnected.connect(self._on_disconnected)
+        client.key_event.connect(self._on_input)
+        client.events_batch.connect(self._on_input)
+        scanner.not_found.connect(self._on_scan_failed)
+        scanner.error.connect(self._on_scan_failed)
+        self.monitor.port_added.connect(self._on_port_added)
+        self.monitor.port_removed.connect(self._on_port_removed)
+
+    def start(self) -> None:
+        self.monitor.start()
+
+    def stop(self) -> None:
+        self._timer.stop()
+        self.monitor.stop()
+
+    def suspend(self) -> None:
+        """User asked to disconnect: don't fight them."""
+        self.suspended = True
+        self.state = "idle"
+        self._timer.stop()
+
+    def resume(self) -> None:
+        self.suspended = False
+
+    def attach(self, port: str) -> bool:
+        """Start the client on a port the scanner found; False if it can't be opened."""
+        try:
+            self.client.start(port)
+        except (serial.SerialException, OSError) as e:
+            logger.warning(f"Cannot open {port}: {e}")
+            self._on_scan_failed()
+            return False
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "reconnects": self.reconnects,
+            "backoff_s": self._backoff_s,
+            "last_reattach_s": self.last_reattach_s,
+            "last_replug_to_input_s": self.last_replug_to_input_s,
+        }
+
+    # ---- Client / scanner signals ----
+    def _on_connected(self, port: str) -> None:
+        was_lost = self.state == "lost"
+        self.state = "connected"
+        self.port = port
+        self._timer.stop()
+        self._backoff_s = self.initial_backoff_s
+
+        if was_lost:
+            self.reconnects += 1
+            if self._t_plug is not None:
+                self.last_reattach_s = time.monotonic() - self._t_plug
+                self._await_input = True
+                self.reattached.emit(self.last_reattach_s)
+                logger.info(f"Re-attached on {port} {self.last_reattach_s * 1000:.0f} ms after re-plug")
+
+    def _on_disconnected(self) -> None:
+        if self.suspended or self.state != "connected" or self.client.is_open:
+            return  # is_open: a newer session is already up
+        self.state = "lost"
+        self._t_plug = time.monotonic()
+        self._await_input = False
+        self._schedule(self._backoff_s)
+
+    def _on_scan_failed(self, *_args) -> None:
+        if self.state != "lost" or self.suspended:
+            return
+        self._backoff_s = min(self._backoff_s * 2.0, self.max_backoff_s)
+        self._schedule(self._backoff_s)
+
+    def _on_input(self, ev) -> None:
+        if not self._await_input or self._t_plug is None:
+            return
+        if isinstance(ev, list) and not any(isinstance(e, KeyEvent) for e in ev):
+            return  # events_batch without a keypress
+        self._await_input = False
+        self.last_replug_to_input_s = time.monotonic() - self._t_plug
+        self.first_input_after_reattach.emit(self.last_replug_to_input_s)
+        logger.info(f"First input {self.last_replug_to_input_s * 1000:.0f} ms after re-plug")
+
+    # ---- Hotplug signals ----
+    def _on_port_added(self, ident: PortIdentity) -> None:
+        if self.state != "lost" or self.suspended:
+            return
+        if ident.vid is not None and ident.vid not in KNOWN_VIDS:
+            return
+        self._t_plug = time.monotonic()
+        self._backoff_s = self.initial_backoff_s
+        # Debounce: the OS often adds the node before the CDC interface is ready,
+        # and a composite device adds several nodes in quick succession.
+        self._schedule(self.debounce_ms / 1000.0)
+
+    def _on_port_removed(self, device: str) -> None:
+        if device == self.port and self.state == "connected":
+            # The reader will notice on its next read; close proactively.
+            self.client.stop()
+
+    def _schedule(self, delay_s: float) -> None:
+        self._timer.start(max(0, int(delay_s * 1000)))
+
+    def _attempt(self) -> None:
+        if self.state != "lost" or self.suspended:
+            return
+        if self.scanner.is_busy():
+            self._schedule(self._backoff_s)
+            return
+        self.scanner.scan()
@@ -0,0 +1,209 @@
+# src/device/key_state.py
+"""
+Key state as a bitmask with a sequence counter.
+
+One writer (the serial reader thread) and any number of readers. The writer
+builds a new (seq, mask) tuple and publishes it with a single attribute
+store, so snapshot() is one attribute load: always consistent, never locked.
+Every change also lands in a fixed ring of per-seq "changed bits", which
+changed_since(seq) ORs together; a reader that fell more than the ring size
+behind gets every bit back (treat as "everything may have changed").
+
+Optionally the state is mirrored into a shared-memory segment so external
+tools can poll it without the GUI (see KeyStateShm / read_shm_snapshot).
+"""
+from __future__ import annotations
+
+import struct
+from typing import List, Optional, Tuple
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+Snapshot = Tuple[int, int]  # (seq, mask); bit k set = key k down
+
+
+class KeyState:
+    def __init__(self, count: int = 0, history: int = 256, shm_name: Optional[str] = None):
+        self._count = max(0, int(count))
+        self._snap: Snapshot = (0, 0)
+        self._ring_size = max(1, int(history))
+        self._ring: List[int] = [0] * self._ring_size  # changed bits, indexed by seq % size
+        self._shm: Optional[KeyStateShm] = None
+        if shm_name:
+            try:
+                self._shm = KeyStateShm(shm_name)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Key state shared memory '{shm_name}' unavailable: {e}")
+
+    # ---- Writer (reader thread) ----
+    def _publish(self, mask: int, changed: int) -> None:
+        seq = self._snap[0] + 1
+        # Ring entry first: a reader that sees the new seq also sees its change.
+        self._ring[seq % self._ring_size] = changed
+        self._snap = (seq, mask)
+        if self._shm is not None:
+            self._shm.write(seq, self._count, mask)
+
+    def set(self, k: int, down: bool) -> bool:
+        """Record key k's edge. Returns True if the state changed."""
+        if not 0 <= k < self._count:
+            return False
+        bit = 1 << k
+        mask = self._snap[1]
+        new = (mask | bit) if down else (mask & ~bit)
+        if new == mask:
+            return False
+        self._publish(new, bit)
+        return True
+
+    def resize(self, count: int) -> None:
+        """New key count (hello): all keys up. The object is reused, not replaced."""
+        self._count = max(0, int(count))
+        self._publish(0, self._snap[1])
+
+    # ---- Readers (any thread, lock-free) ----
+    def snapshot(self) -> Snapshot:
+        return self._snap
+
+    @property
+    def seq(self) -> int:
+        return self._snap[0]
+
+    @property
+    def mask(self) -> int:
+        return self._snap[1]
+
+    def is_down(self, k: int) -> bool:
+        return bool((self._snap[1] >> k) & 1)
+
+    def pressed(self) -> List[int]:
+        mask = self._snap[1]
+        return [k for k in range(self._count) if (mask >> k) & 1]
+
+    def changed_since(self, seq: int) -> Tuple[int, int, int]:
+        """
+        -> (current_seq, current_mask, changed_bits) for changes after seq.
+        changed_bits is every key bit when seq is too old for the ring.
+        """
+        cur, mask = self._snap
+        behind = cur - seq
+        if behind <= 0:
+            return cur, mask, 0
+        size = self._ring_size
+        all_bits = (1 << self._count) - 1
+        if behind >= size:
+            return cur, mask, all_bits
+        ring = self._ring
+        changed = 0
+        for s in range(seq + 1, cur + 1):
+            changed |= ring[s % size]
+        # The writer may have lapped the ring while we read it
+        if self._snap[0] - seq >= size:
+            return cur, mask, all_bits
+        return cur, mask, changed
+
+    # ---- list[bool] compatibility (old PicoSerialClient.key_state) ----
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, k: int) -> bool:
+        if not 0 <= k < self._count:
+            raise IndexError(k)
+        return self.is_down(k)
+
+    def __setitem__(self, k: int, down: bool) -> None:
+        if not 0 <= k < self._count:
+            raise IndexError(k)
+        self.set(k, bool(down))
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+
+# ---- Shared memory mirror ----
+# Layout (little endian): u64 seq, u32 count, u32 reserved, then the mask as
+# MAX_KEYS/8 bytes (bit k = key k). seq is a seqlock: odd while being written.
+# Readers: read seq, copy, re-read seq; retry if odd or changed.
+SHM_MAX_KEYS = 256
+_HEADER = struct.Struct("<QII")
+_MASK_BYTES = SHM_MAX_KEYS // 8
+SHM_SIZE = _HEADER.size + _MASK_BYTES
+
+
+class KeyStateShm:
+    def __init__(self, name: str):
+        from multiprocessing import shared_memory
+
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=SHM_SIZE)
+            self._owner = True
+        except FileExistsError:
+            # Someone else's segment (another instance, or left over by a
+            # crash): write into it, but leave its contents until our first
+            # write and never unlink it
+            self._shm = _attach(shared_memory, name)
+            self._owner = False
+            if self._shm.size < SHM_SIZE:
+                self._shm.close()
+                raise ValueError(f"existing segment too small ({self._shm.size} < {SHM_SIZE})")
+            logger.warning(f"Key state shared memory '{name}' already exists; attaching to it")
+        self.name = name
+        self._buf = self._shm.buf
+        if self._owner:
+            self._buf[:SHM_SIZE] = bytes(SHM_SIZE)
+
+    def write(self, seq: int, count: int, mask: int) -> None:
+        buf = self._buf
+        # seqlock: 2*seq+1 while writing, 2*seq when done
+        struct.pack_into("<Q", buf, 0, 2 * seq + 1)
+        struct.pack_into("<I", buf, 8, min(count, SHM_MAX_KEYS))
+        buf[_HEADER.size:SHM_SIZE] = (mask & ((1 << SHM_MAX_KEYS) - 1)).to_bytes(_MASK_BYTES, "little")
+        struct.pack_into("<Q", buf, 0, 2 * seq)
+
+    def close(self) -> None:
+        try:
+            self._buf.release()
+        except Exception:
+            pass
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _attach(shared_memory, name: str):
+    # Before 3.13 every SharedMemory is registered with the resource tracker,
+    # which unlinks it when this process exits, even one we only attached to
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def read_shm_snapshot(buf, retries: int = 100) -> Optional[Tuple[int, int, int]]:
+    """
+    Consistent (seq, count, mask) from a KeyStateShm buffer (e.g.
+    SharedMemory(name).buf in another process); None if it kept changing.
+    """
+    for _ in range(retries):
+        s1 = struct.unpack_from("<Q", buf, 0)[0]
+        if s1 & 1:
+            continue
+        count = struct.unpack_from("<I", buf, 8)[0]
+        mask = int.from_bytes(bytes(buf[_HEADER.size:SHM_SIZE]), "little")
+        if struct.unpack_from("<Q", buf, 0)[0] == s1:
+            return s1 // 2, count, mask
+    return None
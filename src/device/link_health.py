@@ -0,0 +1,170 @@
+# src/device/link_health.py
+"""
+Heartbeat-driven link health.
+
+A device that hangs without closing its port keeps the serial link "open"
+while keypresses are lost. LinkHealthMonitor learns the heartbeat period from
+hb arrivals, tracks interval jitter, and declares a stall when no heartbeat
+arrives within stall_factor x the expected period. On a stall it resets the
+client (reopen the same port), which isn't reported as a disconnect. If the
+port can't be reopened, or the device stays silent after the reset, the
+client is closed and the regular disconnect / auto-reconnect path takes over.
+"""
+from __future__ import annotations
+
+import time
+from typing import Dict, Optional
+
+import serial
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class LinkHealthMonitor(QObject):
+    stalled = pyqtSignal(float)    # seconds since the last heartbeat
+    recovered = pyqtSignal()       # heartbeats resumed after a reset
+
+    def __init__(
+        self,
+        client,
+        expected_period_s: float = 1.0,
+        stall_factor: float = 3.0,
+        ewma_alpha: float = 0.125,
+    ):
+        super().__init__()
+        self.client = client
+        self.expected_period_s = expected_period_s
+        self.stall_factor = stall_factor
+        self.ewma_alpha = ewma_alpha
+
+        self.port: Optional[str] = None
+        self.reconnects = 0
+        self.stalls = 0
+        self.missed = 0
+        self.hb_count = 0
+
+        self._period_s = expected_period_s
+        self._jitter_s = 0.0
+        self._last_hb: Optional[float] = None
+        self._armed = False
+        self._resetting = False
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._check)
+
+        client.connected.connect(self._on_connected)
+        client.disconnected.connect(self._on_disconnected)
+
+    # ---- Inputs ----
+    def on_heartbeat(self, _ts: float = 0.0) -> None:
+        """Feed every hb (MainWindow.on_device_hb). Uses host arrival time."""
+        now = time.monotonic()
+        last = self._last_hb
+        self._last_hb = now
+        self.hb_count += 1
+
+        if last is not None:
+            interval = now - last
+            # Intervals that span lost heartbeats shouldn't stretch the period.
+            if interval > 1.5 * self._period_s:
+                self.missed += max(0, int(round(interval / self._period_s)) - 1)
+            else:
+                a = self.ewma_alpha
+                self._jitter_s += (abs(interval - self._period_s) - self._jitter_s) * a
+                self._period_s += (interval - self._period_s) * a
+
+        if not self._armed:
+            self._armed = True
+            self._restart_timer()
+        if self._resetting:
+            self._resetting = False
+            self.recovered.emit()
+
+    # ---- Stats ----
+    def stats(self) -> Dict[str, float]:
+        age = (time.monotonic() - self._last_hb) if self._last_hb is not None else None
+        return {
+            "heartbeats": self.hb_count,
+            "period_ms": self._period_s * 1000.0,
+            "jitter_ms": self._jitter_s * 1000.0,
+            "missed": self.missed,
+            "stalls": self.stalls,
+            "reconnects": self.reconnects,
+            "last_hb_age_ms": age * 1000.0 if age is not None else None,
+        }
+
+    def stall_timeout_s(self) -> float:
+        return self.stall_factor * self._period_s + 4.0 * self._jitter_s
+
+    # ---- Client signals ----
+    def _on_connected(self, port: str) -> None:
+        self.port = port
+        # Only arm once the device proves it sends heartbeats.
+        self._armed = False
+        self._last_hb = None
+        self._timer.stop()
+
+    def _on_disconnected(self) -> None:
+        # A reset restarts the client without a disconnect, so this is always
+        # a real loss (including a reset that couldn't reopen the port).
+        self._resetting = False
+        self._armed = False
+        self._timer.stop()
+
+    # ---- Stall detection ----
+    def _restart_timer(self) -> None:
+        # Check a few times per period so detection lands close to the deadline.
+        self._timer.start(max(50, int(self._period_s * 1000 / 4)))
+
+    def _check(self) -> None:
+        if not self._armed or self._last_hb is None:
+            return
+        age = time.monotonic() - self._last_hb
+        if age < self.stall_timeout_s():
+            return
+
+        if self._resetting:
+            # Still silent after a reset: give up on this port.
+            logger.warning(f"No heartbeat from {self.port} after link reset - disconnecting")
+            self._resetting = False
+            self._armed = False
+            self._timer.stop()
+            self.client.stop()
+            return
+
+        self.stalls += 1
+        self.missed += max(0, int(age / self._period_s) - 1)
+        logger.warning(
+            f"Heartbeat stall on {self.port}: {age * 1000:.0f} ms since last hb "
+            f"(period {self._period_s * 1000:.0f} ms) - resetting link"
+        )
+        self.stalled.emit(age)
+        self._reset_link()
+
+    def _reset_link(self) -> None:
+        self._armed = False
+        self._timer.stop()
+        self._last_hb = None
+        port = self.port
+        if not port:
+            return
+
+        self._resetting = True
+        self.reconnects += 1
+        try:
+            # Restarting a live client is not a disconnect, so AutoReconnector
+            # stays out of it; if the port can't be reopened the client
+            # reports the loss and reconnect takes over.
+            self.client.start(port)
+        except (serial.SerialException, OSError) as e:
+            logger.warning(f"Link reset on {port} failed ({e}); handing over to reconnect")
+            self._resetting = False
+            return
+
+        # Give the reopened link one stall timeout to produce a heartbeat.
+        self._last_hb = time.monotonic()
+        self._armed = True
+        self._restart_timer()
@@ -4,12 +4,17 @@ from __future__ import annotations
 import json
 import threading
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 
 import serial
-from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtCore import QObject, Qt, QTimer, pyqtSignal
 
-from .protocol import HelloInfo, KeyEvent, EncoderEvent, ButtonEvent, is_hello, is_hb, is_key, is_enc, is_btn
+from .binary_protocol import CAP_BIN1, PROTO_REQUEST
+from .event_batcher import EventBatcher
+from .framing import LineFramer, decode_lines
+from .key_state import KeyState
+from src.utils.latency import LATENCY
+from .protocol import MESSAGE_TYPES, HelloInfo, Heartbeat, KeyEvent, EncoderEvent, ButtonEvent
 
 
 class PicoSerialClient(QObject):
@@ -20,27 +25,141 @@ class PicoSerialClient(QObject):
     key_event = pyqtSignal(object)     # KeyEvent
     encoder_event = pyqtSignal(object)   # EncoderEvent
     button_event = pyqtSignal(object)    # ButtonEvent
+    events_batch = pyqtSignal(object)    # list of Heartbeat/KeyEvent/EncoderEvent/ButtonEvent (batch mode)
 
     parse_error = pyqtSignal(str)
+    _batch_ready = pyqtSignal()
+    _reader_lost = pyqtSignal(int)       # session whose reader hit a read error
 
-    def __init__(self) -> None:
+    READ_MODES = ("bulk", "line")
+    WIRE_MODES = ("json", "auto")
+
+    def __init__(
+        self,
+        read_mode: str = "bulk",
+        wire: str = "auto",
+        batch: bool = False,
+        batch_interval_ms: int = 0,
+        key_state_shm: Optional[str] = None,
+    ) -> None:
         super().__init__()
+        if read_mode not in self.READ_MODES:
+            raise ValueError(f"Unknown read_mode: {read_mode!r}")
+        if wire not in self.WIRE_MODES:
+            raise ValueError(f"Unknown wire mode: {wire!r}")
+        self.read_mode = read_mode
+        # "auto" switches to binary frames when hello advertises CAP_BIN1;
+        # only the bulk reader understands them.
+        self.wire = wire if read_mode == "bulk" else "json"
+        self.binary_active = False
         self._ser: Optional[serial.Serial] = None
         self._thread: Optional[threading.Thread] = None
         self._stop = threading.Event()
-        self.key_state: list[bool] = []
+        # Every start() opens a new session; a reader only reports the loss of
+        # its own session, so a restart never looks like a disconnect.
+        self._session = 0
+        self._open = False
+        self._reader_lost.connect(self._on_reader_lost, Qt.ConnectionType.QueuedConnection)
+        self._framer = LineFramer()
+        self._rx: Optional[float] = None  # host time of the current read
+        # Bitmask + seq, written only by the reader thread; lock-free snapshots
+        # for everyone else (optionally mirrored into shared memory)
+        self.key_state = KeyState(shm_name=key_state_shm)
+
+        # event type -> handler, and the precompiled tag -> (decoder, handler)
+        # table the reader uses; see register_handler().
+        self._handlers: Dict[type, Callable[[Any], None]] = {
+            HelloInfo: self._on_hello,
+            Heartbeat: self._on_heartbeat,
+            KeyEvent: self._on_key,
+            EncoderEvent: self._on_encoder,
+            ButtonEvent: self._on_button,
+        }
+        self._dispatch: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], Callable[[Any], None]]] = {}
+        # Optional callable run on the reader thread for every decoded event,
+        # before it's handed to the GUI; see set_inline_handler().
+        self._inline: Optional[Callable[[Any], None]] = None
+
+        # Batch mode: instead of one queued signal per message, the reader
+        # buffers events and wakes the GUI thread once; the GUI thread drains
+        # the buffer and emits a single events_batch per event-loop tick (or
+        # at most every batch_interval_ms).
+        self._batcher: Optional[EventBatcher] = None
+        self.batch_interval_ms = max(0, int(batch_interval_ms))
+        self._last_flush = 0.0
+        self._flush_timer_armed = False
+        if batch:
+            self._batcher = EventBatcher()
+            self._handlers[Heartbeat] = self._on_batched
+            self._handlers[KeyEvent] = self._on_key_batched
+            self._handlers[EncoderEvent] = self._on_batched
+            self._handlers[ButtonEvent] = self._on_batched
+            self._batch_ready.connect(self._flush_batch, Qt.ConnectionType.QueuedConnection)
+
+        self._rebuild_dispatch()
+
+    def register_handler(self, event_type: type, handler: Callable[[Any], None]) -> None:
+        """
+        Route decoded events of event_type to handler (called on the reader
+        thread). The message itself must be registered with
+        protocol.register_message().
+        """
+        self._handlers[event_type] = handler
+        self._rebuild_dispatch()
+
+    def set_inline_handler(self, handler: Optional[Callable[[Any], None]]) -> None:
+        """
+        Run handler(ev) on the reader thread for every decoded event, ahead of
+        the signals / batch for the GUI (e.g. InputDispatcher.handle, so macros
+        fire without waiting for the GUI event loop). None removes it.
+        """
+        self._inline = handler
+
+    def _rebuild_dispatch(self) -> None:
+        self._dispatch = {
+            tag: (mt.decode, self._handlers[mt.event_type])
+            for tag, mt in MESSAGE_TYPES.items()
+            if mt.event_type in self._handlers
+        }
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
 
     def start(self, port: str) -> None:
-        self.stop()
-        self._stop.clear()
-        self._ser = serial.Serial(port, 115200, timeout=0.2)
+        """
+        Open port and start reading. Restarting a live client (a link reset, a
+        re-scan while connected) only emits connected again; disconnected is
+        emitted if the old session is closed and the new port can't be opened.
+        """
+        was_open = self._close()
+        try:
+            ser = serial.Serial(port, 115200, timeout=0.2)
+        except Exception:
+            if was_open:
+                self.disconnected.emit()
+            raise
+        self._ser = ser
+        self._stop = stop = threading.Event()
+        self._session += 1
+        self._open = True
+        self._framer.reset()
+        self._rebuild_dispatch()  # pick up message types registered since __init__
+        self.binary_active = False
         self.connected.emit(port)
-        self._thread = threading.Thread(target=self._reader_loop, daemon=True)
+        loop = self._bulk_reader_loop if self.read_mode == "bulk" else self._reader_loop
+        self._thread = threading.Thread(target=loop, args=(ser, stop, self._session), daemon=True)
         self._thread.start()
 
     def stop(self) -> None:
+        """Close the port; emits disconnected if a session was open."""
+        if self._close():
+            self.disconnected.emit()
+
+    def _close(self) -> bool:
+        """Stop the reader and close the port; True if a session was open."""
         self._stop.set()
-        if self._thread and self._thread.is_alive():
+        if self._thread and self._thread.is_alive() and threading.current_thread() is not self._thread:
             self._thread.join(timeout=1.0)
         self._thread = None
         if self._ser:
@@ -49,17 +168,23 @@ class PicoSerialClient(QObject):
             except Exception:
                 pass
         self._ser = None
-        self.disconnected.emit()
+        was_open, self._open = self._open, False
+        return was_open
 
-    def _reader_loop(self) -> None:
-        assert self._ser is not None
-        ser = self._ser
+    def _on_reader_lost(self, session: int) -> None:
+        # Queued from the reader thread; stale when the client was stopped or
+        # restarted in the meantime.
+        if session == self._session and self._open:
+            self.stop()
 
-        while not self._stop.is_set():
+    def _reader_loop(self, ser: serial.Serial, stop: threading.Event, session: int) -> None:
+        """Legacy reader: one readline() + json.loads per message."""
+        while not stop.is_set():
             try:
                 raw = ser.readline()
                 if not raw:
                     continue
+                self._rx = time.monotonic()
 
                 try:
                     line = raw.decode("utf-8").strip()
@@ -68,32 +193,167 @@ class PicoSerialClient(QObject):
                     self.parse_error.emit(f"{repr(raw)} | {e}")
                     continue
 
-                if is_hello(msg):
-                    info = HelloInfo.from_msg(msg)
-                    self.key_state = [False] * max(0, info.keys)
-                    self.hello.emit(info)
+                self._handle_msg(msg)
 
-                elif is_hb(msg):
-                    self.heartbeat.emit(float(msg.get("ts", time.monotonic())))
+            except (serial.SerialException, OSError):
+                break
+            except Exception as e:
+                self.parse_error.emit(str(e))
 
-                elif is_key(msg):
-                    ev = KeyEvent.from_msg(msg)
-                    if 0 <= ev.k < len(self.key_state):
-                        self.key_state[ev.k] = (ev.edge == "down")
-                    self.key_event.emit(ev)
+        if not stop.is_set():
+            self._reader_lost.emit(session)
 
-                elif is_enc(msg):
-                    ev = EncoderEvent.from_msg(msg)
-                    self.encoder_event.emit(ev)
+    def _bulk_reader_loop(self, ser: serial.Serial, stop: threading.Event, session: int) -> None:
+        """
+        Bulk reader: drain everything in in_waiting, frame complete lines
+        incrementally and decode them as one batch.
+        """
+        framer = self._framer
 
-                elif is_btn(msg):
-                    ev = ButtonEvent.from_msg(msg)
-                    self.button_event.emit(ev)
+        while not stop.is_set():
+            try:
+                # Block (up to the port timeout) for the first byte, then take
+                # whatever else has already arrived in one call.
+                data = ser.read(ser.in_waiting or 1)
+                if not data:
+                    continue
+                self._rx = time.monotonic()
 
+                if self.binary_active:
+                    lines, events, frame_errors = framer.feed_mixed(data, self._rx)
+                    for raw, err in frame_errors:
+                        self.parse_error.emit(f"{raw.hex()} | {err}")
+                    for ev in events:
+                        self._handle_event(ev)
+                else:
+                    lines = framer.feed(data)
+
+                if not lines:
+                    continue
+
+                msgs, errors = decode_lines(lines)
+                for raw, err in errors:
+                    self.parse_error.emit(f"{repr(raw)} | {err}")
+                for msg in msgs:
+                    self._handle_msg(msg)
 
             except (serial.SerialException, OSError):
                 break
             except Exception as e:
                 self.parse_error.emit(str(e))
 
-        self.disconnected.emit()
+        if not stop.is_set():
+            self._reader_lost.emit(session)
+
+    def _handle_msg(self, msg: Dict[str, Any]) -> None:
+        entry = self._dispatch.get(msg.get("t"))
+        if entry is None:
+            return
+        decode, handler = entry
+        try:
+            ev = decode(msg, self._rx)
+        except (KeyError, TypeError, ValueError) as e:
+            self.parse_error.emit(f"{msg!r} | {e!r}")
+            return
+        if LATENCY.enabled:
+            self._trace(ev)
+        self._run_inline(ev)
+        self._run_handler(handler, ev)
+
+    def _handle_event(self, ev) -> None:
+        """Dispatch an already-decoded event (binary frames)."""
+        handler = self._handlers.get(type(ev))
+        if handler is not None:
+            if LATENCY.enabled:
+                self._trace(ev)
+            self._run_inline(ev)
+            self._run_handler(handler, ev)
+
+    def _run_handler(self, handler: Callable[[Any], None], ev) -> None:
+        # Per message, like decode errors: a failing handler must not drop the
+        # rest of the read
+        try:
+            handler(ev)
+        except Exception as e:
+            self.parse_error.emit(f"handler failed for {ev!r}: {e!r}")
+
+    def _run_inline(self, ev) -> None:
+        inline = self._inline
+        if inline is not None:
+            try:
+                inline(ev)
+            except Exception as e:
+                self.parse_error.emit(f"inline handler failed for {ev!r}: {e!r}")
+
+    def _trace(self, ev) -> None:
+        rx = getattr(ev, "rx", None)  # set by the decoder
+        if rx is None:
+            return
+        LATENCY.record_wire(ev.ts, rx)
+        LATENCY.since("parse", rx)
+
+    # ---- Built-in handlers (reader thread) ----
+    def _on_hello(self, info: HelloInfo) -> None:
+        self.key_state.resize(info.keys)
+        self._negotiate(info)
+        self.hello.emit(info)
+
+    def _on_heartbeat(self, ev: Heartbeat) -> None:
+        self.heartbeat.emit(ev.ts)
+
+    def _on_key(self, ev: KeyEvent) -> None:
+        self.key_state.set(ev.k, ev.edge == "down")
+        self.key_event.emit(ev)
+
+    def _on_encoder(self, ev: EncoderEvent) -> None:
+        self.encoder_event.emit(ev)
+
+    def _on_button(self, ev: ButtonEvent) -> None:
+        self.button_event.emit(ev)
+
+    def _on_key_batched(self, ev: KeyEvent) -> None:
+        self.key_state.set(ev.k, ev.edge == "down")
+        self._on_batched(ev)
+
+    def _on_batched(self, ev) -> None:
+        if self._batcher.add(ev):
+            self._batch_ready.emit()
+
+    # ---- Batch delivery (GUI thread) ----
+    def _flush_batch(self) -> None:
+        if self._batcher is None:
+            return
+
+        if self.batch_interval_ms:
+            wait_ms = self.batch_interval_ms - (time.monotonic() - self._last_flush) * 1000.0
+            if wait_ms > 0:
+                if not self._flush_timer_armed:
+                    self._flush_timer_armed = True
+                    QTimer.singleShot(int(wait_ms) + 1, self._flush_from_timer)
+                return
+
+        self._last_flush = time.monotonic()
+        batch = self._batcher.drain()
+        if batch:
+            self.events_batch.emit(batch)
+
+    def _flush_from_timer(self) -> None:
+        self._flush_timer_armed = False
+        self._flush_batch()
+
+    def batch_stats(self) -> Dict[str, int]:
+        b = self._batcher
+        if b is None:
+            return {}
+        return {"pending": len(b), "coalesced": b.coalesced, "shed": b.shed}
+
+    def _negotiate(self, info: HelloInfo) -> None:
+        # Every hello is a fresh session; the device starts out in JSON.
+        self.binary_active = False
+        if self.wire != "auto" or not info.supports(CAP_BIN1) or self._ser is None:
+            return
+        try:
+            self._ser.write(PROTO_REQUEST)
+            self.binary_active = True
+        except (serial.SerialException, OSError) as e:
+            self.parse_error.emit(f"binary negotiation failed: {e}")
@@ -0,0 +1,129 @@
+# src/device/port_cache.py
+"""
+Last-known-port cache.
+
+Remembers the port the device was last found on together with its USB
+identity (VID/PID/serial number/location from list_ports), stored next to
+the existing device_port field in config/macropad.json, so the next start can
+try that port first and skip a full scan.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MACROPAD_CONFIG_PATH = os.path.join("config", "macropad.json")
+
+# USB vendor ids a Pico-based macropad can enumerate with:
+# Raspberry Pi (stock / Pico SDK) and Adafruit (CircuitPython builds).
+KNOWN_VIDS = frozenset({0x2E8A, 0x239A})
+
+
+@dataclass(frozen=True)
+class PortIdentity:
+    device: str
+    vid: Optional[int] = None
+    pid: Optional[int] = None
+    serial_number: Optional[str] = None
+    location: Optional[str] = None
+
+    @staticmethod
+    def from_port_info(info: Any) -> "PortIdentity":
+        return PortIdentity(
+            device=str(info.device),
+            vid=getattr(info, "vid", None),
+            pid=getattr(info, "pid", None),
+            serial_number=getattr(info, "serial_number", None),
+            location=getattr(info, "location", None),
+        )
+
+    def same_usb_device(self, other: "PortIdentity") -> bool:
+        """
+        True when other is the same physical USB interface, even if the OS
+        gave it a different port name this time. A CircuitPython Pico exposes
+        two CDC ports with identical VID/PID/serial, so location (which
+        carries the interface number) is compared when both sides have it.
+        """
+        if self.vid is None or self.vid != other.vid or self.pid != other.pid:
+            return False
+        if self.serial_number and self.serial_number != other.serial_number:
+            return False
+        if self.location and other.location:
+            return _interface(self.location) == _interface(other.location)
+        return self.device == other.device
+
+
+def _interface(location: str) -> str:
+    # "1-1.2:1.2" -> "1.2" (configuration.interface); Windows locations have no ':'
+    return location.rsplit(":", 1)[-1]
+
+
+def load_cached_identity(path: str = MACROPAD_CONFIG_PATH) -> Optional[PortIdentity]:
+    cfg = _read(path)
+    port = str(cfg.get("device_port") or "").strip()
+    if not port:
+        return None
+    usb = cfg.get("device_usb") or {}
+    return PortIdentity(
+        device=port,
+        vid=usb.get("vid"),
+        pid=usb.get("pid"),
+        serial_number=usb.get("serial_number"),
+        location=usb.get("location"),
+    )
+
+
+def save_cached_identity(identity: PortIdentity, path: str = MACROPAD_CONFIG_PATH) -> None:
+    cfg = _read(path)
+    usb = asdict(identity)
+    cfg["device_port"] = usb.pop("device")
+    cfg["device_usb"] = usb
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, indent=2)
+    except OSError as e:
+        logger.warning(f"Could not save last device port: {e}")
+
+
+def order_candidates(
+    ports: Iterable[Any],
+    cached: Optional[PortIdentity] = None,
+    known_vids: Iterable[int] = KNOWN_VIDS,
+) -> List[PortIdentity]:
+    """
+    Turn list_ports results into probe candidates: the cached device first,
+    then other ports whose USB vendor id could be ours. Ports that are clearly
+    not ours (non-USB, other vendors) are dropped, unless that would leave
+    nothing to probe.
+    """
+    idents = [PortIdentity.from_port_info(p) for p in ports]
+    vids = set(known_vids)
+    usb = [i for i in idents if i.vid in vids] or idents
+
+    if cached is None:
+        return usb
+
+    first = [i for i in idents if cached.same_usb_device(i)]
+    if not first:
+        # No USB metadata cached (older config): fall back to the port name.
+        first = [i for i in idents if i.device == cached.device and cached.vid is None]
+    return first + [i for i in usb if i not in first]
+
+
+def _read(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read {path}: {e}")
+        return {}
@@ -1,50 +1,128 @@
 # src/device/port_finder.py
 from __future__ import annotations
 import json
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional
 
 import serial
 from serial.tools import list_ports
 
+from .port_cache import KNOWN_VIDS, PortIdentity, order_candidates
 
-def find_pico_data_port(
-    timeout_s: float = 7.0,
-    expected_type: str = "pico-macropad-backend",
-) -> Optional[str]:
-    ports = [p.device for p in list_ports.comports()]
 
-    for port in ports:
-        try:
-            with serial.Serial(port, 115200, timeout=0.2) as ser:
-                deadline = time.monotonic() + timeout_s
+def _probe_port(
+    port: str,
+    timeout_s: float,
+    expected_type: str,
+    cancel: threading.Event,
+) -> bool:
+    """
+    Open one port and wait (up to timeout_s, or until cancel is set) for a
+    message that proves it speaks our protocol.
+    """
+    try:
+        with serial.Serial(port, 115200, timeout=0.2) as ser:
+            deadline = time.monotonic() + timeout_s
+
+            while time.monotonic() < deadline and not cancel.is_set():
+                raw = ser.readline()
+                if not raw:
+                    continue
 
-                while time.monotonic() < deadline:
-                    raw = ser.readline()
-                    if not raw:
-                        continue
+                try:
+                    msg = json.loads(raw.decode("utf-8").strip())
+                except Exception:
+                    continue
 
-                    try:
-                        msg = json.loads(raw.decode("utf-8").strip())
-                    except Exception:
-                        continue
+                t = msg.get("t")
 
-                    t = msg.get("t")
+                # Best-case: hello tells us the type
+                if t == "hello":
+                    return not expected_type or msg.get("type") == expected_type
 
-                    # Best-case: hello tells us the type
-                    if t == "hello":
-                        if expected_type and msg.get("type") != expected_type:
-                            break
-                        return port
+                # Fallback: heartbeat proves this port is streaming our protocol
+                if t == "hb":
+                    # If we want to be extra strict later, we can require
+                    # that a hello appears eventually after hb. For now:
+                    return True
 
-                    # Fallback: heartbeat proves this port is streaming our protocol
-                    if t == "hb":
-                        # If we want to be extra strict later, we can require
-                        # that a hello appears eventually after hb. For now:
-                        return port
+    except Exception:
+        pass
 
-        except Exception:
-            continue
+    return False
 
-    return None
 
+def _probe_all(ports: List[str], timeout_s: float, expected_type: str) -> Optional[str]:
+    """
+    Probe every port at once and return the first one that shows a valid
+    hello/hb. The remaining probes are cancelled, so this takes as long as
+    the slowest single probe rather than the sum of all of them.
+    """
+    if not ports:
+        return None
+    if len(ports) == 1:
+        return ports[0] if _probe_port(ports[0], timeout_s, expected_type, threading.Event()) else None
+
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=len(ports), thread_name_prefix="port-probe")
+    try:
+        futures = {
+            pool.submit(_probe_port, port, timeout_s, expected_type, cancel): port
+            for port in ports
+        }
+        for fut in as_completed(futures):
+            if fut.result():
+                return futures[fut]
+        return None
+    finally:
+        # Losers notice within one read timeout and close their ports;
+        # don't hold the caller up waiting for that.
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def find_pico_port_identity(
+    timeout_s: float = 7.0,
+    expected_type: str = "pico-macropad-backend",
+    cached: Optional[PortIdentity] = None,
+    known_vids=KNOWN_VIDS,
+) -> Optional[PortIdentity]:
+    """
+    Find the device and return its port plus USB identity.
+
+    Candidates are filtered by USB vendor id before any port is opened. If
+    cached (the last good identity) matches a present port, that port is
+    probed alone first, so the common case connects in a single probe.
+    """
+    candidates = order_candidates(list_ports.comports(), cached, known_vids)
+    if not candidates:
+        return None
+
+    by_device = {c.device: c for c in candidates}
+    if cached is not None:
+        first = candidates[0]
+        if cached.same_usb_device(first) or (cached.vid is None and first.device == cached.device):
+            if _probe_port(first.device, timeout_s, expected_type, threading.Event()):
+                return first
+            candidates = candidates[1:]
+
+    port = _probe_all([c.device for c in candidates], timeout_s, expected_type)
+    return by_device.get(port) if port else None
+
+
+def find_pico_data_port(
+    timeout_s: float = 7.0,
+    expected_type: str = "pico-macropad-backend",
+    ports: Optional[List[str]] = None,
+) -> Optional[str]:
+    """
+    Probe candidate ports concurrently and return the first that speaks our
+    protocol. Without an explicit port list, all present ports are filtered
+    by USB vendor id first.
+    """
+    if ports is None:
+        ident = find_pico_port_identity(timeout_s, expected_type)
+        return ident.device if ident else None
+    return _probe_all(list(ports), timeout_s, expected_type)
@@ -1,26 +1,8 @@
 # src/device/protocol.py
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
-
-
-def is_hello(msg: Dict[str, Any]) -> bool:
-    return msg.get("t") == "hello"
-
-
-def is_hb(msg: Dict[str, Any]) -> bool:
-    return msg.get("t") == "hb"
-
-
-def is_key(msg: Dict[str, Any]) -> bool:
-    return msg.get("t") == "key" and "k" in msg and "edge" in msg
-
-def is_enc(msg: Dict[str, Any]) -> bool:
-    return msg.get("t") == "enc" and "id" in msg and "d" in msg
-
-def is_btn(msg: Dict[str, Any]) -> bool:
-    return msg.get("t") == "btn" and "id" in msg and "edge" in msg
-
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
 
 
 @dataclass(frozen=True)
@@ -29,6 +11,7 @@ class HelloInfo:
     fw_version: str
     keys: int
     pins: list[str]
+    caps: list[str] = field(default_factory=list)  # e.g. ["bin1"]
 
     @staticmethod
     def from_msg(msg: Dict[str, Any]) -> "HelloInfo":
@@ -37,14 +20,29 @@ class HelloInfo:
             fw_version=str(msg.get("fw_version", "")),
             keys=int(msg.get("keys", 0)),
             pins=[str(p) for p in (msg.get("pins") or [])],
+            caps=[str(c) for c in (msg.get("caps") or [])],
         )
 
+    def supports(self, cap: str) -> bool:
+        return cap in self.caps
+
+
+@dataclass(frozen=True)
+class Heartbeat:
+    ts: float
+
+    @staticmethod
+    def from_msg(msg: Dict[str, Any]) -> "Heartbeat":
+        return Heartbeat(ts=float(msg.get("ts", time.monotonic())))
+
 
 @dataclass(frozen=True)
 class KeyEvent:
     k: int
     edge: str  # "down" or "up"
     ts: Optional[float] = None
+    # host time.monotonic() when the bytes were read (latency tracing only)
+    rx: Optional[float] = field(default=None, compare=False, repr=False)
 
     @staticmethod
     def from_msg(msg: Dict[str, Any]) -> "KeyEvent":
@@ -60,6 +58,8 @@ class EncoderEvent:
     d: int
     pos: Optional[int] = None
     ts: Optional[float] = None
+    # host time.monotonic() when the bytes were read (latency tracing only)
+    rx: Optional[float] = field(default=None, compare=False, repr=False)
 
     @staticmethod
     def from_msg(msg: Dict[str, Any]) -> "EncoderEvent":
@@ -75,6 +75,8 @@ class ButtonEvent:
     id: int
     edge: str  # "down" / "up"
     ts: Optional[float] = None
+    # host time.monotonic() when the bytes were read (latency tracing only)
+    rx: Optional[float] = field(default=None, compare=False, repr=False)
 
     @staticmethod
     def from_msg(msg: Dict[str, Any]) -> "ButtonEvent":
@@ -84,3 +86,87 @@ class ButtonEvent:
             ts=(float(msg["ts"]) if "ts" in msg else None),
         )
 
+
+# ---- Precompiled decoders for the high-rate messages ----
+# Frozen dataclass __init__ routes every field through object.__setattr__,
+# which costs more than the rest of decoding combined. These build the
+# instance directly; the result is identical (equality, hash, repr) and is
+# still frozen for anyone holding it.
+_new = object.__new__
+
+
+def fast_event(cls: type, fields: Dict[str, Any]) -> Any:
+    ev = _new(cls)
+    ev.__dict__.update(fields)
+    return ev
+
+
+def _decode_key(msg: Dict[str, Any], rx: Optional[float] = None) -> KeyEvent:
+    return fast_event(KeyEvent, {
+        "k": int(msg["k"]),
+        "edge": str(msg["edge"]),
+        "ts": float(msg["ts"]) if "ts" in msg else None,
+        "rx": rx,
+    })
+
+
+def _decode_enc(msg: Dict[str, Any], rx: Optional[float] = None) -> EncoderEvent:
+    return fast_event(EncoderEvent, {
+        "id": int(msg["id"]),
+        "d": int(msg["d"]),
+        "pos": int(msg["pos"]) if "pos" in msg else None,
+        "ts": float(msg["ts"]) if "ts" in msg else None,
+        "rx": rx,
+    })
+
+
+def _decode_btn(msg: Dict[str, Any], rx: Optional[float] = None) -> ButtonEvent:
+    return fast_event(ButtonEvent, {
+        "id": int(msg["id"]),
+        "edge": str(msg["edge"]),
+        "ts": float(msg["ts"]) if "ts" in msg else None,
+        "rx": rx,
+    })
+
+
+def _decode_hb(msg: Dict[str, Any], rx: Optional[float] = None) -> Heartbeat:
+    ts = msg.get("ts")
+    return fast_event(Heartbeat, {"ts": float(ts) if ts is not None else time.monotonic()})
+
+
+# ---- Message registry: "t" tag -> decoder ----
+# The reader resolves each message with one lookup here instead of an if/elif
+# chain. New message types register below (or from their own module).
+# A decoder is decode(msg, rx): rx is the host time the bytes were read, for
+# events that carry it (latency tracing, encoder velocity without a ts).
+Decoder = Callable[[Dict[str, Any], Optional[float]], Any]
+
+
+@dataclass(frozen=True)
+class MessageType:
+    tag: str
+    event_type: type
+    decode: Decoder
+
+
+MESSAGE_TYPES: Dict[str, MessageType] = {}
+
+
+def register_message(tag: str, event_type: type, decode: Optional[Decoder] = None) -> MessageType:
+    """
+    Register (or replace) the decoder for messages with msg["t"] == tag.
+    Without one, event_type.from_msg(msg) is used and rx is dropped.
+    """
+    if decode is None:
+        from_msg = event_type.from_msg
+        decode = lambda msg, rx=None: from_msg(msg)  # noqa: E731
+    mt = MessageType(tag=tag, event_type=event_type, decode=decode)
+    MESSAGE_TYPES[tag] = mt
+    return mt
+
+
+register_message("hello", HelloInfo)
+register_message("hb", Heartbeat, _decode_hb)
+register_message("key", KeyEvent, _decode_key)
+register_message("enc", EncoderEvent, _decode_enc)
+register_message("btn", ButtonEvent, _decode_btn)
@@ -0,0 +1,292 @@
+# src/device/simulator.py
+"""
+PTY-backed virtual Pico for load testing (Linux / macOS).
+
+VirtualPico opens a pseudo-terminal and speaks the same protocol as the
+firmware on the slave side: hello, hb, key, enc and btn (JSON lines, or bin1
+frames once the host negotiates them). Point PicoSerialClient or
+find_pico_data_port(ports=[sim.port]) at sim.port.
+
+Timestamps are host time.monotonic(), so a reader on the same machine can
+compute wire-to-handler latency from ev.ts directly.
+
+    python -m src.device.simulator --enc-rate 500 --burst-every 2 --burst-size 200
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import select
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .binary_protocol import CAP_BIN1, PROTO_REQUEST, SYNC, _frame, encode_msg
+
+
+@dataclass
+class SimConfig:
+    type: str = "pico-macropad-backend"
+    fw_version: str = "sim-1.0"
+    keys: int = 3
+    encoders: int = 1
+    caps: List[str] = field(default_factory=lambda: [CAP_BIN1])
+
+    hb_interval_s: float = 1.0
+    key_rate_hz: float = 0.0          # key taps (down + up) per second
+    enc_rate_hz: float = 0.0          # encoder detents per second
+    btn_rate_hz: float = 0.0          # encoder-button taps per second
+    burst_every_s: float = 0.0        # 0 = no bursts
+    burst_size: int = 0               # encoder events per burst
+    jitter_s: float = 0.0             # +/- uniform jitter on every event time
+    malformed_rate: float = 0.0       # probability a line or bin1 frame is corrupted
+    disconnect_after_s: Optional[float] = None
+    hang_after_s: Optional[float] = None      # go silent but keep the port open
+    seed: Optional[int] = None
+
+
+class VirtualPico:
+    def __init__(self, config: Optional[SimConfig] = None):
+        self.config = config or SimConfig()
+        self.port: Optional[str] = None
+        self.binary = False
+        self.sent: Dict[str, int] = {"hello": 0, "hb": 0, "key": 0, "enc": 0, "btn": 0, "bad": 0}
+
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._enc_pos = [0] * max(1, self.config.encoders)
+        self._inbuf = bytearray()
+
+    # ---- Lifecycle ----
+    def start(self) -> str:
+        import pty
+        import tty
+
+        self.stop()
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)  # no echo, no CR/LF translation
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self.binary = False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="virtual-pico")
+        self._thread.start()
+        return self.port
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread and self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        self.unplug()
+        if self._slave is not None:
+            try:
+                os.close(self._slave)
+            except OSError:
+                pass
+            self._slave = None
+
+    def unplug(self) -> None:
+        """Close the device side; the host's next read fails like a USB unplug."""
+        with self._lock:
+            if self._master is not None:
+                try:
+                    os.close(self._master)
+                except OSError:
+                    pass
+                self._master = None
+
+    # ---- Injection (also usable directly from tests) ----
+    def send(self, msg: Dict) -> None:
+        if self.binary:
+            is_frame, data = encode_msg(msg)
+        else:
+            is_frame, data = False, (json.dumps(msg, separators=(",", ":")) + "\n").encode("utf-8")
+        if self.config.malformed_rate and self._rng.random() < self.config.malformed_rate:
+            data = self._corrupt_frame(data) if is_frame else self._corrupt(data)
+            self.sent["bad"] += 1
+        self._write(data)
+        self.sent[msg["t"]] = self.sent.get(msg["t"], 0) + 1
+
+    def send_hello(self) -> None:
+        c = self.config
+        self.send({
+            "t": "hello", "type": c.type, "fw_version": c.fw_version,
+            "keys": c.keys, "pins": [f"GP{i}" for i in range(c.keys)], "caps": list(c.caps),
+        })
+
+    def send_hb(self) -> None:
+        self.send({"t": "hb", "ts": time.monotonic()})
+
+    def send_key(self, k: int, edge: str) -> None:
+        self.send({"t": "key", "k": k, "edge": edge, "ts": time.monotonic()})
+
+    def send_enc(self, eid: int, d: int) -> None:
+        self._enc_pos[eid] += d
+        self.send({"t": "enc", "id": eid, "d": d, "pos": self._enc_pos[eid], "ts": time.monotonic()})
+
+    def send_btn(self, bid: int, edge: str) -> None:
+        self.send({"t": "btn", "id": bid, "edge": edge, "ts": time.monotonic()})
+
+    # ---- Internals ----
+    def _write(self, data: bytes) -> None:
+        # The master is non-blocking: when the host stops reading and the pty
+        # buffer fills up, wait for room in short slices so stop()/unplug()
+        # are never stuck behind a blocked write.
+        view = memoryview(data)
+        while view:
+            with self._lock:
+                if self._master is None:
+                    return
+                try:
+                    n = os.write(self._master, view)
+                    view = view[n:]
+                    continue
+                except BlockingIOError:
+                    master = self._master
+                except OSError:
+                    self._master = None
+                    return
+            if self._stop.is_set():
+                return
+            try:
+                select.select([], [master], [], 0.05)
+            except (OSError, ValueError):
+                return
+
+    def _corrupt(self, data: bytes) -> bytes:
+        kind = self._rng.randrange(3)
+        if kind == 0:
+            return data[: max(1, len(data) // 2)] + b"\n"          # truncated
+        if kind == 1:
+            return b"\xff\xfe" + data                                  # garbage prefix
+        return data.replace(b":", b"", 1)                             # broken JSON
+
+    def _corrupt_frame(self, data: bytes) -> bytes:
+        kind = self._rng.randrange(3)
+        if kind == 0:
+            i = self._rng.randrange(3, len(data) - 2)
+            return data[:i] + bytes((data[i] ^ 0xFF,)) + data[i + 1:]  # crc mismatch
+        if kind == 1:
+            return _frame(0x7F, data[3:-2])                           # unknown type
+        return bytes((SYNC, 0x13, 0x00)) + data                       # stray sync byte to resync past
+
+    def _poll_host(self) -> None:
+        """Handle host -> device lines (bin1 negotiation)."""
+        master = self._master
+        if master is None:
+            return
+        try:
+            r, _, _ = select.select([master], [], [], 0)
+            if not r:
+                return
+            self._inbuf += os.read(master, 1024)
+        except OSError:
+            return
+        while b"\n" in self._inbuf:
+            line, _, rest = bytes(self._inbuf).partition(b"\n")
+            self._inbuf = bytearray(rest)
+            if line + b"\n" == PROTO_REQUEST and CAP_BIN1 in self.config.caps:
+                self.binary = True
+
+    def _next(self, rate_hz: float, prev: float) -> float:
+        if rate_hz <= 0:
+            return float("inf")
+        j = self.config.jitter_s
+        return prev + 1.0 / rate_hz + (self._rng.uniform(-j, j) if j else 0.0)
+
+    def _run(self) -> None:
+        c = self.config
+        start = time.monotonic()
+        self.send_hello()
+
+        now = time.monotonic()
+        t_hb = now + c.hb_interval_s if c.hb_interval_s > 0 else float("inf")
+        t_key = self._next(c.key_rate_hz, now)
+        t_enc = self._next(c.enc_rate_hz, now)
+        t_btn = self._next(c.btn_rate_hz, now)
+        t_burst = now + c.burst_every_s if c.burst_every_s > 0 and c.burst_size > 0 else float("inf")
+
+        while not self._stop.is_set() and self._master is not None:
+            self._poll_host()
+            now = time.monotonic()
+
+            if c.disconnect_after_s is not None and now - start >= c.disconnect_after_s:
+                self.unplug()
+                break
+            if c.hang_after_s is not None and now - start >= c.hang_after_s:
+                self._stop.wait(0.05)
+                continue
+
+            if now >= t_hb:
+                self.send_hb()
+                t_hb = now + c.hb_interval_s
+            # Catch up when the loop falls behind so the configured rates hold
+            while now >= t_key:
+                k = self._rng.randrange(max(1, c.keys))
+                self.send_key(k, "down")
+                self.send_key(k, "up")
+                t_key = self._next(c.key_rate_hz, t_key)
+            while now >= t_enc:
+                self.send_enc(self._rng.randrange(len(self._enc_pos)), self._rng.choice((1, -1)))
+                t_enc = self._next(c.enc_rate_hz, t_enc)
+            while now >= t_btn:
+                self.send_btn(0, "down")
+                self.send_btn(0, "up")
+                t_btn = self._next(c.btn_rate_hz, t_btn)
+            if now >= t_burst:
+                d = self._rng.choice((1, -1))
+                for _ in range(c.burst_size):
+                    self.send_enc(0, d)
+                t_burst = now + c.burst_every_s
+
+            wait = min(t_hb, t_key, t_enc, t_btn, t_burst) - time.monotonic()
+            if wait > 0:
+                self._stop.wait(min(wait, 0.05))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Run a PTY-backed virtual Pico macropad.")
+    ap.add_argument("--keys", type=int, default=3)
+    ap.add_argument("--encoders", type=int, default=1)
+    ap.add_argument("--hb", type=float, default=1.0, help="heartbeat interval (s)")
+    ap.add_argument("--key-rate", type=float, default=0.0)
+    ap.add_argument("--enc-rate", type=float, default=0.0)
+    ap.add_argument("--btn-rate", type=float, default=0.0)
+    ap.add_argument("--burst-every", type=float, default=0.0)
+    ap.add_argument("--burst-size", type=int, default=0)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--malformed", type=float, default=0.0)
+    ap.add_argument("--disconnect-after", type=float, default=None)
+    ap.add_argument("--hang-after", type=float, default=None)
+    ap.add_argument("--json-only", action="store_true", help="don't advertise bin1")
+    args = ap.parse_args()
+
+    sim = VirtualPico(SimConfig(
+        keys=args.keys, encoders=args.encoders, hb_interval_s=args.hb,
+        key_rate_hz=args.key_rate, enc_rate_hz=args.enc_rate, btn_rate_hz=args.btn_rate,
+        burst_every_s=args.burst_every, burst_size=args.burst_size, jitter_s=args.jitter,
+        malformed_rate=args.malformed, disconnect_after_s=args.disconnect_after,
+        hang_after_s=args.hang_after,
+        caps=[] if args.json_only else [CAP_BIN1],
+    ))
+    print(f"Virtual Pico on {sim.start()}  (Ctrl+C to stop)")
+    try:
+        while sim._thread and sim._thread.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
+        print(f"sent: {sim.sent}")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,7 @@ class MacroGrid(QFrame):
     """A 12-key grid for macro assignment with full theme support."""
 
     button_selected = pyqtSignal(int)  # NEW: emitted when a key is clicked
+    macro_assigned = pyqtSignal(int, str)  # key_id, macro_id: a macro was dropped on a key
 
 
     def __init__(self, key_names=None, encoders=None):
@@ -65,6 +66,7 @@ class MacroGrid(QFrame):
 
             button = MacroButton(key_name, key_id)
             button.selected.connect(self.button_selected)
+            button.macro_assigned.connect(self.macro_assigned)
             self.key_buttons[key_id] = button
             layout.addWidget(button, r, c)
 
@@ -172,6 +174,7 @@ class MacroButton(QPushButton):
     """Represents a macro key capable of receiving drag-and-drop macro IDs."""
 
     selected = pyqtSignal(int)  # NEW: emit when clicked
+    macro_assigned = pyqtSignal(int, str)  # emitted after a successful drop
     RADIUS = 6  # Unified UI radius
 
     def __init__(self, label, key_id):
@@ -284,6 +287,7 @@ class MacroButton(QPushButton):
 
             logger.info(f"Macro '{macro_id}' assigned to {macro_label}")
             event.acceptProposedAction()
+            self.macro_assigned.emit(self.key_id, macro_id)
 
         except Exception as e:
             logger.error(f"Drop failed: {e}")
@@ -12,7 +12,7 @@ from PyQt6.QtWidgets import (
     QSplitter, QStatusBar, QMenuBar
 )
 from PyQt6.QtCore import (
-    Qt, QTimer
+    Qt, QTimer, pyqtSignal
 )
 
 from src.utils.device_profile_manager import get_default_device_profile, match_device_profile
@@ -23,13 +23,22 @@ from src.gui.sidebar import Sidebar
 from src.gui.macro_palette import MacroPalette
 from src.gui.macro_grid import MacroGrid
 from src.gui.styles import THEME_PALETTES, get_theme, build_app_stylesheet
-from src.utils.config_manager import load_macros, save_macros
+from src.utils.config_manager import load_all_macros, save_macros
 from src.utils.profile_manager import display_to_id
 from src.device import PicoSerialClient, DeviceScanner
+from src.device.hotplug import AutoReconnector
+from src.device.link_health import LinkHealthMonitor
+from src.device.protocol import Heartbeat, KeyEvent, EncoderEvent, ButtonEvent
 
 
-from concurrent.futures import ThreadPoolExecutor
-from src.utils.macro_executor import execute_macro_by_id
+from src.utils.injection_queue import InjectionQueue
+from src.utils.input_dispatcher import InputDispatcher
+from src.utils.profile_store import ProfileStore
+from src.utils.macro_executor import (
+    add_plans_listener, cancel_sequences, get_backend, remove_plans_listener, shutdown_launcher, warm_launcher,
+)
+from src.utils.clipboard import restore_clipboard_now
+from src.utils.latency import LATENCY
 import time  
 
 
@@ -39,6 +48,12 @@ logger = setup_logger(__name__)
 
 class MainWindow(QMainWindow):
 
+    # (binding name, input id) fired by the reader-side dispatcher; queued to
+    # the GUI thread for visual feedback only
+    binding_fired = pyqtSignal(str, int)
+    # (active profile, selected profile) after a switch, incl. macropad layer keys
+    layer_changed = pyqtSignal(str, str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("MNAV Macropad Configurator")
@@ -51,7 +66,10 @@ class MainWindow(QMainWindow):
         self.selected_key = None
         self._bindings = {}
         self.device_profile = get_default_device_profile()  
-        self.device = PicoSerialClient()
+        # Batch mode: one events_batch per event-loop tick instead of one
+        # queued signal per message (fast encoder spins flood the loop otherwise)
+        # MNAV_KEYSTATE_SHM=<name> mirrors key state into shared memory for external tools
+        self.device = PicoSerialClient(batch=True, key_state_shm=os.getenv("MNAV_KEYSTATE_SHM") or None)
         self.device.connected.connect(self.on_device_connected)
         self.device.disconnected.connect(self.on_device_disconnected)
         self.device.hello.connect(self.on_device_hello)
@@ -59,6 +77,7 @@ class MainWindow(QMainWindow):
         self.device.key_event.connect(self.on_device_key)
         self.device.encoder_event.connect(self.on_device_encoder)
         self.device.button_event.connect(self.on_device_button)
+        self.device.events_batch.connect(self.on_device_batch)
 
         self.device.parse_error.connect(self.on_device_parse_error)
         self.scanner = DeviceScanner(timeout_s=2.5)  # 2.5 is snappy and used to accomidate the encoder
@@ -68,21 +87,50 @@ class MainWindow(QMainWindow):
         self.scanner.error.connect(self._on_scan_error)
         self.scanner.scanning.connect(self._on_scanning_state)
 
+        # Re-attach automatically after unplug/re-plug (debounced, backoff)
+        self.reconnector = AutoReconnector(self.device, self.scanner)
+        self.reconnector.reattached.connect(
+            lambda s: self.status_bar.showMessage(f"Device re-attached ({s * 1000:.0f} ms)")
+        )
+        self.reconnector.start()
 
-        self._macro_workers = ThreadPoolExecutor(max_workers=2)
+        # Detect a hung device (port open, no heartbeats) and reset the link
+        self.link_health = LinkHealthMonitor(self.device)
+        self.link_health.stalled.connect(
+            lambda age: self.status_bar.showMessage(f"Device stalled ({age * 1000:.0f} ms without heartbeat) — resetting link...")
+        )
 
-# Key cooldown tracking to prevent macro spam when holding down a key
-        self._last_fire = {}          # dict[int, float]
-        self._fire_cooldown_s = 0.15  # 150ms; tweak 0.10–0.25 to taste
+        # One ordered consumer so hotkeys never interleave their modifiers;
+        # bounded so a stuck injection can't build an unbounded backlog
+        self._injector = InjectionQueue(max_depth=32, policy="drop_oldest")
+        self._injector.start()
+        get_backend()  # create the injection backend now, not on the first macro
+        warm_launcher()
 
-# Encoder state tracking for better macro binding and to prevent spam when spinning
-        self._enc_accum = 0
-        self._enc_last_fire = 0.0
-        self._enc_cooldown_s = 0.05   # limits fire rate while spinning
+# Every profile is compiled once into memory (binding table, rate limits,
+# chords, encoder acceleration); switching profiles or layers is a pointer swap
         self._enc_steps_per_action = 1  # set to 2 or 4 if your encoder reports multiple ticks per detent
-
-        self._btn_last_fire = {}
-        self._btn_cooldown_s = 0.15   # button debounce
+        names = list(self.device_profile.ui_keys)
+        for enc in self.device_profile.ui_encoders:
+            names += [f"{enc}_CW", f"{enc}_CCW", f"{enc}_BTN"]
+        self._profiles = ProfileStore(
+            names, encoders=len(self.device_profile.ui_encoders), steps_per_action=self._enc_steps_per_action
+        )
+        self._profiles.load(load_all_macros())
+
+# Macros are resolved and fired on the serial reader thread, so GUI load never
+# delays them; the GUI only gets binding_fired / layer_changed for feedback
+        self._dispatcher = InputDispatcher(
+            self._injector,
+            self._profiles,
+            feedback=lambda b, ev, _n: self.binding_fired.emit(b.name, int(getattr(ev, "id", -1))),
+            on_layer=lambda active, base: self.layer_changed.emit(active, base),
+        )
+        self._dispatcher.start()
+        add_plans_listener(self._dispatcher.recompile)  # tables hold plans
+        self.binding_fired.connect(self._on_binding_fired)
+        self.layer_changed.connect(self._on_layer_changed)
+        self.device.set_inline_handler(self._dispatcher.handle)
 
 
 
@@ -104,6 +152,7 @@ class MainWindow(QMainWindow):
         self.setMenuBar(menu_bar)
 
         file_menu = menu_bar.addMenu("File")
+        file_menu.addAction("Dump Latency Stats", self._dump_latency_stats)
         file_menu.addAction("Exit", self.close)
 
         theme_menu = menu_bar.addMenu("Theme")
@@ -148,6 +197,7 @@ class MainWindow(QMainWindow):
 
         # Key selection from the grid
         self.grid.button_selected.connect(self._on_key_selected)
+        self.grid.macro_assigned.connect(self._on_macro_assigned)
 
         splitter.setSizes([240, 240, 600])
         main_layout.addWidget(splitter)
@@ -162,18 +212,20 @@ class MainWindow(QMainWindow):
 
         # Set default profile
         self.current_profile = self.sidebar.get_current_profile()
-        self.load_macros()
+        self._show_profile()
 
     # ---------------------------
     # Event Handlers
     # ---------------------------
     def _on_connect(self):
+        self.reconnector.resume()
         self.status_bar.showMessage("Searching for device...")
         self.scanner.scan()
 
 
 
     def _on_disconnect(self):
+        self.reconnector.suspend()
         self.device.stop()
         self.status_bar.showMessage("Disconnected.")
         logger.info("Device disconnected by user.")
@@ -192,8 +244,11 @@ class MainWindow(QMainWindow):
     # ---------------------------
     def _on_profile_changed(self, profile_name):
         self.current_profile = profile_name
+        # Queued macros and running sequences belong to the old profile's bindings
+        self._injector.cancel()
+        cancel_sequences()
         self.status_bar.showMessage(f"Active profile: {profile_name}")
-        self.load_macros()
+        self._show_profile()
 
 
 
@@ -210,7 +265,9 @@ class MainWindow(QMainWindow):
     def _on_scan_found(self, port: str):
         self.status_bar.showMessage(f"Device found on {port} — connecting...")
         logger.info(f"Device scan found: {port}")
-        self.device.start(port)
+        # Busy or gone again: the reconnector treats it as a failed scan
+        if not self.reconnector.attach(port):
+            self.status_bar.showMessage(f"Device found on {port} but it can't be opened.")
 
     def _on_scan_not_found(self):
         self.status_bar.showMessage("No device found.")
@@ -248,115 +305,64 @@ class MainWindow(QMainWindow):
         # This avoids stale UI state (your earlier bug: previous profile still displayed)
         self.grid.reset_grid()
 
-        # Load macros for current profile (UI-side bindings)
+        # Show the current profile's bindings (from memory, no disk read)
         # This will populate labels/colors/etc based on saved assignments
-        self.load_macros()
+        self._show_profile()
 
     def on_device_hb(self, ts: float):
-        # Optional: could update an "alive" indicator in sidebar later
-        pass
+        self.link_health.on_heartbeat(ts)
 
+    # Visual feedback only: the reader-side dispatcher has already fired
+    # whatever these events are bound to.
     def on_device_key(self, ev):
-        ui_key_id = int(ev.k) + 1  # device 0-based -> UI 1-based
-
-        btn = self.grid.key_buttons.get(ui_key_id)
+        LATENCY.since("feedback", ev.rx)
+        btn = self.grid.key_buttons.get(int(ev.k) + 1)  # device 0-based -> UI 1-based
         if not btn:
             return
 
         if ev.edge == "down":
             btn.setChecked(True)
-
-            # --- Cooldown / debounce to prevent spam ---
-            now = time.monotonic()
-            last = float(self._last_fire.get(ui_key_id, 0.0))
-            if (now - last) < self._fire_cooldown_s:
-                return
-            self._last_fire[ui_key_id] = now
-
-            macro_id = btn.property("macro_id") or ""
-            # Execute in worker thread so UI never freezes
-            if macro_id:
-                self._macro_workers.submit(execute_macro_by_id, macro_id)
-
         elif ev.edge == "up":
             btn.setChecked(False)
 
     def on_device_encoder(self, ev):
-        d = int(ev.d)
-        if d == 0:
-            return
-
-        # Accumulate deltas so we can "quantize" into actions
-        self._enc_accum += d
-
-        # Throttle so fast spins don't flood the executor
-        now = time.monotonic()
-        if (now - self._enc_last_fire) < self._enc_cooldown_s:
-            return
-
-        # Determine how many actions to fire based on accumulated steps
-        step = int(self._enc_steps_per_action)
-        if step <= 0:
-            step = 1
-
-        actions = 0
-        binding_key = None
-
-        if self._enc_accum >= step:
-            actions = self._enc_accum // step
-            self._enc_accum = self._enc_accum % step
-            binding_key = "E0_CW"
-
-        elif self._enc_accum <= -step:
-            actions = (-self._enc_accum) // step
-            self._enc_accum = -((-self._enc_accum) % step)
-            binding_key = "E0_CCW"
-
-        else:
-            return
-
-        # ✅ unified bindings dict (keys + encoder + future inputs)
-        macro_id = (self._bindings.get(binding_key) or "").strip()
-        if not macro_id:
-            return
-
-        self._enc_last_fire = now
-        self.grid.pulse_encoder(ev.id, ms=60)
-
-        # Fire once per "action" so a fast spin can trigger multiple steps,
-        # but still limited by cooldown above.
-        for _ in range(actions):
-            self._macro_workers.submit(execute_macro_by_id, macro_id)
-
-
-
+        LATENCY.since("feedback", ev.rx)
 
     def on_device_button(self, ev):
-        if ev.edge != "down":
-            return
-
-        now = time.monotonic()
-        last = float(self._btn_last_fire.get(ev.id, 0.0))
-        if (now - last) < self._btn_cooldown_s:
-            return
-        self._btn_last_fire[ev.id] = now
-        self.grid.pulse_encoder(ev.id, ms=90)
+        LATENCY.since("feedback", ev.rx)
 
-        macro_id = (self._bindings.get("E0_BTN") or "").strip()
-        if macro_id:
-            self._macro_workers.submit(execute_macro_by_id, macro_id)
+    def _on_binding_fired(self, name: str, input_id: int):
+        if name.startswith("E") and input_id >= 0:
+            self.grid.pulse_encoder(input_id, ms=90 if name.endswith("_BTN") else 60)
 
 
 
-    
-
 
+    def on_device_batch(self, events):
+        # Same handlers as the per-message signals, in arrival order
+        for ev in events:
+            if isinstance(ev, KeyEvent):
+                self.on_device_key(ev)
+            elif isinstance(ev, EncoderEvent):
+                self.on_device_encoder(ev)
+            elif isinstance(ev, ButtonEvent):
+                self.on_device_button(ev)
+            elif isinstance(ev, Heartbeat):
+                self.on_device_hb(ev.ts)
 
     def on_device_parse_error(self, text: str):
         # Useful while stabilizing the protocol
         logger.warning(f"Device parse error: {text}")
 
 
+    def _dump_latency_stats(self):
+        path = LATENCY.dump(os.path.join("logs", "latency_stats.json"))
+        logger.info("Input latency:\n" + LATENCY.format_table())
+        logger.info(f"Injection queue: {self._injector.stats()}")
+        logger.info(f"Dispatcher: {self._dispatcher.stats()}")
+        self.status_bar.showMessage(f"Latency stats written to {path}")
+
+
     # ---------------------------
     # Key Selection + Clearing
     # ---------------------------
@@ -365,8 +371,17 @@ class MainWindow(QMainWindow):
         self.sidebar.clear_key_btn.setEnabled(True)
         self.status_bar.showMessage(f"Selected key: K{key_id}")
         
+    def _on_macro_assigned(self, key_id: int, macro_id: str):
+        # Dropped on the grid: live right away, persisted on Save
+        binding_key = f"K{key_id}"
+        self._bindings[binding_key] = macro_id
+        self._injector.cancel([binding_key])
+        self._recompile_profile()
+
     def _on_encoder_binding_changed(self, binding_key: str, macro_id: str):
         self._bindings[binding_key] = macro_id or ""
+        self._injector.cancel([binding_key])
+        self._recompile_profile()
         # persist immediately (simple + safe)
         profile_id = display_to_id(self.current_profile)
         save_macros(profile=profile_id, macros=self._bindings)
@@ -409,20 +424,29 @@ class MainWindow(QMainWindow):
         merged.update(self.grid.get_macro_assignments())
 
         self._bindings = merged
+        self._recompile_profile()
         save_macros(profile=profile_id, macros=merged)
 
         self.status_bar.showMessage(f"Saved macros for profile: {self.current_profile}")
 
 
     def load_macros(self):
+        # Re-read every profile from disk (Load button), then show the current one
+        self._profiles.load(load_all_macros())
+        self._show_profile()
+        self.status_bar.showMessage(f"Loaded macros for profile: {self.current_profile}")
+
+    def _show_profile(self):
         profile_id = display_to_id(self.current_profile)
-        macros = load_macros(profile=profile_id) or {}
 
         # Always store the full profile binding map (K1.., E0_CW.. etc.)
-        self._bindings = macros
+        self._bindings = self._profiles.bindings(profile_id)
+
+        # Already compiled: makes it the dispatcher's active profile (pointer swap)
+        self._dispatcher.select(profile_id)
 
         # Only apply the K* keys to the grid
-        self.grid.load_macro_assignments(macros)
+        self.grid.load_macro_assignments(self._bindings)
 
         # Apply encoder bindings to sidebar dropdowns (if you added them)
         try:
@@ -430,8 +454,17 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
-        self.status_bar.showMessage(f"Loaded macros for profile: {self.current_profile}")
+    def _recompile_profile(self):
+        # One profile edited: recompile it and let the dispatcher pick it up
+        profile_id = display_to_id(self.current_profile)
+        self._profiles.update(profile_id, self._bindings)
+        self._dispatcher.refresh(profile_id)
 
+    def _on_layer_changed(self, active: str, base: str):
+        if active != base:
+            self.status_bar.showMessage(f"Layer: {active} (profile {base})")
+        else:
+            self.status_bar.showMessage(f"Active profile: {self.current_profile}")
 
 
 
@@ -440,8 +473,14 @@ class MainWindow(QMainWindow):
     # Qt Lifecycle Overrides
     # ---------------------------
     def closeEvent(self, event):
+        try:
+            self.reconnector.suspend()
+            self.reconnector.stop()
+        except Exception:
+            pass
         try:
             self.device.stop()
+            self.device.key_state.close()
         except Exception:
             pass
         try:
@@ -449,7 +488,13 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
         try:
-            self._macro_workers.shutdown(wait=False, cancel_futures=True)
+            self.device.set_inline_handler(None)
+            remove_plans_listener(self._dispatcher.recompile)
+            self._dispatcher.stop()
+            self._injector.stop()
+            cancel_sequences()
+            shutdown_launcher()
+            restore_clipboard_now()  # a paste's restore may still be pending
         except Exception:
             pass
         super().closeEvent(event)
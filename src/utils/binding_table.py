@@ -0,0 +1,140 @@
+# src/utils/binding_table.py
+"""
+Compiled binding resolution for event dispatch.
+
+A profile's binding map ("K1": "macro_copy", "E0_CW": "macro_vol_up", ...) is
+compiled once, when a profile is loaded or saved, into a flat list indexed by
+input id and row:
+
+    index = id << 2 | row      row: ROW_KEY (key down), ROW_CW, ROW_CCW, ROW_BTN
+
+Each entry is a Binding holding the precompiled MacroPlan, the binding name
+(queue source / log text) and its rate limiter slot, or None when the input
+is unbound. Dispatch is one index and no string building, dict lookups or
+widget reads. Chord bindings ("K1+K3") are kept in a small name -> Binding
+map, since the chord engine reports them by name.
+
+Layer bindings switch the active profile from the macropad itself (see
+InputDispatcher); they're allowed on keys and encoder buttons:
+
+    "K12": "layer:editing"           momentary: active while held
+    "E0_BTN": "layer_toggle:gaming"  toggle: press to enter, press again to leave
+
+Values that aren't macro ids (old label-only assignments, "") are treated
+as unbound; ids that don't resolve to a plan are reported once, at compile
+time. Tables hold plans: rebuild_macro_plans() notifies its listeners, and
+InputDispatcher.recompile() (registered by MainWindow) recompiles them.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+from src.utils.logger import setup_logger
+from src.utils.macro_executor import MacroPlan, get_macro_plan, macro_exists
+from src.utils.rate_limiter import RateLimiter
+
+logger = setup_logger(__name__)
+
+ROW_KEY, ROW_CW, ROW_CCW, ROW_BTN = 0, 1, 2, 3
+_ROW_SHIFT = 2
+
+LAYER_HOLD_PREFIX = "layer:"
+LAYER_TOGGLE_PREFIX = "layer_toggle:"
+
+_KEY_RE = re.compile(r"^K(\d+)$")
+_ENC_RE = re.compile(r"^E(\d+)_(CW|CCW|BTN)$")
+_ENC_ROWS = {"CW": ROW_CW, "CCW": ROW_CCW, "BTN": ROW_BTN}
+
+
+@dataclass(frozen=True)
+class Binding:
+    name: str            # "K1", "E0_CW", "K1+K3": queue source and log text
+    macro_id: str        # macro id, or the layer binding value
+    plan: Optional[MacroPlan]
+    slot: int            # RateLimiter slot for name
+    layer: str = ""      # profile id for layer bindings (plan is None)
+    toggle: bool = False
+
+
+def parse_binding_name(name: str) -> Optional[tuple]:
+    """ "K1" -> (ROW_KEY, 0) (device index), "E0_CW" -> (ROW_CW, 0); None otherwise."""
+    m = _KEY_RE.match(name)
+    if m:
+        k = int(m.group(1)) - 1  # UI keys are 1-based
+        return (ROW_KEY, k) if k >= 0 else None
+    m = _ENC_RE.match(name)
+    if m:
+        return _ENC_ROWS[m.group(2)], int(m.group(1))
+    return None
+
+
+class BindingTable:
+    def __init__(self):
+        self._table: List[Optional[Binding]] = []
+        self._chords: Dict[str, Binding] = {}
+        self.layers: Set[str] = set()   # profile ids this table can switch to
+        self.bound = 0
+
+    @staticmethod
+    def compile(bindings: Dict[str, Any], limiter: RateLimiter) -> "BindingTable":
+        table = BindingTable()
+        entries = []
+        missing = []
+        for name, value in (bindings or {}).items():
+            if name.startswith("_") or not isinstance(value, str):
+                continue  # profile settings ("_rate_limits", ...)
+            macro_id = value.strip()
+            if macro_id.startswith((LAYER_HOLD_PREFIX, LAYER_TOGGLE_PREFIX)):
+                table._add_layer(name, macro_id, entries)
+                continue
+            if "_" not in macro_id:
+                continue  # unassigned, or a label-only assignment
+            plan = get_macro_plan(macro_id)
+            if plan is None:
+                if not macro_exists(macro_id):  # else a no-op plan (scroll dy=0)
+                    missing.append(f"{name}={macro_id}")
+                continue
+            binding = Binding(name, macro_id, plan, limiter.slot(name))
+            if "+" in name:
+                table._chords[name] = binding
+                continue
+            where = parse_binding_name(name)
+            if where is None:
+                logger.warning(f"Ignoring binding with unknown input name: {name!r}")
+                continue
+            entries.append(((where[1] << _ROW_SHIFT) | where[0], binding))
+
+        size = max((i for i, _ in entries), default=-1) + 1
+        table._table = [None] * size
+        for i, binding in entries:
+            table._table[i] = binding
+        table.bound = len(entries) + len(table._chords)
+        if missing:
+            logger.warning(f"Bindings with no runnable macro: {', '.join(missing)}")
+        return table
+
+    def _add_layer(self, name: str, value: str, entries: list) -> None:
+        toggle = value.startswith(LAYER_TOGGLE_PREFIX)
+        layer = value.split(":", 1)[1].strip()
+        where = parse_binding_name(name)
+        if not layer or where is None or where[0] not in (ROW_KEY, ROW_BTN):
+            logger.warning(f"Ignoring layer binding {name}={value!r} (layers go on keys or encoder buttons)")
+            return
+        binding = Binding(name, value, None, -1, layer=layer, toggle=toggle)
+        entries.append(((where[1] << _ROW_SHIFT) | where[0], binding))
+        self.layers.add(layer)
+
+    # ---- Dispatch ----
+    def get(self, row: int, idx: int) -> Optional[Binding]:
+        i = (idx << _ROW_SHIFT) | row
+        table = self._table
+        return table[i] if 0 <= i < len(table) else None
+
+    def chord(self, name: str) -> Optional[Binding]:
+        return self._chords.get(name)
+
+    def __len__(self) -> int:
+        return self.bound
+
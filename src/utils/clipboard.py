@@ -0,0 +1,148 @@
+# src/utils/clipboard.py
+"""
+Minimal clipboard access for the text macro paste strategy.
+
+Runs off the GUI thread (the injection worker), so it can't use QClipboard;
+it shells out to the platform tools instead.
+
+borrow_clipboard() is what a paste uses: it saves the user's clipboard, puts
+the macro text there and restores the saved contents restore_after_s later,
+once the target app has had time to read the paste. It returns False (the
+caller types instead) when no tool is available or the current contents
+can't be read back, so a paste never destroys what the user had copied.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from typing import List, Optional, Tuple
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_TOOLS: Optional[Tuple[List[str], List[str]]] = None   # (copy cmd, paste cmd)
+_TOOLS_RESOLVED = False
+
+# Pending restore: the user's contents, saved by the first of a run of borrows
+_restore_lock = threading.Lock()
+_restore_gen = 0
+_restore_timer: Optional[threading.Timer] = None
+_saved: Optional[str] = None
+
+
+def _find_tools() -> Optional[Tuple[List[str], List[str]]]:
+    if sys.platform == "darwin":
+        candidates = [(["pbcopy"], ["pbpaste"])]
+    elif sys.platform.startswith("win"):
+        candidates = [(["clip"], [
+            "powershell", "-NoProfile", "-Command",
+            "[Console]::OutputEncoding = [Text.Encoding]::UTF8; Get-Clipboard -Raw",
+        ])]
+    else:
+        candidates = []
+        if os.getenv("WAYLAND_DISPLAY"):
+            candidates.append((["wl-copy"], ["wl-paste", "--no-newline"]))
+        candidates += [
+            (["xclip", "-selection", "clipboard"], ["xclip", "-selection", "clipboard", "-o"]),
+            (["xsel", "--clipboard", "--input"], ["xsel", "--clipboard", "--output"]),
+        ]
+    for copy, paste in candidates:
+        if shutil.which(copy[0]) and shutil.which(paste[0]):
+            return copy, paste
+    return None
+
+
+def _tools() -> Optional[Tuple[List[str], List[str]]]:
+    global _TOOLS, _TOOLS_RESOLVED
+    if not _TOOLS_RESOLVED:
+        _TOOLS = _find_tools()
+        _TOOLS_RESOLVED = True
+        if _TOOLS is None:
+            logger.warning("No clipboard tool found; text macros will be typed instead of pasted")
+    return _TOOLS
+
+
+def get_clipboard_text(timeout_s: float = 1.0) -> Optional[str]:
+    """The clipboard's text, or None if it can't be read (no tool, non-text contents)."""
+    tools = _tools()
+    if tools is None:
+        return None
+    try:
+        out = subprocess.run(tools[1], capture_output=True, timeout=timeout_s, check=True).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    try:
+        text = out.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    if sys.platform.startswith("win") and text.endswith("\r\n"):
+        text = text[:-2]  # Get-Clipboard -Raw still ends with a newline
+    return text
+
+
+def set_clipboard_text(text: str, timeout_s: float = 1.0) -> bool:
+    tools = _tools()
+    if tools is None:
+        return False
+
+    # clip.exe reads the console code page; UTF-16 with BOM round-trips everything
+    data = ("\ufeff" + text).encode("utf-16-le") if tools[0][0] == "clip" else text.encode("utf-8")
+    try:
+        subprocess.run(tools[0], input=data, timeout=timeout_s, check=True)
+        return True
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Clipboard copy failed: {e}")
+        return False
+
+
+def borrow_clipboard(text: str, restore_after_s: float = 0.3) -> bool:
+    """
+    Put text on the clipboard for a paste and restore the user's contents
+    restore_after_s later. Back-to-back borrows keep the contents saved by
+    the first one and push the restore out. False: nothing was changed.
+    """
+    global _restore_gen, _restore_timer, _saved
+    with _restore_lock:
+        pending = _restore_timer is not None
+        if pending:
+            _restore_timer.cancel()
+        else:
+            _saved = get_clipboard_text()
+            if _saved is None:
+                logger.info("Clipboard contents can't be saved; typing instead of pasting")
+                return False
+        ok = set_clipboard_text(text)
+        if not ok and not pending:
+            _saved = None
+            return False
+        # Also after a failed copy: an earlier borrow's text may still be there
+        _restore_gen += 1
+        _restore_timer = threading.Timer(restore_after_s, _restore, (_restore_gen,))
+        _restore_timer.daemon = True
+        _restore_timer.start()
+        return ok
+
+
+def _restore(gen: int) -> None:
+    global _restore_timer, _saved
+    with _restore_lock:
+        if gen != _restore_gen:
+            return  # superseded by a later borrow
+        saved, _saved, _restore_timer = _saved, None, None
+        if saved is not None:
+            set_clipboard_text(saved)
+
+
+def restore_clipboard_now() -> None:
+    """Run a pending restore immediately (shutdown)."""
+    with _restore_lock:
+        timer = _restore_timer
+        if timer is None:
+            return
+        timer.cancel()
+        gen = _restore_gen
+    _restore(gen)
@@ -1,25 +1,93 @@
-import json, os
+import json, os, threading
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
 
 CONFIG_PATH = os.path.join("config", "macros.json")
 
+# The parsed macros.json is kept in memory and revalidated with one stat():
+# it's only re-read when its (mtime, size, inode) changed, i.e. someone else
+# edited it. Our own saves update the cache instead of re-reading the file.
+_cache_lock = threading.Lock()
+_cache_path = None
+_cache_stamp = None
+_cache_data = {}
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _document():
+    """The parsed config document (cached; caller must hold _cache_lock)."""
+    global _cache_path, _cache_stamp, _cache_data
+    stamp = _stamp(CONFIG_PATH)
+    if _cache_path == CONFIG_PATH and stamp == _cache_stamp:
+        return _cache_data
+    data = {}
+    if stamp is not None:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    _cache_path, _cache_stamp, _cache_data = CONFIG_PATH, stamp, data
+    return data
+
+
+def invalidate_cache():
+    """Forget the cached document; the next load re-reads the file."""
+    global _cache_path
+    with _cache_lock:
+        _cache_path = None
+
+
 def load_macros(profile="default"):
     """Load macro assignments for the given profile."""
-    if not os.path.exists(CONFIG_PATH):
-        return {}
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data.get(profile, {})
+    with _cache_lock:
+        macros = _document().get(profile, {})
+        if not isinstance(macros, dict):
+            logger.warning(f"Profile '{profile}' in {CONFIG_PATH} is not an object; ignoring it")
+            return {}
+        # Shallow copy: callers may edit the map without touching the cache
+        return dict(macros)
+
+def load_all_macros():
+    """Load every profile's assignments ({profile_id: macros}); entries that aren't objects are skipped."""
+    profiles = {}
+    with _cache_lock:
+        for name, macros in _document().items():
+            if isinstance(macros, dict):
+                profiles[name] = dict(macros)
+            else:
+                logger.warning(f"Profile '{name}' in {CONFIG_PATH} is not an object; skipping it")
+    return profiles
 
 def save_macros(profile="default", macros=None):
     """Save macro assignments for the given profile."""
+    global _cache_path, _cache_stamp, _cache_data
     if macros is None:
         macros = {}
-    data = {}
-    if os.path.exists(CONFIG_PATH):
-        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    data[profile] = macros
-    os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
-    with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
-
+    with _cache_lock:
+        current = _document()
+        if current.get(profile) == macros and _cache_stamp is not None:
+            return  # unchanged: nothing to write
+        # New document: the cache only changes once the file on disk has
+        data = dict(current)
+        data[profile] = dict(macros)
+        os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
+        # Write a temp file and swap it in, so a crash never leaves half a file
+        tmp = CONFIG_PATH + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp, CONFIG_PATH)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        _cache_path, _cache_stamp, _cache_data = CONFIG_PATH, _stamp(CONFIG_PATH), data
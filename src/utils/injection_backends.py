@@ -0,0 +1,340 @@
+# src/utils/injection_backends.py
+"""
+Input-injection backends for the macro executor.
+
+A backend receives a precompiled plan's steps, which are (is_press, key)
+pairs, plus scroll amounts. A key is a single character or a KeyName
+("ctrl", "f5", "media_volume_up", ...), which each backend maps to its own
+codes, so plans (and the null backend) don't need pynput or an X display:
+
+    PynputBackend  default; pynput keyboard/mouse controllers
+    UinputBackend  Linux /dev/uinput via python-evdev (optional dependency);
+                   a whole chord goes out as one write() ending in one SYN_REPORT
+    NullBackend    touches nothing; optionally records what it was asked to do
+                   (headless benchmarks and checks)
+
+Pick one with MNAV_INJECT=pynput|uinput|null or macro_executor.set_backend().
+"""
+from __future__ import annotations
+
+import os
+import struct
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from src.utils.logger import setup_logger
+
+try:
+    from evdev import UInput, ecodes
+except ImportError:  # optional: only the uinput backend needs it
+    UInput = None
+    ecodes = None
+
+logger = setup_logger(__name__)
+
+
+@dataclass(frozen=True)
+class KeyName:
+    """A non-character key, named like pynput's Key members ("ctrl", "page_up", "f5")."""
+    name: str
+
+
+Step = Tuple[bool, Any]
+
+
+class InjectionBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    def press(self, key) -> None:
+        ...
+
+    @abstractmethod
+    def release(self, key) -> None:
+        ...
+
+    @abstractmethod
+    def scroll(self, dy: int) -> None:
+        ...
+
+    def type_text(self, text: str) -> None:
+        """Type a chunk of text. Backends override this with a bulk path."""
+        for ch in text:
+            self.press(ch)
+            self.release(ch)
+
+    def can_type(self, text: str) -> bool:
+        """False if type_text() can't produce every character (callers paste instead)."""
+        return True
+
+    def has_key(self, key) -> bool:
+        """False if press()/release() would reject key (checked when plans compile)."""
+        return True
+
+    def run_steps(self, steps: Sequence[Step], held: Sequence[Any] = ()) -> None:
+        """Play steps in order; release held modifiers if a step fails."""
+        press = self.press
+        release = self.release
+        try:
+            for is_press, k in steps:
+                if is_press:
+                    press(k)
+                else:
+                    release(k)
+        except Exception:
+            for k in reversed(held):
+                try:
+                    release(k)
+                except Exception:
+                    pass
+            raise
+
+    def close(self) -> None:
+        pass
+
+
+class PynputBackend(InjectionBackend):
+    name = "pynput"
+
+    def __init__(self):
+        # Imported here: pynput needs a display as soon as it's imported
+        from pynput.keyboard import Controller, Key
+        from pynput.mouse import Controller as MouseController
+
+        self._keyboard = Controller()
+        self._mouse = MouseController()
+        # __members__ includes aliases (platforms where ctrl is ctrl_l, ...)
+        self._keys = {KeyName(n): k for n, k in Key.__members__.items()}
+
+    def has_key(self, key) -> bool:
+        return type(key) is not KeyName or key in self._keys
+
+    def _key(self, key):
+        if type(key) is KeyName:
+            k = self._keys.get(key)
+            if k is None:
+                raise ValueError(f"pynput has no key {key.name!r} on this platform")
+            return k
+        return key
+
+    def press(self, key) -> None:
+        self._keyboard.press(self._key(key))
+
+    def release(self, key) -> None:
+        self._keyboard.release(self._key(key))
+
+    def scroll(self, dy: int) -> None:
+        self._mouse.scroll(0, dy)
+
+    def type_text(self, text: str) -> None:
+        # pynput resolves case, shift and non-ASCII (unicode input) per char
+        self._keyboard.type(text)
+
+
+class NullBackend(InjectionBackend):
+    """Injects nothing. With record=True keeps ("press"|"release"|"scroll", arg) ops."""
+    name = "null"
+
+    def __init__(self, record: bool = True):
+        self.record = record
+        self.ops: List[Tuple[str, Any]] = []
+        self.events = 0
+
+    def press(self, key) -> None:
+        self.events += 1
+        if self.record:
+            self.ops.append(("press", key))
+
+    def release(self, key) -> None:
+        self.events += 1
+        if self.record:
+            self.ops.append(("release", key))
+
+    def scroll(self, dy: int) -> None:
+        self.events += 1
+        if self.record:
+            self.ops.append(("scroll", dy))
+
+    def type_text(self, text: str) -> None:
+        self.events += 2 * len(text)
+        if self.record:
+            self.ops.append(("type", text))
+
+    def clear(self) -> None:
+        self.ops.clear()
+        self.events = 0
+
+
+# ---- uinput ----
+# KeyName names -> evdev KEY_* names (resolved against ecodes at init)
+_UINPUT_SPECIAL = {
+    "ctrl": "KEY_LEFTCTRL", "ctrl_l": "KEY_LEFTCTRL", "ctrl_r": "KEY_RIGHTCTRL",
+    "shift": "KEY_LEFTSHIFT", "shift_l": "KEY_LEFTSHIFT", "shift_r": "KEY_RIGHTSHIFT",
+    "alt": "KEY_LEFTALT", "alt_l": "KEY_LEFTALT", "alt_r": "KEY_RIGHTALT", "alt_gr": "KEY_RIGHTALT",
+    "cmd": "KEY_LEFTMETA", "cmd_l": "KEY_LEFTMETA", "cmd_r": "KEY_RIGHTMETA",
+    "enter": "KEY_ENTER", "tab": "KEY_TAB", "esc": "KEY_ESC", "space": "KEY_SPACE",
+    "backspace": "KEY_BACKSPACE", "delete": "KEY_DELETE", "insert": "KEY_INSERT",
+    "home": "KEY_HOME", "end": "KEY_END", "page_up": "KEY_PAGEUP", "page_down": "KEY_PAGEDOWN",
+    "left": "KEY_LEFT", "right": "KEY_RIGHT", "up": "KEY_UP", "down": "KEY_DOWN",
+    "print_screen": "KEY_SYSRQ", "caps_lock": "KEY_CAPSLOCK", "menu": "KEY_COMPOSE",
+    "media_volume_up": "KEY_VOLUMEUP", "media_volume_down": "KEY_VOLUMEDOWN",
+    "media_volume_mute": "KEY_MUTE", "media_play_pause": "KEY_PLAYPAUSE",
+    "media_next": "KEY_NEXTSONG", "media_previous": "KEY_PREVIOUSSONG",
+}
+_UINPUT_CHARS = {
+    "-": "KEY_MINUS", "=": "KEY_EQUAL", "[": "KEY_LEFTBRACE", "]": "KEY_RIGHTBRACE",
+    ";": "KEY_SEMICOLON", "'": "KEY_APOSTROPHE", "`": "KEY_GRAVE", "\\": "KEY_BACKSLASH",
+    ",": "KEY_COMMA", ".": "KEY_DOT", "/": "KEY_SLASH", " ": "KEY_SPACE",
+}
+for _c in "abcdefghijklmnopqrstuvwxyz0123456789":
+    _UINPUT_CHARS[_c] = f"KEY_{_c.upper()}"
+_UINPUT_CHARS.update({"\n": "KEY_ENTER", "\t": "KEY_TAB"})
+# US layout: shifted char -> unshifted char on the same key
+_UINPUT_SHIFTED = dict(zip('~!@#$%^&*()_+{}|:"<>?', "`1234567890-=[]\\;',./"))
+for _n in range(1, 25):
+    _UINPUT_SPECIAL[f"f{_n}"] = f"KEY_F{_n}"
+
+# struct input_event: struct timeval, __u16 type, __u16 code, __s32 value
+_INPUT_EVENT = struct.Struct("llHHi")
+
+
+class UinputBackend(InjectionBackend):
+    """
+    Virtual keyboard + wheel on /dev/uinput. run_steps() packs every step of a
+    plan into one buffer and issues a single write() with one SYN_REPORT, so
+    a chord costs one syscall instead of one per key edge.
+    """
+    name = "uinput"
+
+    def __init__(self, device_name: str = "MNAV Macropad", fd: Optional[int] = None):
+        """fd: write events to an already-open fd instead of creating a device (benchmarks)."""
+        if UInput is None:
+            raise RuntimeError("uinput backend needs python-evdev (pip install evdev)")
+        self._special = {k: getattr(ecodes, v) for k, v in _UINPUT_SPECIAL.items() if hasattr(ecodes, v)}
+        self._chars = {k: getattr(ecodes, v) for k, v in _UINPUT_CHARS.items() if hasattr(ecodes, v)}
+        keys = sorted(set(self._special.values()) | set(self._chars.values()))
+        self._ui = None
+        if fd is None:
+            try:
+                self._ui = UInput(
+                    {ecodes.EV_KEY: keys, ecodes.EV_REL: [ecodes.REL_WHEEL]},
+                    name=device_name,
+                )
+            except Exception as e:  # UInputError, PermissionError, ...
+                raise RuntimeError(f"cannot open /dev/uinput: {e}") from e
+            fd = self._ui.fd
+        self._fd = fd
+        self._ev_key = ecodes.EV_KEY
+        self._ev_rel = ecodes.EV_REL
+        self._rel_wheel = ecodes.REL_WHEEL
+        self._ev_syn = ecodes.EV_SYN
+        self._syn_report = ecodes.SYN_REPORT
+        self.writes = 0
+
+    def _code(self, key) -> int:
+        if isinstance(key, str):
+            code = self._chars.get(key.lower())
+        else:
+            code = self._special.get(getattr(key, "name", ""))
+        if code is None:
+            raise ValueError(f"uinput backend has no keycode for {key!r}")
+        return code
+
+    def has_key(self, key) -> bool:
+        if isinstance(key, str):
+            return key.lower() in self._chars
+        return getattr(key, "name", "") in self._special
+
+    def _write(self, events: Iterable[Tuple[int, int, int]]) -> None:
+        now = time.time()
+        sec = int(now)
+        usec = int((now - sec) * 1_000_000)
+        pack = _INPUT_EVENT.pack
+        buf = b"".join(pack(sec, usec, t, c, v) for t, c, v in events)
+        buf += pack(sec, usec, self._ev_syn, self._syn_report, 0)
+        os.write(self._fd, buf)
+        self.writes += 1
+
+    def run_steps(self, steps: Sequence[Step], held: Sequence[Any] = ()) -> None:
+        ev_key = self._ev_key
+        code = self._code
+        # Resolve everything first: a bad key fails before anything is sent,
+        # so there are no half-pressed chords to clean up.
+        self._write([(ev_key, code(k), 1 if is_press else 0) for is_press, k in steps])
+
+    def _char(self, ch: str) -> Tuple[Optional[int], bool]:
+        """(keycode, needs shift) for ch on a US layout; keycode None if untypable."""
+        base = _UINPUT_SHIFTED.get(ch)
+        if base is None and ch.isupper():
+            base = ch.lower()
+        return self._chars.get(base if base is not None else ch), base is not None
+
+    def can_type(self, text: str) -> bool:
+        chars = self._chars
+        return all(ch in chars or self._char(ch)[0] is not None for ch in text)
+
+    def type_text(self, text: str) -> None:
+        """
+        One write() for the whole chunk, with a SYN_REPORT after every key
+        edge so consumers see distinct presses (US layout; characters without
+        a keycode are skipped with a warning, see can_type()).
+        """
+        ev_key, syn, report = self._ev_key, self._ev_syn, self._syn_report
+        shift = self._special["shift"]
+        char = self._char
+        events: List[Tuple[int, int, int]] = []
+        add = events.append
+        skipped = []
+        for ch in text:
+            code, shifted = char(ch)
+            if code is None:
+                skipped.append(ch)
+                continue
+            if shifted:
+                add((ev_key, shift, 1)); add((syn, report, 0))
+            add((ev_key, code, 1)); add((syn, report, 0))
+            add((ev_key, code, 0)); add((syn, report, 0))
+            if shifted:
+                add((ev_key, shift, 0)); add((syn, report, 0))
+        if skipped:
+            logger.warning(f"uinput backend can't type {''.join(sorted(set(skipped)))!r}; skipped")
+        if events:
+            events.pop()  # _write appends the final SYN_REPORT
+            self._write(events)
+
+    def press(self, key) -> None:
+        self._write([(self._ev_key, self._code(key), 1)])
+
+    def release(self, key) -> None:
+        self._write([(self._ev_key, self._code(key), 0)])
+
+    def scroll(self, dy: int) -> None:
+        self._write([(self._ev_rel, self._rel_wheel, int(dy))])
+
+    def close(self) -> None:
+        if self._ui is None:
+            return
+        try:
+            self._ui.close()
+        except Exception:
+            pass
+
+
+BACKENDS = {
+    "pynput": PynputBackend,
+    "uinput": UinputBackend,
+    "null": NullBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> InjectionBackend:
+    """Build the named backend (default: MNAV_INJECT, else pynput)."""
+    name = (name or os.getenv("MNAV_INJECT", "pynput")).strip().lower()
+    cls = BACKENDS.get(name)
+    if cls is None:
+        raise ValueError(f"Unknown injection backend: {name!r} (expected one of {sorted(BACKENDS)})")
+    backend = cls()
+    logger.info(f"Input injection backend: {backend.name}")
+    return backend
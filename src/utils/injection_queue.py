@@ -0,0 +1,238 @@
+# src/utils/injection_queue.py
+"""
+Ordered macro injection.
+
+All macros go through one consumer thread, so two hotkeys never interleave
+their modifier presses, and the queue in front of it is bounded so a stuck
+pynput call can't build an unbounded backlog. What happens when the queue is
+full is set by the overflow policy:
+
+    drop_oldest  discard the oldest queued job to make room (default)
+    coalesce     fold the job into a queued job for the same input + macro
+                 (repeat += 1); falls back to drop_oldest if there is none
+    block        wait up to block_timeout_s for room, then drop the new job;
+                 submit(wait=False) drops it right away instead (the dispatcher
+                 submits on the serial reader thread, which must never stall)
+
+Repeatable macros (mouse_scroll, media) merge into the newest queued job for
+the same input + macro regardless of depth, so a fast encoder spin becomes one
+job and, for scrolls, one scroll(0, dy * N) call.
+
+Jobs carry the input that produced them ("K1", "E0_CW", ...) so queued work
+can be cancelled per input, e.g. when the profile or a binding changes.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterable, Optional
+
+from src.utils.latency import LATENCY
+from src.utils.logger import setup_logger
+from src.utils.macro_executor import execute_macro_traced, is_repeatable
+
+logger = setup_logger(__name__)
+
+POLICIES = ("drop_oldest", "coalesce", "block")
+
+
+@dataclass
+class InjectionJob:
+    macro_id: str
+    source: str = ""                 # input that produced it, for cancellation
+    rx: Optional[float] = None       # device read time (end-to-end latency)
+    t_submit: float = 0.0
+    repeat: int = 1                  # fires folded into this job
+    plan: Any = None                 # MacroPlan when the caller already resolved it
+
+
+class InjectionQueue:
+    def __init__(
+        self,
+        max_depth: int = 32,
+        policy: str = "drop_oldest",
+        block_timeout_s: float = 0.25,
+        run: Callable[[str, Optional[float], float, int, Any], None] = execute_macro_traced,
+        repeatable: Callable[[str], bool] = is_repeatable,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy!r} (expected one of {POLICIES})")
+        self.max_depth = max(1, int(max_depth))
+        self.policy = policy
+        self.block_timeout_s = block_timeout_s
+        self._run = run
+        self._repeatable = repeatable
+
+        self._q: Deque[InjectionJob] = deque()
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        self._busy_since: Optional[float] = None
+
+        self.submitted = 0
+        self.executed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.merged = 0
+        self.cancelled = 0
+        self.high_water = 0
+        self._last_wait_s = 0.0
+        self._behind = False
+
+    # ---- Lifecycle ----
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._consumer, name="macro-injector", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout_s: float = 1.0) -> None:
+        with self._cv:
+            self._stop = True
+            self.cancelled += len(self._q)
+            self._q.clear()
+            self._cv.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout_s)
+        self._thread = None
+
+    # ---- Producer side ----
+    def submit(
+        self,
+        macro_id: str,
+        source: str = "",
+        rx: Optional[float] = None,
+        repeat: int = 1,
+        plan: Any = None,
+        wait: bool = True,
+    ) -> bool:
+        """
+        Queue a macro (repeat times). Pass plan when it's already resolved
+        (binding table) to skip the lookups. wait=False: never wait for room
+        under the block policy. Returns False if the job was dropped.
+        """
+        if repeat < 1:
+            return True
+        job = InjectionJob(macro_id, source, rx, time.monotonic(), repeat, plan)
+        repeatable = plan.repeatable if plan is not None else self._repeatable(macro_id)
+        with self._cv:
+            self.submitted += 1
+            q = self._q
+
+            if repeatable and q:
+                last = q[-1]
+                if last.source == source and last.macro_id == macro_id:
+                    # Keep the older rx/t_submit: latency is measured from the first fire
+                    last.repeat += repeat
+                    self.merged += 1
+                    return True
+
+            if len(q) >= self.max_depth:
+                if self.policy == "coalesce" and self._coalesce(job):
+                    return True
+                if self.policy == "block":
+                    deadline = job.t_submit + (self.block_timeout_s if wait else 0.0)
+                    while len(q) >= self.max_depth and not self._stop:
+                        left = deadline - time.monotonic()
+                        if left <= 0:
+                            break
+                        self._cv.wait(left)
+                    if len(q) >= self.max_depth:
+                        self.dropped += 1
+                        self._falling_behind()
+                        logger.debug(f"Queue full, dropped {macro_id} from {source or '?'}")
+                        return False
+                else:
+                    q.popleft()
+                    self.dropped += 1
+                    self._falling_behind()
+
+            q.append(job)
+            if len(q) > self.high_water:
+                self.high_water = len(q)
+            self._cv.notify_all()
+        return True
+
+    def _coalesce(self, job: InjectionJob) -> bool:
+        # Newest first: the job that will run last is the one to extend.
+        for queued in reversed(self._q):
+            if queued.source == job.source and queued.macro_id == job.macro_id:
+                queued.repeat += job.repeat
+                self.coalesced += 1
+                return True
+        return False
+
+    def _falling_behind(self) -> None:
+        if not self._behind:
+            self._behind = True
+            logger.warning(
+                f"Macro injection is falling behind input (queue full at {self.max_depth}, "
+                f"policy={self.policy})"
+            )
+
+    def cancel(self, sources: Optional[Iterable[str]] = None) -> int:
+        """Drop queued jobs for the given inputs (all inputs when None)."""
+        with self._cv:
+            if sources is None:
+                n = len(self._q)
+                self._q.clear()
+            else:
+                wanted = set(sources)
+                kept = deque(j for j in self._q if j.source not in wanted)
+                n = len(self._q) - len(kept)
+                self._q = kept
+            self.cancelled += n
+            self._cv.notify_all()
+        return n
+
+    # ---- Consumer ----
+    def _consumer(self) -> None:
+        while True:
+            with self._cv:
+                while not self._q and not self._stop:
+                    self._cv.wait()
+                if self._stop:
+                    return
+                job = self._q.popleft()
+                if not self._q:
+                    self._behind = False
+                self._cv.notify_all()  # room for a blocked producer
+
+            now = time.monotonic()
+            self._last_wait_s = now - job.t_submit
+            self._busy_since = now
+            try:
+                self._run(job.macro_id, job.rx, job.t_submit, job.repeat, job.plan)
+            except Exception as e:
+                logger.exception(f"Injection of {job.macro_id} failed: {e}")
+            finally:
+                self._busy_since = None
+            self.executed += 1
+
+    # ---- Stats ----
+    def depth(self) -> int:
+        return len(self._q)
+
+    def stats(self) -> Dict[str, float]:
+        busy = self._busy_since
+        wait = LATENCY.histogram("exec_queue")
+        return {
+            "depth": len(self._q),
+            "max_depth": self.max_depth,
+            "high_water": self.high_water,
+            "policy": self.policy,
+            "submitted": self.submitted,
+            "executed": self.executed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "merged": self.merged,
+            "cancelled": self.cancelled,
+            "last_wait_ms": self._last_wait_s * 1000.0,
+            "wait_p50_ms": wait.percentile(50),
+            "wait_p99_ms": wait.percentile(99),
+            # How long the current injection has been running (stuck pynput call)
+            "busy_ms": (time.monotonic() - busy) * 1000.0 if busy is not None else 0.0,
+        }
@@ -0,0 +1,315 @@
+# src/utils/input_dispatcher.py
+"""
+Reader-side input dispatch.
+
+Device events are resolved and fired on the serial reader thread, the moment
+they're decoded: chord engine -> encoder engine -> binding table -> rate
+limiter -> injection queue. The GUI thread isn't on that path at all, so a
+repaint, resize or drag in progress can't delay a macro; it still receives
+the events (batched signals) for key highlights, plus a feedback callback
+per fired binding for encoder pulses and the like.
+
+Profiles come precompiled from a ProfileStore. The active one is a single
+pointer (self.profile) that every event reads once, so switching profiles,
+from the GUI (select) or from the macropad (layer bindings), is a pointer
+swap: no disk I/O, no compiling, and no event is dropped on the way.
+
+Layers (see binding_table):
+    momentary  "layer:<id>"         active while the key/button is held; the
+                                    release restores whatever was active before
+    toggle     "layer_toggle:<id>"  press to enter; pressing the same input
+                                    again goes back, whatever the layer binds it to
+Layer keys skip the chord engine. Chord keys held when the profile switches
+are released as plain presses on the profile they were pressed in.
+
+All dispatch state is guarded by one lock, shared by:
+    - the reader thread (handle)
+    - the chord timer thread, which releases held chord keys at their deadline
+    - the GUI thread, when it selects or refreshes a profile
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.device.chord_engine import Output
+from src.device.protocol import ButtonEvent, EncoderEvent, KeyEvent
+from src.utils.binding_table import ROW_BTN, ROW_CCW, ROW_CW, ROW_KEY, Binding
+from src.utils.injection_queue import InjectionQueue
+from src.utils.latency import LATENCY
+from src.utils.logger import setup_logger
+from src.utils.profile_store import CompiledProfile, ProfileStore
+
+logger = setup_logger(__name__)
+
+# (binding, event, repeat) after a binding was submitted; called on the
+# dispatching thread, so GUI code must hop threads (e.g. a pyqtSignal emit)
+Feedback = Callable[[Binding, Any, int], None]
+# (active profile id, selected profile id) after a switch; same threading rules
+LayerFeedback = Callable[[str, str], None]
+
+_KEY_HOLD = ROW_KEY
+_BTN_HOLD = ROW_BTN
+
+
+class InputDispatcher:
+    def __init__(
+        self,
+        queue: InjectionQueue,
+        store: Optional[ProfileStore] = None,
+        feedback: Optional[Feedback] = None,
+        on_layer: Optional[LayerFeedback] = None,
+    ):
+        self._queue = queue
+        self.store = store or ProfileStore()
+        self._feedback = feedback
+        self._on_layer = on_layer
+
+        self.profile: CompiledProfile = self.store.get_or_empty("default")
+        self._base = self.profile.name              # selected in the GUI
+        self._holds: List[Tuple[Tuple[int, int], str]] = []  # ((row, id), profile to restore)
+        self._toggle: Optional[Tuple[Tuple[int, int], str]] = None  # (input, profile to go back to)
+
+        self._cv = threading.Condition()
+        self._timer: Optional[threading.Thread] = None
+        self._stop = False
+
+        self.events = 0
+        self.fired = 0
+        self.switches = 0
+
+    # ---- Lifecycle ----
+    def start(self) -> None:
+        """Start the chord timer thread."""
+        if self._timer and self._timer.is_alive():
+            return
+        self._stop = False
+        self._timer = threading.Thread(target=self._chord_timer_loop, name="chord-timer", daemon=True)
+        self._timer.start()
+
+    def stop(self) -> None:
+        with self._cv:
+            self._stop = True
+            self._cv.notify_all()
+        if self._timer:
+            self._timer.join(timeout=1.0)
+        self._timer = None
+
+    # ---- Profiles (GUI thread) ----
+    def select(self, name: str) -> None:
+        """Make name the base profile; drops any layer state."""
+        profile = self.store.get_or_empty(name)
+        with self._cv:
+            self._base = name
+            self._holds.clear()
+            self._toggle = None
+            self._switch(profile)
+
+    def refresh(self, name: str) -> None:
+        """Pick up a recompiled profile (store.update) if it's the active one."""
+        with self._cv:
+            if self.profile.name == name:
+                self._switch(self.store.get_or_empty(name))
+
+    def recompile(self) -> None:
+        """
+        Recompile every profile and switch to the new copy of the active one;
+        a macro plans listener (see macro_executor.add_plans_listener), so
+        bindings never fire plans that rebuild_macro_plans() replaced.
+        Layer state is kept.
+        """
+        self.store.recompile()
+        with self._cv:
+            self._switch(self.store.get_or_empty(self.profile.name))
+
+    @property
+    def active(self) -> str:
+        return self.profile.name
+
+    # ---- Events (reader thread) ----
+    def handle(self, ev: Any) -> None:
+        """Inline handler for PicoSerialClient; ignores non-input events."""
+        t = type(ev)
+        if t is KeyEvent:
+            self.on_key(ev)
+        elif t is EncoderEvent:
+            self.on_encoder(ev)
+        elif t is ButtonEvent:
+            self.on_button(ev)
+
+    def on_key(self, ev: KeyEvent) -> None:
+        LATENCY.since("dispatch", ev.rx)
+        edge = ev.edge
+        if edge != "down" and edge != "up":
+            return
+        down = edge == "down"
+        k = int(ev.k)
+        with self._cv:
+            self.events += 1
+            if self._holds and not down and self._release_hold((_KEY_HOLD, k)):
+                return
+            if self._toggle is not None and down and self._toggle_back((_KEY_HOLD, k)):
+                return
+            p = self.profile
+            binding = p.table.get(ROW_KEY, k)
+            if binding is not None and binding.layer:
+                if down:
+                    self._layer_press(binding, (_KEY_HOLD, k))
+                return
+
+            chords = p.chords
+            if chords.active:
+                now = ev.rx if ev.rx is not None else time.monotonic()
+                had_deadline = chords.next_deadline() is not None
+                self._fire_outputs(p, chords.on_key(k, down, ev, now))
+                if not had_deadline and chords.next_deadline() is not None:
+                    self._cv.notify_all()  # wake the timer for the new window
+            elif down:
+                self._fire(p, binding, ev)
+
+    def on_encoder(self, ev: EncoderEvent) -> None:
+        LATENCY.since("dispatch", ev.rx)
+        eid = int(ev.id)
+        with self._cv:
+            self.events += 1
+            p = self.profile
+            encoders = p.encoders
+            if not encoders.feed(eid, int(ev.d), ev.pos, ev.ts if ev.ts is not None else ev.rx):
+                return
+
+            # Whole actions ready (accelerated, quantized by steps_per_action)
+            actions = encoders.pending(eid)
+            if actions == 0:
+                return
+            binding = p.table.get(ROW_CW if actions > 0 else ROW_CCW, eid)
+            if binding is None:
+                encoders.take(eid)  # unbound direction: drop the steps
+                return
+
+            # Throttle so fast spins don't flood the queue; limited steps stay
+            # accumulated and fire with the next allowed event
+            if not p.limiter.allow(binding.slot):
+                return
+            # One job for all actions: repeatable macros (scroll/volume) run as
+            # a single merged operation, others fire once per action in order.
+            self._submit(binding, ev, abs(encoders.take(eid)))
+
+    def on_button(self, ev: ButtonEvent) -> None:
+        LATENCY.since("dispatch", ev.rx)
+        bid = int(ev.id)
+        with self._cv:
+            self.events += 1
+            if ev.edge != "down":
+                if self._holds:
+                    self._release_hold((_BTN_HOLD, bid))
+                return
+            if self._toggle is not None and self._toggle_back((_BTN_HOLD, bid)):
+                return
+            p = self.profile
+            binding = p.table.get(ROW_BTN, bid)
+            if binding is not None and binding.layer:
+                self._layer_press(binding, (_BTN_HOLD, bid))
+            else:
+                self._fire(p, binding, ev)
+
+    # ---- Internals (lock held) ----
+    def _fire(self, p: CompiledProfile, binding: Optional[Binding], ev: Any) -> None:
+        if binding is not None and binding.plan is not None and p.limiter.allow(binding.slot):
+            self._submit(binding, ev, 1)
+
+    def _fire_outputs(self, p: CompiledProfile, outputs: List[Output]) -> None:
+        table = p.table
+        for out in outputs:
+            if out[0] == "chord":
+                self._fire(p, table.chord(out[1]), out[2])
+            else:
+                ev = out[1]
+                self._fire(p, table.get(ROW_KEY, int(ev.k)), ev)
+
+    def _submit(self, binding: Binding, ev: Any, repeat: int) -> None:
+        # wait=False: a full "block" queue must not stall the reader (or the
+        # GUI and chord timer waiting on this lock); the job is dropped instead
+        self._queue.submit(binding.macro_id, binding.name, ev.rx, repeat, binding.plan, wait=False)
+        self.fired += 1
+        if self._feedback is not None:
+            try:
+                self._feedback(binding, ev, repeat)
+            except Exception as e:
+                logger.error(f"Dispatch feedback failed: {e}")
+
+    def _layer_press(self, binding: Binding, hold: Tuple[int, int]) -> None:
+        target = self.store.get(binding.layer)
+        if target is None:
+            logger.warning(f"{binding.name}: layer '{binding.layer}' is not a known profile")
+            return
+        if binding.toggle:
+            self._toggle = (hold, self.profile.name)
+            self._switch(target)
+        else:
+            self._holds.append((hold, self.profile.name))
+            self._switch(target)
+
+    def _toggle_back(self, hold: Tuple[int, int]) -> bool:
+        if self._toggle[0] != hold:
+            return False
+        back = self._toggle[1]
+        self._toggle = None
+        self._switch(self.store.get_or_empty(back))
+        return True
+
+    def _release_hold(self, hold: Tuple[int, int]) -> bool:
+        holds = self._holds
+        for i in range(len(holds) - 1, -1, -1):
+            if holds[i][0] == hold:
+                _, restore = holds.pop(i)
+                if i == len(holds):
+                    self._switch(self.store.get_or_empty(restore))  # top of the stack
+                else:
+                    # A later hold is still down: it restores to what this one would have
+                    holds[i] = (holds[i][0], restore)
+                return True
+        return False
+
+    def _switch(self, profile: CompiledProfile) -> None:
+        old = self.profile
+        if old is not profile:
+            # Chord keys held in the old profile resolve there, as plain presses
+            self._fire_outputs(old, old.chords.flush())
+            old.chords.reset()
+        self.profile = profile
+        self.switches += 1
+        self._cv.notify_all()
+        if self._on_layer is not None:
+            try:
+                self._on_layer(profile.name, self._base)
+            except Exception as e:
+                logger.error(f"Layer feedback failed: {e}")
+
+    def _chord_timer_loop(self) -> None:
+        with self._cv:
+            while not self._stop:
+                p = self.profile
+                deadline = p.chords.next_deadline()
+                if deadline is None:
+                    self._cv.wait()
+                    continue
+                left = deadline - time.monotonic()
+                if left > 0:
+                    self._cv.wait(left)
+                    continue
+                self._fire_outputs(p, p.chords.poll())
+
+    # ---- Stats ----
+    def stats(self) -> Dict[str, Any]:
+        p = self.profile
+        return {
+            "profile": p.name,
+            "base": self._base,
+            "events": self.events,
+            "fired": self.fired,
+            "switches": self.switches,
+            "bindings": len(p.table),
+            "chords": p.chords.stats(),
+            "encoders": p.encoders.stats(),
+        }
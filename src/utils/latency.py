@@ -0,0 +1,171 @@
+"""
+latency.py
+----------
+Per-stage input latency histograms for the MNAV macropad hot path.
+
+Stages (all host time.monotonic() unless noted):
+    wire        firmware ts -> host read (clock offset removed, see below)
+    parse       host read -> decoded event
+    dispatch    host read -> input dispatcher (reader thread, resolves + fires)
+    feedback    host read -> GUI handler (on_device_key / ...; visuals only)
+    exec_queue  handler submit -> executor dequeue
+    inject      executor dequeue -> pynput call done
+    end_to_end  host read -> pynput call done
+    chord_hold  key press held back by the chord engine (0 for keys in no chord)
+
+The firmware clock is not the host clock, so "wire" subtracts the smallest
+(host - firmware) difference seen so far; it reports latency above the best
+observed case rather than absolute transit time.
+
+Histograms are HDR-style log-linear buckets over microseconds (32 sub-buckets
+per power of two, ~3% worst-case relative error), so recording is O(1) and
+memory is fixed no matter how many samples come in.
+
+Set MNAV_LATENCY=0 to turn recording off.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+_SUB_BITS = 5
+_SUB = 1 << _SUB_BITS
+_MAX_US = 60_000_000  # clamp at 60 s
+
+
+def _bucket(us: int) -> int:
+    if us < _SUB:
+        return us
+    shift = us.bit_length() - (_SUB_BITS + 1)
+    return _SUB + shift * _SUB + ((us >> shift) - _SUB)
+
+
+def _bucket_value(idx: int) -> int:
+    """Upper edge (inclusive) of a bucket, in microseconds."""
+    if idx < _SUB:
+        return idx
+    shift, rem = divmod(idx - _SUB, _SUB)
+    return ((_SUB + rem + 1) << shift) - 1
+
+
+_NBUCKETS = _bucket(_MAX_US) + 1
+
+
+class LatencyHistogram:
+    """Fixed-size log-linear histogram of durations."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * _NBUCKETS
+            self.count = 0
+            self.total_us = 0
+            self.min_us: Optional[int] = None
+            self.max_us = 0
+
+    def record(self, seconds: float) -> None:
+        us = int(seconds * 1_000_000)
+        if us < 0:
+            us = 0
+        elif us > _MAX_US:
+            us = _MAX_US
+        idx = _bucket(us)
+        with self._lock:
+            self._counts[idx] += 1
+            self.count += 1
+            self.total_us += us
+            if self.min_us is None or us < self.min_us:
+                self.min_us = us
+            if us > self.max_us:
+                self.max_us = us
+
+    def percentile(self, q: float) -> float:
+        """q in [0, 100]; returns milliseconds (0.0 when empty)."""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, int(round(self.count * q / 100.0)))
+            seen = 0
+            for idx, c in enumerate(self._counts):
+                seen += c
+                if seen >= target:
+                    return min(_bucket_value(idx), self.max_us) / 1000.0
+            return self.max_us / 1000.0
+
+    def summary(self) -> Dict[str, float]:
+        count = self.count
+        return {
+            "count": count,
+            "min_ms": (self.min_us or 0) / 1000.0,
+            "mean_ms": (self.total_us / count / 1000.0) if count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_us / 1000.0,
+        }
+
+
+class LatencyTracker:
+    """Named set of stage histograms plus the firmware clock offset estimate."""
+
+    STAGES = ("wire", "parse", "dispatch", "feedback", "chord_hold", "exec_queue", "inject", "end_to_end")
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._hist: Dict[str, LatencyHistogram] = {s: LatencyHistogram() for s in self.STAGES}
+        self._fw_offset: Optional[float] = None
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        h = self._hist.get(stage)
+        if h is None:
+            h = self._hist.setdefault(stage, LatencyHistogram())
+        return h
+
+    def record(self, stage: str, seconds: float) -> None:
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    def since(self, stage: str, t0: Optional[float]) -> None:
+        """Record now - t0 for stage (no-op when t0 is None)."""
+        if self.enabled and t0 is not None:
+            self.histogram(stage).record(time.monotonic() - t0)
+
+    def record_wire(self, fw_ts: Optional[float], host_ts: float) -> None:
+        if not self.enabled or fw_ts is None:
+            return
+        diff = host_ts - fw_ts
+        if self._fw_offset is None or diff < self._fw_offset:
+            self._fw_offset = diff
+        self._hist["wire"].record(diff - self._fw_offset)
+
+    def reset(self) -> None:
+        self._fw_offset = None
+        for h in self._hist.values():
+            h.reset()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: h.summary() for name, h in self._hist.items()}
+
+    def dump(self, path: str) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"generated": time.time(), "stages": self.summary()}, f, indent=2)
+        return path
+
+    def format_table(self) -> str:
+        lines = [f"{'stage':<12} {'count':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)"]
+        for name, s in self.summary().items():
+            lines.append(
+                f"{name:<12} {s['count']:>8} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} "
+                f"{s['p99_ms']:>9.3f} {s['max_ms']:>9.3f}"
+            )
+        return "\n".join(lines)
+
+
+# Process-wide tracker used by the reader, GUI handlers and macro executor.
+LATENCY = LatencyTracker(enabled=os.getenv("MNAV_LATENCY", "1") != "0")
@@ -0,0 +1,383 @@
+# src/utils/launcher.py
+"""
+Pre-warmed process launcher for "launch" macros.
+
+Forking the GUI process (Qt, big heap) on every key press is slow, and
+starting a fresh interpreter for a Python script is slower still. Instead a
+small helper process (python -m src.utils.launcher) is started once and
+kept alive; the GUI side sends it JSON-line requests and the helper forks
+itself, which is cheap because it's tiny:
+
+    {"id": 1, "argv": ["code", "."], "cwd": null}   -> fork + execvp
+    {"id": 2, "script": "tools/x.py", "args": []}  -> fork + runpy in the
+                                                      already-warm interpreter
+
+and answers {"id": n, "pid": p} once forked and {"id": n, "exit": code} when
+the child exits, which is what the per-macro concurrency limits count. A
+script that raises exits 1 and the reply carries the exception text
+("exception"); a child that couldn't start at all (exec failed, missing
+script or cwd) gets {"id": n, "error": text, "exit": 127}.
+
+Relative paths resolve as if the process were started from the GUI: cwd
+against the GUI's working directory, and a script or program against cwd
+(the GUI's working directory when cwd isn't set).
+
+On platforms without fork (Windows) Launcher spawns directly with
+subprocess.Popen; limits still apply.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+_HAS_FORK = hasattr(os, "fork")
+
+
+@dataclass(frozen=True)
+class LaunchSpec:
+    argv: Tuple[str, ...] = ()         # program + args (cmd)
+    script: Optional[str] = None       # or a Python script run in the warm helper
+    args: Tuple[str, ...] = ()         # script args
+    cwd: Optional[str] = None
+    max_concurrent: int = 1            # running instances allowed per macro
+
+    @staticmethod
+    def from_macro(macro: dict) -> "LaunchSpec":
+        """{"type":"launch", "cmd": "code ." | ["code", "."], "cwd": ..., "max_concurrent": 1}
+        or {"type":"launch", "script": "tools/x.py", "args": [...]}"""
+        cmd = macro.get("cmd")
+        script = macro.get("script")
+        if bool(cmd) == bool(script):
+            raise ValueError("launch needs exactly one of 'cmd' or 'script'")
+        if isinstance(cmd, str):
+            argv = tuple(shlex.split(cmd, posix=not sys.platform.startswith("win")))
+        elif isinstance(cmd, list) and all(isinstance(a, str) for a in cmd):
+            argv = tuple(cmd)
+        elif cmd:
+            raise ValueError(f"invalid launch cmd: {cmd!r}")
+        else:
+            argv = ()
+        args = macro.get("args", [])
+        if not isinstance(args, list):
+            raise ValueError(f"invalid launch args: {args!r}")
+        try:
+            limit = int(macro.get("max_concurrent", 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid max_concurrent: {macro.get('max_concurrent')!r}")
+        if limit < 1:
+            raise ValueError(f"max_concurrent must be >= 1: {limit}")
+        cwd = macro.get("cwd")
+        return LaunchSpec(
+            argv=argv,
+            script=str(script) if script else None,
+            args=tuple(str(a) for a in args),
+            cwd=str(cwd) if cwd else None,
+            max_concurrent=limit,
+        )
+
+
+class Launcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._helper: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        self._next_id = 1
+        self._pending: Dict[int, Tuple[str, float]] = {}   # request id -> (macro_id, t_sent)
+        self._running: Dict[str, int] = {}                 # macro_id -> live instances
+        self._procs: Dict[int, Tuple[str, subprocess.Popen]] = {}  # Popen fallback
+
+        self.launched = 0
+        self.refused = 0
+        self.failed = 0          # couldn't start
+        self.nonzero = 0         # started, then exited non-zero (or raised)
+        self.last_exit: Dict[str, Tuple[int, Optional[str]]] = {}  # macro_id -> (code, error text)
+        self.spawn_s_total = 0.0
+        self.spawn_count = 0
+
+    # ---- Helper lifecycle ----
+    def start(self) -> None:
+        """Start the helper now so the first press doesn't pay for it."""
+        if not _HAS_FORK:
+            return
+        with self._lock:
+            self._ensure_helper()
+
+    def _ensure_helper(self) -> subprocess.Popen:
+        h = self._helper
+        if h is not None and h.poll() is None:
+            return h
+        if h is not None:
+            logger.warning(f"Launch helper exited ({h.returncode}); restarting")
+            # Whatever it was tracking is gone with it
+            self._pending.clear()
+            self._running.clear()
+        t0 = time.monotonic()
+        h = subprocess.Popen(
+            [sys.executable, "-u", "-m", "src.utils.launcher"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=_PROJECT_ROOT,
+            bufsize=0,
+        )
+        self._helper = h
+        self._reader = threading.Thread(target=self._read_replies, args=(h,), name="launch-helper", daemon=True)
+        self._reader.start()
+        logger.info(f"Launch helper started (pid {h.pid}, {(time.monotonic() - t0) * 1000:.0f} ms)")
+        return h
+
+    def shutdown(self) -> None:
+        with self._lock:
+            h, self._helper = self._helper, None
+        if h is not None and h.poll() is None:
+            try:
+                h.stdin.close()
+                h.wait(timeout=1.0)
+            except (OSError, subprocess.TimeoutExpired):
+                h.kill()
+
+    # ---- API ----
+    def launch(self, macro_id: str, spec: LaunchSpec) -> bool:
+        """Start one instance; False if the macro is at its concurrency limit."""
+        with self._lock:
+            if not _HAS_FORK:
+                self._reap_popen()
+            running = self._running.get(macro_id, 0)
+            if running >= spec.max_concurrent:
+                self.refused += 1
+                logger.info(f"Launch {macro_id} refused: {running}/{spec.max_concurrent} running")
+                return False
+            self._running[macro_id] = running + 1
+            self.launched += 1
+
+            if not _HAS_FORK:
+                return self._popen(macro_id, spec)
+
+            req_id = self._next_id
+            self._next_id += 1
+            # The helper runs in the project root; resolve against ours
+            cwd = os.path.join(os.getcwd(), os.path.expanduser(spec.cwd)) if spec.cwd else os.getcwd()
+            req = {"id": req_id, "cwd": cwd}
+            if spec.script:
+                req["script"] = spec.script
+                req["args"] = list(spec.args)
+            else:
+                req["argv"] = list(spec.argv)
+            try:
+                h = self._ensure_helper()
+                self._pending[req_id] = (macro_id, time.monotonic())
+                h.stdin.write((json.dumps(req) + "\n").encode("utf-8"))
+                return True
+            except OSError as e:
+                logger.error(f"Launch {macro_id} failed: {e}")
+                self._pending.pop(req_id, None)
+                self._release(macro_id)
+                self.failed += 1
+                return False
+
+    def running(self, macro_id: str) -> int:
+        return self._running.get(macro_id, 0)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "launched": self.launched,
+            "refused": self.refused,
+            "failed": self.failed,
+            "nonzero": self.nonzero,
+            "running": sum(self._running.values()),
+            "spawn_avg_ms": (self.spawn_s_total / self.spawn_count * 1000.0) if self.spawn_count else 0.0,
+        }
+
+    # ---- Internals ----
+    def _release(self, macro_id: str) -> None:
+        n = self._running.get(macro_id, 0) - 1
+        if n > 0:
+            self._running[macro_id] = n
+        else:
+            self._running.pop(macro_id, None)
+
+    def _read_replies(self, h: subprocess.Popen) -> None:
+        for line in h.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            with self._lock:
+                if self._helper is not h:
+                    return
+                rid = msg.get("id")
+                if "pid" in msg:
+                    entry = self._pending.get(rid)
+                    if entry:
+                        self.spawn_s_total += time.monotonic() - entry[1]
+                        self.spawn_count += 1
+                    continue
+                entry = self._pending.pop(rid, None)
+                if entry is None:
+                    continue
+                macro_id = entry[0]
+                self._release(macro_id)
+                code = msg.get("exit", 0)
+                exc = msg.get("exception")
+                self.last_exit[macro_id] = (code, msg.get("error") or exc)
+                if "error" in msg:
+                    self.failed += 1
+                    logger.error(f"Launch {macro_id} failed to start: {msg['error']}")
+                elif exc:
+                    self.nonzero += 1
+                    logger.warning(f"Launch {macro_id} raised {exc} (exit {code})")
+                elif code:
+                    self.nonzero += 1
+                    logger.info(f"Launch {macro_id} exited with {code}")
+
+    def _popen(self, macro_id: str, spec: LaunchSpec) -> bool:
+        argv = [sys.executable, spec.script, *spec.args] if spec.script else list(spec.argv)
+        t0 = time.monotonic()
+        try:
+            p = subprocess.Popen(argv, cwd=spec.cwd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+        except OSError as e:
+            logger.error(f"Launch {macro_id} failed: {e}")
+            self._release(macro_id)
+            self.failed += 1
+            return False
+        self.spawn_s_total += time.monotonic() - t0
+        self.spawn_count += 1
+        self._procs[p.pid] = (macro_id, p)
+        return True
+
+    def _reap_popen(self) -> None:
+        for pid, (macro_id, p) in list(self._procs.items()):
+            if p.poll() is not None:
+                del self._procs[pid]
+                self._release(macro_id)
+
+
+# ---- Helper process ----
+# Child -> helper status pipe (close-on-exec, so a successful exec just
+# closes it): b"start:<text>" if the child never got going, b"raise:<text>"
+# if a script raised.
+_START_FAILED = 127
+
+
+def _child(req: dict, status_fd: int) -> None:
+    """Runs in the forked child; never returns."""
+    code = 0
+    started = False
+    try:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        os.dup2(devnull, 0)
+        os.dup2(devnull, 1)  # stdout is the reply pipe
+        if req.get("cwd"):
+            os.chdir(req["cwd"])
+        if req.get("script"):
+            import runpy
+            path = os.path.expanduser(req["script"])
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"no such script: {os.path.abspath(path)}")
+            sys.argv = [path, *req.get("args", [])]
+            started = True
+            runpy.run_path(path, run_name="__main__")
+        else:
+            argv = req["argv"]
+            os.execvp(argv[0], argv)
+    except SystemExit as e:
+        if isinstance(e.code, int) or e.code is None:
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException as e:
+        text = f"{type(e).__name__}: {e}"
+        if not started:
+            text = f"{req.get('script') or (req.get('argv') or ['?'])[0]}: {text}"
+        print(f"launch: {text}", file=sys.stderr)
+        code = 1 if started else _START_FAILED
+        try:
+            os.write(status_fd, (("raise:" if started else "start:") + text).encode("utf-8", "replace"))
+        except OSError:
+            pass
+    finally:
+        os._exit(code)
+
+
+def _read_status(fd: int) -> str:
+    try:
+        return os.read(fd, 4096).decode("utf-8", "replace")
+    except OSError:
+        return ""
+    finally:
+        os.close(fd)
+
+
+def _helper_main() -> None:
+    import select
+
+    out = sys.stdout.buffer
+    inp = sys.stdin.buffer
+    children: Dict[int, Tuple[int, int]] = {}  # pid -> (request id, status pipe)
+    buf = b""
+
+    def reply(msg: dict) -> None:
+        out.write((json.dumps(msg) + "\n").encode("utf-8"))
+        out.flush()
+
+    while True:
+        readable, _, _ = select.select([inp], [], [], 0.1 if children else None)
+        if readable:
+            data = os.read(inp.fileno(), 65536)
+            if not data:
+                return  # GUI side closed the pipe
+            buf += data
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                try:
+                    req = json.loads(line)
+                except ValueError:
+                    continue
+                try:
+                    status_r, status_w = os.pipe()
+                    pid = os.fork()
+                except OSError as e:
+                    reply({"id": req.get("id"), "error": str(e), "exit": _START_FAILED})
+                    continue
+                if pid == 0:
+                    os.close(status_r)
+                    _child(req, status_w)
+                os.close(status_w)
+                os.set_blocking(status_r, False)  # a forking script's children may hold it
+                children[pid] = (req.get("id"), status_r)
+                reply({"id": req.get("id"), "pid": pid})
+
+        while children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                children.clear()
+                break
+            if pid == 0:
+                break
+            rid, status_r = children.pop(pid, (None, None))
+            code = os.waitstatus_to_exitcode(status)
+            text = _read_status(status_r) if status_r is not None else ""
+            if text.startswith("start:"):
+                reply({"id": rid, "error": text[6:], "exit": code})
+            elif text.startswith("raise:"):
+                reply({"id": rid, "exit": code, "exception": text[6:]})
+            else:
+                reply({"id": rid, "exit": code})
+
+
+if __name__ == "__main__":
+    _helper_main()
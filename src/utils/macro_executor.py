@@ -1,18 +1,49 @@
 # src/utils/macro_executor.py
 from __future__ import annotations
 
-from typing import Dict, List, Optional
-
-from pynput.keyboard import Controller, Key
-from pynput.mouse import Controller as MouseController
-
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.clipboard import borrow_clipboard
+from src.utils.injection_backends import InjectionBackend, KeyName, PynputBackend, create_backend
+from src.utils.latency import LATENCY
+from src.utils.launcher import Launcher, LaunchSpec
 from src.utils.logger import setup_logger
+from src.utils.sequence_engine import SequenceScheduler
 from src.data.macro_library import MACRO_LIBRARY
 
-_mouse = MouseController()
-
 logger = setup_logger(__name__)
-_keyboard = Controller()
+
+# Injection backend, created on first use (MNAV_INJECT picks it)
+_backend: Optional[InjectionBackend] = None
+
+
+def get_backend() -> InjectionBackend:
+    global _backend
+    if _backend is None:
+        try:
+            backend = create_backend()
+        except (RuntimeError, ValueError, OSError) as e:
+            logger.warning(f"Injection backend unavailable ({e}); falling back to pynput")
+            backend = PynputBackend()
+        set_backend(backend)
+    return _backend
+
+
+def set_backend(backend: InjectionBackend) -> Optional[InjectionBackend]:
+    """
+    Swap the injection backend; returns the previous one (not closed).
+    Plans are recompiled against the new backend's keys, so a key it lacks
+    lists the macro in INVALID_MACROS instead of failing when it fires.
+    """
+    global _backend
+    prev, _backend = _backend, backend
+    if backend is not prev:
+        rebuild_macro_plans()
+    return prev
 
 
 # ---- Build a fast lookup table: macro_id -> keys sequence ----
@@ -30,56 +61,66 @@ def _build_macro_index() -> Dict[str, dict]:
 _MACRO_INDEX = _build_macro_index()
 
 
-# ---- Map friendly strings to pynput Key objects ----
+# ---- Map friendly strings to backend-neutral key names ----
 _SPECIAL_KEYS = {
-    "CTRL": Key.ctrl,
-    "CONTROL": Key.ctrl,
-    "SHIFT": Key.shift,
-    "ALT": Key.alt,
-    "WIN": Key.cmd,       # Windows key
-    "CMD": Key.cmd,
-
-    "ENTER": Key.enter,
-    "RETURN": Key.enter,
-    "TAB": Key.tab,
-    "ESC": Key.esc,
-    "ESCAPE": Key.esc,
-    "SPACE": Key.space,
-    "BACKSPACE": Key.backspace,
-    "DELETE": Key.delete,
-    "DEL": Key.delete,
-
-    "HOME": Key.home,
-    "END": Key.end,
-    "PGUP": Key.page_up,
-    "PAGEUP": Key.page_up,
-    "PGDN": Key.page_down,
-    "PAGEDOWN": Key.page_down,
-
-    "LEFT": Key.left,
-    "RIGHT": Key.right,
-    "UP": Key.up,
-    "DOWN": Key.down,
-
-    "PRTSCN": Key.print_screen,
-    "PRTSCR": Key.print_screen,
-    "PRINTSCREEN": Key.print_screen,
-
-
-    "VOLUME_UP": Key.media_volume_up,
-    "VOLUME_DOWN": Key.media_volume_down,
-    "VOLUME_MUTE": Key.media_volume_mute,
-    "PLAY_PAUSE": Key.media_play_pause,
-    "NEXT_TRACK": Key.media_next,
-    "PREV_TRACK": Key.media_previous,
+    "CTRL": KeyName("ctrl"),
+    "CONTROL": KeyName("ctrl"),
+    "SHIFT": KeyName("shift"),
+    "ALT": KeyName("alt"),
+    "WIN": KeyName("cmd"),       # Windows key
+    "CMD": KeyName("cmd"),
+
+    "ENTER": KeyName("enter"),
+    "RETURN": KeyName("enter"),
+    "TAB": KeyName("tab"),
+    "ESC": KeyName("esc"),
+    "ESCAPE": KeyName("esc"),
+    "SPACE": KeyName("space"),
+    "BACKSPACE": KeyName("backspace"),
+    "DELETE": KeyName("delete"),
+    "DEL": KeyName("delete"),
+
+    "HOME": KeyName("home"),
+    "END": KeyName("end"),
+    "PGUP": KeyName("page_up"),
+    "PAGEUP": KeyName("page_up"),
+    "PGDN": KeyName("page_down"),
+    "PAGEDOWN": KeyName("page_down"),
+
+    "LEFT": KeyName("left"),
+    "RIGHT": KeyName("right"),
+    "UP": KeyName("up"),
+    "DOWN": KeyName("down"),
+
+    "PRTSCN": KeyName("print_screen"),
+    "PRTSCR": KeyName("print_screen"),
+    "PRINTSCREEN": KeyName("print_screen"),
+
+
+    "VOLUME_UP": KeyName("media_volume_up"),
+    "VOLUME_DOWN": KeyName("media_volume_down"),
+    "VOLUME_MUTE": KeyName("media_volume_mute"),
+    "PLAY_PAUSE": KeyName("media_play_pause"),
+    "NEXT_TRACK": KeyName("media_next"),
+    "PREV_TRACK": KeyName("media_previous"),
 
 }
 
 
+def _check_keys(keys: List[Any]) -> None:
+    """Raise ValueError for keys the active backend can't press (none yet: no check)."""
+    backend = _backend
+    if backend is None:
+        return
+    missing = [k.name if isinstance(k, KeyName) else k for k in keys if not backend.has_key(k)]
+    if missing:
+        raise ValueError(f"keys not available on the {backend.name} backend: {missing!r}")
+
+
 def _to_key(token: str):
     """
-    Convert a key token like 'Ctrl' or 'C' or 'PrtScn' to a pynput key.
-    Returns either a Key (special) or a single character string.
+    Convert a key token like 'Ctrl' or 'C' or 'PrtScn' to a backend key.
+    Returns either a KeyName (special) or a single character string.
     """
     t = token.strip()
     if not t:
@@ -87,11 +128,11 @@ def _to_key(token: str):
 
     upper = t.upper()
 
-    # Function keys F1..F12 support
+    # Function keys F1..F24 (the backend may have fewer, see _check_keys)
     if upper.startswith("F") and upper[1:].isdigit():
         n = int(upper[1:])
-        if 1 <= n <= 24 and hasattr(Key, f"f{n}"):
-            return getattr(Key, f"f{n}")
+        if 1 <= n <= 24:
+            return KeyName(f"f{n}")
 
     if upper in _SPECIAL_KEYS:
         return _SPECIAL_KEYS[upper]
@@ -108,27 +149,35 @@ def _to_key(token: str):
     return None
 
 
-def execute_macro_by_id(macro_id: str) -> None:
-    """
-    Execute a macro by its ID (e.g., 'macro_copy').
+# ---- Precompiled macro plans ----
+# Every _MACRO_INDEX entry is compiled once into an immutable plan of resolved
+# backend keys, so the fire path never re-parses tokens. Macros that can't be
+# compiled are reported at load time and listed in INVALID_MACROS; that
+# includes keys the injection backend lacks, once there is one (plans are
+# recompiled when it's created or swapped).
+_MODIFIERS = frozenset({KeyName("ctrl"), KeyName("shift"), KeyName("alt"), KeyName("cmd")})
 
-    Supports:
-      - Hotkey (default):
-          {"type":"hotkey", "keys":["Ctrl","C"]}
-      - Media:
-          {"type":"media", "key":"VOLUME_UP"}
-      - Mouse scroll:
-          {"type":"mouse_scroll", "dy": 1}   # dy positive=up, negative=down
-    """
-    macro_id = (macro_id or "").strip()
-    if not macro_id:
-        return
 
-    macro = _MACRO_INDEX.get(macro_id)
-    if not macro:
-        logger.warning(f"Macro id not found: {macro_id}")
-        return
+@dataclass(frozen=True)
+class MacroPlan:
+    macro_id: str
+    kind: str                                   # "hotkey" | "media" | "mouse_scroll" | "text" | "sequence" | "launch"
+    steps: Tuple[Tuple[bool, Any], ...] = ()    # (is_press, key) in order
+    held: Tuple[Any, ...] = ()                  # modifiers to release if a step fails
+    dy: int = 0                                 # mouse_scroll
+    label: str = ""                             # log text, built once
+    repeatable: bool = False                    # N queued fires may run as one job
+    seq: Tuple[Tuple[float, "MacroPlan"], ...] = ()  # sequence: (delay_s, action)
+    chunks: Tuple[str, ...] = ()                # text, pre-split for the backend
+    paste: bool = False                         # text: clipboard + paste chord
+    launch: Optional[LaunchSpec] = None         # launch
+
 
+def _compile_macro(macro_id: str, macro) -> Optional[MacroPlan]:
+    """
+    Compile one library entry. Returns None for a no-op (scroll dy=0);
+    raises ValueError with a reason for an invalid macro.
+    """
     # Backward-compat:
     # If old index still stores a list (seq), treat as hotkey keys.
     if isinstance(macro, list):
@@ -136,82 +185,397 @@ def execute_macro_by_id(macro_id: str) -> None:
 
     mtype = str(macro.get("type", "hotkey")).strip().lower()
 
-    try:
-        # -------------------------
-        # Mouse scroll
-        # -------------------------
-        if mtype == "mouse_scroll":
+    if mtype == "sequence":
+        return _compile_sequence(macro_id, macro)
+
+    if mtype == "text":
+        return _compile_text(macro_id, macro)
+
+    if mtype == "launch":
+        spec = LaunchSpec.from_macro(macro)
+        what = spec.script or " ".join(spec.argv)
+        return MacroPlan(macro_id, "launch", launch=spec, label=f"{macro_id} -> launch {what}")
+
+    if mtype == "mouse_scroll":
+        try:
             dy = int(macro.get("dy", 0))
-            if dy == 0:
-                return
-            _mouse.scroll(0, dy)
-            logger.info(f"Executed macro: {macro_id} -> mouse_scroll dy={dy}")
-            return
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid scroll dy: {macro.get('dy')!r}")
+        if dy == 0:
+            return None
+        return MacroPlan(
+            macro_id, "mouse_scroll", dy=dy, label=f"{macro_id} -> mouse_scroll dy={dy}", repeatable=True
+        )
+
+    if mtype == "media":
+        token = str(macro.get("key", "")).strip()
+        if not token:
+            raise ValueError("missing media key token")
+        k = _to_key(token)
+        if k is None:
+            raise ValueError(f"invalid media key: {token!r}")
+        _check_keys([k])
+        return MacroPlan(
+            macro_id, "media", steps=((True, k), (False, k)), label=f"{macro_id} -> media {token}", repeatable=True
+        )
+
+    if mtype != "hotkey":
+        raise ValueError(f"unknown macro type: {mtype!r}")
+
+    seq = macro.get("keys", [])
+    if not isinstance(seq, list) or not seq:
+        raise ValueError(f"invalid or empty keys: {seq!r}")
+
+    keys = [_to_key(str(t)) for t in seq]
+    bad = [t for t, k in zip(seq, keys) if k is None]
+    if bad:
+        raise ValueError(f"unrecognized key tokens: {bad!r}")
+    _check_keys(keys)
+
+    steps: List[Tuple[bool, Any]] = []
+    held: List[Any] = []
+    # Press and hold modifiers first, in sequence; tap everything else
+    for k in keys[:-1]:
+        steps.append((True, k))
+        if k in _MODIFIERS:
+            held.append(k)
+        else:
+            steps.append((False, k))
+    # Tap the final key, then release modifiers in reverse order
+    final = keys[-1]
+    steps.append((True, final))
+    steps.append((False, final))
+    steps.extend((False, k) for k in reversed(held))
+
+    return MacroPlan(macro_id, "hotkey", steps=tuple(steps), held=tuple(held), label=f"{macro_id} -> {seq}")
+
+
+# ---- Text ----
+# Defaults for text macros; each can be overridden per macro/step:
+#   chunk       chars per backend call (one write() on uinput)
+#   cps         0 = as fast as the backend goes; > 0 paces chunks through the
+#               sequence scheduler for apps that drop fast input
+#   strategy    "auto" (paste at >= paste_over chars), "type" or "paste"
+# A paste borrows the clipboard: the user's contents are put back
+# TEXT_PASTE_RESTORE_S later, once the target app has read the paste. Text
+# the backend can't type (non-ASCII on uinput) is pasted as well.
+TEXT_CHUNK = 32
+TEXT_PASTE_OVER = 200
+TEXT_PASTE_RESTORE_S = 0.3
+
+_PASTE_MOD = KeyName("cmd") if sys.platform == "darwin" else KeyName("ctrl")
+_PASTE_STEPS = ((True, _PASTE_MOD), (True, "v"), (False, "v"), (False, _PASTE_MOD))
+
+_TEXT_STATS = {"chars": 0, "seconds": 0.0, "pasted": 0}
+
+
+def _compile_text(macro_id: str, macro: dict) -> Optional[MacroPlan]:
+    """{"type": "text", "text": "...", "chunk": 32, "cps": 0, "strategy": "auto", "paste_over": 200}"""
+    text = macro.get("text", "")
+    if not isinstance(text, str):
+        raise ValueError(f"text must be a string: {text!r}")
+    if not text:
+        return None
+    try:
+        chunk = max(1, int(macro.get("chunk", TEXT_CHUNK)))
+        cps = max(0.0, float(macro.get("cps", 0)))
+        paste_over = int(macro.get("paste_over", TEXT_PASTE_OVER))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"invalid text options: {e}")
+    strategy = str(macro.get("strategy", "auto")).strip().lower()
+    if strategy not in ("auto", "type", "paste"):
+        raise ValueError(f"unknown text strategy: {strategy!r}")
+
+    label = f"{macro_id} -> text ({len(text)} chars)"
+    paste = strategy == "paste" or (strategy == "auto" and cps == 0 and len(text) >= paste_over)
+    chunks = tuple(text[i:i + chunk] for i in range(0, len(text), chunk))
+    if paste:
+        return MacroPlan(macro_id, "text", chunks=chunks, paste=True, label=label + " [paste]")
+    if cps == 0 or len(chunks) == 1:
+        return MacroPlan(macro_id, "text", chunks=chunks, label=label)
+
+    # Paced: one action per chunk, each delayed by the previous chunk's share of cps
+    seq = []
+    delay = 0.0
+    for c in chunks:
+        seq.append((delay, MacroPlan(macro_id, "text", chunks=(c,), label=label)))
+        delay = len(c) / cps
+    return MacroPlan(macro_id, "sequence", seq=tuple(seq), label=f"{label} @ {cps:g} cps")
+
+
+def _run_text(backend: InjectionBackend, plan: MacroPlan, repeat: int) -> None:
+    t0 = time.perf_counter()
+    text = "".join(plan.chunks)
+    # The clipboard round trips (subprocesses) run before taking the inject
+    # lock, so other macros aren't stalled behind them
+    paste = (plan.paste or not backend.can_type(text)) and borrow_clipboard(text, TEXT_PASTE_RESTORE_S)
+    with _INJECT_LOCK:
+        for _ in range(repeat):
+            if paste:
+                backend.run_steps(_PASTE_STEPS, (_PASTE_MOD,))
+            else:
+                for c in plan.chunks:
+                    backend.type_text(c)
+    if paste:
+        _TEXT_STATS["pasted"] += repeat
+    _TEXT_STATS["chars"] += len(text) * repeat
+    _TEXT_STATS["seconds"] += time.perf_counter() - t0
 
-        # -------------------------
-        # Media key (single special key)
-        # -------------------------
-        if mtype == "media":
-            token = str(macro.get("key", "")).strip()
-            if not token:
-                logger.warning(f"Macro '{macro_id}' missing media key token.")
-                return
-
-            k = _to_key(token)
-            if k is None:
-                logger.warning(f"Macro '{macro_id}' has invalid media key: {token!r}")
-                return
-
-            _keyboard.press(k)
-            _keyboard.release(k)
-            logger.info(f"Executed macro: {macro_id} -> media {token}")
-            return
 
-        # -------------------------
-        # Hotkey / default
-        # -------------------------
-        seq = macro.get("keys", [])
-        if not isinstance(seq, list) or not seq:
-            logger.warning(f"Macro '{macro_id}' has invalid or empty keys: {seq!r}")
-            return
+def text_stats() -> Dict[str, float]:
+    """Characters injected by text macros and the resulting chars/second."""
+    secs = _TEXT_STATS["seconds"]
+    return {**_TEXT_STATS, "cps": _TEXT_STATS["chars"] / secs if secs > 0 else 0.0}
+
+
+def _compile_sequence(macro_id: str, macro: dict) -> Optional[MacroPlan]:
+    """
+    {"type": "sequence", "steps": [
+        {"keys": ["Ctrl", "C"]}, {"wait_ms": 50}, {"text": "hi"},
+        {"key": "VOLUME_UP"}, {"dy": -3}, {"macro": "macro_paste"}]}
+
+    Waits fold into the delay before the next action; a trailing wait is dropped.
+    """
+    raw = macro.get("steps", [])
+    if not isinstance(raw, list) or not raw:
+        raise ValueError(f"invalid or empty sequence steps: {raw!r}")
+
+    seq: List[Tuple[float, MacroPlan]] = []
+    delay = 0.0
+    for i, step in enumerate(raw):
+        if not isinstance(step, dict):
+            raise ValueError(f"sequence step {i} is not an object: {step!r}")
+        if "wait_ms" in step:
+            try:
+                delay += max(0.0, float(step["wait_ms"]) / 1000.0)
+            except (TypeError, ValueError):
+                raise ValueError(f"sequence step {i}: invalid wait_ms {step['wait_ms']!r}")
+            continue
+
+        if "text" in step:
+            action = _compile_text(macro_id, {**step, "text": str(step["text"])})
+        elif "macro" in step:
+            ref = str(step["macro"]).strip()
+            target = _MACRO_INDEX.get(ref)
+            if target is None:
+                raise ValueError(f"sequence step {i}: unknown macro {ref!r}")
+            if str(target.get("type", "")).strip().lower() == "sequence":
+                raise ValueError(f"sequence step {i}: nested sequence {ref!r}")
+            action = _compile_macro(ref, target)
+        elif "keys" in step:
+            action = _compile_macro(macro_id, {"type": "hotkey", "keys": step["keys"]})
+        elif "key" in step:
+            action = _compile_macro(macro_id, {"type": "media", "key": step["key"]})
+        elif "dy" in step:
+            action = _compile_macro(macro_id, {"type": "mouse_scroll", "dy": step["dy"]})
+        else:
+            raise ValueError(f"sequence step {i}: unknown step {step!r}")
+
+        if action is None:
+            continue
+        if action.kind == "sequence":
+            # Paced text: splice its chunks in so later steps wait for them
+            (first, head), *rest = action.seq
+            seq.append((delay + first, head))
+            seq.extend(rest)
+        else:
+            seq.append((delay, action))
+        delay = 0.0
+
+    if not seq:
+        return None
+    return MacroPlan(macro_id, "sequence", seq=tuple(seq), label=f"{macro_id} -> sequence ({len(seq)} steps)")
+
+
+def _build_macro_plans(index: Dict[str, dict]):
+    plans: Dict[str, Optional[MacroPlan]] = {}
+    invalid: Dict[str, str] = {}
+    for mid, macro in index.items():
+        try:
+            plans[mid] = _compile_macro(mid, macro)
+        except ValueError as e:
+            invalid[mid] = str(e)
+            logger.warning(f"Macro '{mid}' is invalid and will not run: {e}")
+    return plans, invalid
+
+
+_MACRO_PLANS, INVALID_MACROS = _build_macro_plans(_MACRO_INDEX)
+
+# Called after rebuild_macro_plans(), on the calling thread: anything that
+# holds plans (compiled binding tables) recompiles from here
+_plan_listeners: List[Callable[[], None]] = []
+
+
+def add_plans_listener(fn: Callable[[], None]) -> None:
+    if fn not in _plan_listeners:
+        _plan_listeners.append(fn)
 
-        # Convert tokens to pynput objects
-        keys = [_to_key(t) for t in seq]
-        keys = [k for k in keys if k is not None]
-        if not keys:
-            logger.warning(f"Macro '{macro_id}' has no valid keys: {seq}")
+
+def remove_plans_listener(fn: Callable[[], None]) -> None:
+    if fn in _plan_listeners:
+        _plan_listeners.remove(fn)
+
+
+def rebuild_macro_plans() -> None:
+    """Recompile every plan (after MACRO_LIBRARY changes at runtime), then notify listeners."""
+    global _MACRO_INDEX, _MACRO_PLANS, INVALID_MACROS
+    _MACRO_INDEX = _build_macro_index()
+    _MACRO_PLANS, INVALID_MACROS = _build_macro_plans(_MACRO_INDEX)
+    for fn in list(_plan_listeners):
+        try:
+            fn()
+        except Exception as e:
+            logger.exception(f"Macro plan listener failed: {e}")
+
+
+def get_macro_plan(macro_id: str) -> Optional[MacroPlan]:
+    return _MACRO_PLANS.get(macro_id)
+
+
+def macro_exists(macro_id: str) -> bool:
+    """True for valid library macros, including ones that compile to a no-op."""
+    return macro_id in _MACRO_PLANS
+
+
+def is_repeatable(macro_id: str) -> bool:
+    """True for macros whose repeats can merge (mouse_scroll, media)."""
+    plan = _MACRO_PLANS.get(macro_id)
+    return plan is not None and plan.repeatable
+
+
+# Held for each injected action, so the injection queue and the sequence
+# scheduler never interleave key edges with each other.
+_INJECT_LOCK = threading.Lock()
+
+
+def run_plan(plan: MacroPlan, repeat: int = 1) -> None:
+    """
+    Play a precompiled plan repeat times on the injection backend. Scrolls
+    merge into a single scroll(dy * repeat). Sequences are handed to the
+    scheduler and return immediately.
+    """
+    if plan.kind == "sequence":
+        get_sequencer().submit(plan.macro_id, plan.seq, repeat)
+        return
+    if plan.kind == "launch":
+        launcher = get_launcher()
+        for _ in range(repeat):
+            if not launcher.launch(plan.macro_id, plan.launch):
+                break
+        return
+
+    backend = _backend or get_backend()
+    if plan.kind == "text":
+        _run_text(backend, plan, repeat)
+        return
+    with _INJECT_LOCK:
+        if plan.kind == "mouse_scroll":
+            backend.scroll(plan.dy * repeat)
             return
+        backend.run_steps(plan.steps * repeat if repeat > 1 else plan.steps, plan.held)
 
-        modifiers = {Key.ctrl, Key.shift, Key.alt, Key.cmd}
-        held = []
 
-        # Press and hold modifiers first, in sequence
-        for k in keys[:-1]:
-            if k in modifiers:
-                _keyboard.press(k)
-                held.append(k)
-            else:
-                _keyboard.press(k)
-                _keyboard.release(k)
+# ---- Timed sequences ----
+_sequencer: Optional[SequenceScheduler] = None
+
+
+def get_sequencer() -> SequenceScheduler:
+    global _sequencer
+    if _sequencer is None:
+        _sequencer = SequenceScheduler(run_plan)
+    return _sequencer
+
+
+# ---- Launch ----
+_launcher: Optional[Launcher] = None
+
+
+def get_launcher() -> Launcher:
+    global _launcher
+    if _launcher is None:
+        _launcher = Launcher()
+    return _launcher
 
-        # Tap the final key
-        final = keys[-1]
-        _keyboard.press(final)
-        _keyboard.release(final)
 
-        logger.info(f"Executed macro: {macro_id} -> {seq}")
+def warm_launcher() -> None:
+    """Start the launch helper up front if any macro launches something."""
+    if any(p is not None and p.kind == "launch" for p in _MACRO_PLANS.values()):
+        get_launcher().start()
 
+
+def shutdown_launcher() -> None:
+    if _launcher is not None:
+        _launcher.shutdown()
+
+
+def cancel_sequences(macro_id: Optional[str] = None) -> int:
+    """Cancel running sequence macros (all, or one macro's runs)."""
+    return _sequencer.cancel(macro_id) if _sequencer is not None else 0
+
+
+def execute_macro_by_id(macro_id: str, repeat: int = 1) -> None:
+    """
+    Execute a macro by its ID (e.g., 'macro_copy'), repeat times.
+
+    Supports:
+      - Hotkey (default):
+          {"type":"hotkey", "keys":["Ctrl","C"]}
+      - Media:
+          {"type":"media", "key":"VOLUME_UP"}
+      - Mouse scroll:
+          {"type":"mouse_scroll", "dy": 1}   # dy positive=up, negative=down
+      - Text (chunked typing, clipboard paste when long; see _compile_text):
+          {"type":"text", "text":"Hello"}
+      - Launch (pre-forked helper, per-macro concurrency limit; see LaunchSpec):
+          {"type":"launch", "cmd":["code", "."], "max_concurrent": 1}
+      - Sequence (timed, runs on the scheduler thread; see _compile_sequence):
+          {"type":"sequence", "steps":[{"keys":["Ctrl","C"]}, {"wait_ms":50}, {"text":"hi"}]}
+    """
+    plan = _MACRO_PLANS.get(macro_id)
+    if plan is None:
+        # Slow path: untrimmed id, invalid macro, unknown id or a no-op plan
+        macro_id = (macro_id or "").strip()
+        if not macro_id:
+            return
+        plan = _MACRO_PLANS.get(macro_id)
+        if plan is None:
+            if macro_id in INVALID_MACROS:
+                logger.warning(f"Macro '{macro_id}' is invalid: {INVALID_MACROS[macro_id]}")
+            elif macro_id not in _MACRO_PLANS:
+                logger.warning(f"Macro id not found: {macro_id}")
+            return
+
+    execute_plan(plan, repeat)
+
+
+def execute_plan(plan: MacroPlan, repeat: int = 1) -> None:
+    """run_plan with logging; used when the caller already holds the plan."""
+    if repeat < 1:
+        return
+    try:
+        run_plan(plan, repeat)
+        if repeat == 1:
+            logger.info("Executed macro: %s", plan.label)
+        else:
+            logger.info("Executed macro: %s (x%d)", plan.label, repeat)
     except Exception as e:
-        logger.exception(f"Macro execution failed for {macro_id}: {e}")
+        logger.exception(f"Macro execution failed for {plan.macro_id}: {e}")
 
-    finally:
-        # Release modifiers in reverse order
-        try:
-            if mtype == "hotkey":
-                for k in reversed(locals().get("held", [])):
-                    try:
-                        _keyboard.release(k)
-                    except Exception:
-                        pass
-        except Exception:
-            pass
+
+def execute_macro_traced(
+    macro_id: str, rx: Optional[float], t_submit: float, repeat: int = 1, plan: Optional[MacroPlan] = None
+) -> None:
+    """
+    execute_macro_by_id (or execute_plan, when the binding table already
+    resolved it) plus latency tracing: records executor queue wait, the
+    injection itself, and end-to-end time from the device read (rx).
+    """
+    t_deq = time.monotonic()
+    LATENCY.record("exec_queue", t_deq - t_submit)
+    if plan is not None:
+        execute_plan(plan, repeat)
+    else:
+        execute_macro_by_id(macro_id, repeat)
+    t_done = time.monotonic()
+    LATENCY.record("inject", t_done - t_deq)
+    LATENCY.since("end_to_end", rx)
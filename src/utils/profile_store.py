@@ -0,0 +1,102 @@
+# src/utils/profile_store.py
+"""
+Every profile, loaded once and kept compiled in memory.
+
+A CompiledProfile bundles what dispatch needs for one profile: its binding
+table and its own rate limiter, chord engine and encoder engine, all
+configured from the profile's settings ("_rate_limits", "_chord_window_ms",
+"_encoder"). Making a profile active is then a pointer swap in
+InputDispatcher; nothing is read, parsed or compiled on a switch.
+
+The store is rebuilt from the whole config document on load, and one profile
+is recompiled when it's edited or saved (update()). Lookups are plain dict
+reads, so the dispatcher may call get() from the reader thread while the GUI
+thread replaces entries.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.device.chord_engine import CHORD_WINDOW_KEY, ChordEngine
+from src.device.encoder_engine import ENCODER_CONFIG_KEY, EncoderEngine
+from src.utils.binding_table import BindingTable
+from src.utils.logger import setup_logger
+from src.utils.rate_limiter import RATE_LIMITS_KEY, RateLimiter
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class CompiledProfile:
+    name: str
+    bindings: Dict[str, Any]
+    table: BindingTable
+    limiter: RateLimiter
+    chords: ChordEngine
+    encoders: EncoderEngine
+    layers: List[str] = field(default_factory=list)
+
+
+class ProfileStore:
+    def __init__(self, names: Iterable[str] = (), encoders: int = 0, steps_per_action: int = 1):
+        self._names = list(names)          # binding names to pre-allocate limiter slots for
+        self._encoders = encoders
+        self._steps = steps_per_action
+        self._profiles: Dict[str, CompiledProfile] = {}
+
+    def compile(self, name: str, bindings: Optional[Dict[str, Any]]) -> CompiledProfile:
+        bindings = dict(bindings or {})
+        limiter = RateLimiter()
+        limiter.configure(bindings.get(RATE_LIMITS_KEY), self._names)
+        chords = ChordEngine()
+        chords.configure(bindings, bindings.get(CHORD_WINDOW_KEY))
+        encoders = EncoderEngine(count=self._encoders, steps_per_action=self._steps)
+        encoders.configure(bindings.get(ENCODER_CONFIG_KEY))
+        table = BindingTable.compile(bindings, limiter)
+        return CompiledProfile(name, bindings, table, limiter, chords, encoders, sorted(table.layers))
+
+    # ---- Loading / editing (GUI thread) ----
+    def load(self, document: Dict[str, Any]) -> None:
+        """Compile every profile in a config document ({profile_id: bindings})."""
+        profiles = {
+            name: self.compile(name, bindings)
+            for name, bindings in (document or {}).items()
+            if isinstance(bindings, dict)
+        }
+        self._profiles = profiles
+        for p in profiles.values():
+            missing = [layer for layer in p.layers if layer not in profiles]
+            if missing:
+                logger.warning(f"Profile '{p.name}' has layer bindings to unknown profiles: {missing}")
+        logger.info(f"Compiled {len(profiles)} profiles")
+
+    def recompile(self) -> None:
+        """Recompile every profile from its bindings (macro plans were rebuilt)."""
+        self._profiles = {name: self.compile(name, p.bindings) for name, p in self._profiles.items()}
+        logger.info(f"Recompiled {len(self._profiles)} profiles")
+
+    def update(self, name: str, bindings: Dict[str, Any]) -> CompiledProfile:
+        """Recompile one profile (edited or saved) and replace it."""
+        profile = self.compile(name, bindings)
+        self._profiles[name] = profile
+        return profile
+
+    # ---- Lookup (any thread) ----
+    def get(self, name: str) -> Optional[CompiledProfile]:
+        return self._profiles.get(name)
+
+    def get_or_empty(self, name: str) -> CompiledProfile:
+        """The compiled profile, or a new empty one (a profile with nothing saved yet)."""
+        profile = self._profiles.get(name)
+        if profile is None:
+            profile = self.update(name, {})
+        return profile
+
+    def bindings(self, name: str) -> Dict[str, Any]:
+        """A copy of a profile's binding map, safe for the caller to edit."""
+        profile = self._profiles.get(name)
+        return dict(profile.bindings) if profile is not None else {}
+
+    def names(self) -> List[str]:
+        return list(self._profiles)
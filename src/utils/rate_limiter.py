@@ -0,0 +1,187 @@
+# src/utils/rate_limiter.py
+"""
+Per-input rate limiting for macro firing.
+
+Every binding name ("K1", "E0_CW", "E1_BTN", ...) gets a small integer slot;
+policy, parameters and state live in flat arrays indexed by that slot, so a
+check is a handful of array reads/writes no matter how many keys and
+encoders the device has. Slots are allocated on first use.
+
+Policies (per binding, from the profile's "_rate_limits" map):
+
+    {"policy": "cooldown", "ms": 150}               fire at most once per ms window
+    {"policy": "debounce", "ms": 30}                ignore events closer than ms to
+                                                    the previous event (fired or not)
+    {"policy": "token_bucket", "rate": 20, "burst": 5}
+                                                    rate fires/s sustained, burst at once
+    {"policy": "none"}
+
+"_rate_limits" keys are binding names, or "K*" / "E*_CW" style patterns
+("*" matches anything); exact names win over patterns, later patterns over
+earlier ones. Bindings not covered fall back to DEFAULT_LIMITS.
+"""
+from __future__ import annotations
+
+import fnmatch
+import time
+from array import array
+from typing import Dict, Iterable, Optional
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+RATE_LIMITS_KEY = "_rate_limits"
+
+NONE, COOLDOWN, DEBOUNCE, TOKEN_BUCKET = 0, 1, 2, 3
+_POLICY_CODES = {"none": NONE, "cooldown": COOLDOWN, "debounce": DEBOUNCE, "token_bucket": TOKEN_BUCKET}
+
+# Matches the previous hard-coded MainWindow behaviour
+DEFAULT_LIMITS: Dict[str, dict] = {
+    "K*": {"policy": "cooldown", "ms": 150},
+    "E*_CW": {"policy": "cooldown", "ms": 50},
+    "E*_CCW": {"policy": "cooldown", "ms": 50},
+    "E*_BTN": {"policy": "cooldown", "ms": 150},
+}
+
+_NEVER = float("-inf")
+
+
+def _parse_limit(spec: dict):
+    """spec dict -> (code, a, b). a = window (s) or rate (1/s); b = burst."""
+    if not isinstance(spec, dict):
+        raise ValueError(f"rate limit must be an object: {spec!r}")
+    name = str(spec.get("policy", "cooldown")).strip().lower()
+    code = _POLICY_CODES.get(name)
+    if code is None:
+        raise ValueError(f"unknown rate limit policy: {name!r}")
+    if code in (COOLDOWN, DEBOUNCE):
+        ms = float(spec.get("ms", 0))
+        if ms < 0:
+            raise ValueError(f"ms must be >= 0: {ms}")
+        return code, ms / 1000.0, 0.0
+    if code == TOKEN_BUCKET:
+        rate = float(spec.get("rate", 0))
+        burst = float(spec.get("burst", 1))
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"token_bucket needs rate > 0 and burst >= 1: {spec!r}")
+        return code, rate, burst
+    return NONE, 0.0, 0.0
+
+
+class RateLimiter:
+    def __init__(self, defaults: Optional[Dict[str, dict]] = None):
+        self._defaults = dict(DEFAULT_LIMITS if defaults is None else defaults)
+        self._overrides: Dict[str, dict] = {}
+        self._slots: Dict[str, int] = {}
+
+        # Per-slot state, indexed by slot
+        self._policy = array("b")
+        self._a = array("d")
+        self._b = array("d")
+        self._last = array("d")
+        self._tokens = array("d")
+        self.allowed = array("L")
+        self.limited = array("L")
+
+    # ---- Configuration ----
+    def configure(self, overrides: Optional[dict] = None, names: Iterable[str] = ()) -> None:
+        """
+        Apply a profile's "_rate_limits" map (None/{} = defaults only) and
+        pre-allocate slots for names. Existing slots are re-resolved and reset.
+        """
+        self._overrides = dict(overrides or {})
+        for name, slot in self._slots.items():
+            self._apply(slot, name)
+        for name in names:
+            self.slot(name)
+
+    def _resolve(self, name: str) -> dict:
+        for table in (self._overrides, self._defaults):
+            spec = table.get(name)
+            if spec is not None:
+                return spec
+            for pattern, candidate in table.items():
+                if any(c in pattern for c in "*?[") and fnmatch.fnmatchcase(name, pattern):
+                    spec = candidate
+            if spec is not None:
+                return spec
+        return {"policy": "none"}
+
+    def _apply(self, slot: int, name: str) -> None:
+        spec = self._resolve(name)
+        try:
+            code, a, b = _parse_limit(spec)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Invalid rate limit for {name} ({e}); using defaults")
+            saved, self._overrides = self._overrides, {}
+            try:
+                code, a, b = _parse_limit(self._resolve(name))
+            finally:
+                self._overrides = saved
+        self._policy[slot] = code
+        self._a[slot] = a
+        self._b[slot] = b
+        self._last[slot] = _NEVER
+        self._tokens[slot] = b
+
+    def slot(self, name: str) -> int:
+        """Slot index for a binding name (allocated and configured on first use)."""
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = len(self._slots)
+            self._slots[name] = slot
+            self._policy.append(NONE)
+            for arr in (self._a, self._b, self._last, self._tokens):
+                arr.append(0.0)
+            self.allowed.append(0)
+            self.limited.append(0)
+            self._apply(slot, name)
+        return slot
+
+    # ---- Hot path ----
+    def allow(self, slot: int, now: Optional[float] = None) -> bool:
+        """True if an event on slot may fire now (and records it)."""
+        if now is None:
+            now = time.monotonic()
+        code = self._policy[slot]
+
+        if code == COOLDOWN:
+            ok = now - self._last[slot] >= self._a[slot]
+            if ok:
+                self._last[slot] = now
+        elif code == DEBOUNCE:
+            ok = now - self._last[slot] >= self._a[slot]
+            self._last[slot] = now
+        elif code == TOKEN_BUCKET:
+            last = self._last[slot]
+            burst = self._b[slot]
+            tokens = burst if last == _NEVER else min(burst, self._tokens[slot] + (now - last) * self._a[slot])
+            self._last[slot] = now
+            ok = tokens >= 1.0
+            self._tokens[slot] = tokens - 1.0 if ok else tokens
+        else:
+            ok = True
+
+        if ok:
+            self.allowed[slot] += 1
+        else:
+            self.limited[slot] += 1
+        return ok
+
+    def allow_name(self, name: str, now: Optional[float] = None) -> bool:
+        return self.allow(self.slot(name), now)
+
+    # ---- Stats ----
+    def reset(self) -> None:
+        for slot in range(len(self._slots)):
+            self._last[slot] = _NEVER
+            self._tokens[slot] = self._b[slot]
+            self.allowed[slot] = 0
+            self.limited[slot] = 0
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {"allowed": self.allowed[s], "limited": self.limited[s]}
+            for name, s in self._slots.items()
+        }
@@ -0,0 +1,161 @@
+# src/utils/sequence_engine.py
+"""
+Timed macro sequences on one scheduler thread.
+
+A "sequence" macro is a list of actions with waits between them. Rather than
+sleeping in a worker per sequence, every running sequence sits in a single
+heap keyed by the time its next action is due; one thread pops due actions,
+runs them and pushes the sequence back with its next deadline. Any number of
+sequences can be in flight, waiting costs nothing, and cancellation just
+marks a run so its remaining actions are skipped.
+
+Deadlines advance from the previous deadline (not from when the action
+finished), so long sequences don't drift.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# (delay before this action in seconds, action plan)
+SequenceStep = Tuple[float, Any]
+
+
+class SequenceRun:
+    __slots__ = ("macro_id", "steps", "index", "remaining", "cancelled", "started")
+
+    def __init__(self, macro_id: str, steps: Sequence[SequenceStep], repeat: int):
+        self.macro_id = macro_id
+        self.steps = steps
+        self.index = 0
+        self.remaining = repeat
+        self.cancelled = False
+        self.started = time.monotonic()
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class SequenceScheduler:
+    def __init__(self, run_action: Callable[[Any], None]):
+        self._run_action = run_action
+        self._heap: List[Tuple[float, int, SequenceRun]] = []
+        self._seq = itertools.count()
+        self._active: Dict[int, SequenceRun] = {}
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.max_late_s = 0.0
+
+    # ---- Lifecycle ----
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop = False
+            self._thread = threading.Thread(target=self._loop, name="macro-sequencer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout_s: float = 1.0) -> None:
+        self.cancel()
+        with self._cv:
+            self._stop = True
+            self._cv.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout_s)
+        self._thread = None
+
+    # ---- API ----
+    def submit(self, macro_id: str, steps: Sequence[SequenceStep], repeat: int = 1) -> Optional[SequenceRun]:
+        """Start a sequence (repeat times back to back). Returns a cancellable run."""
+        if not steps or repeat < 1:
+            return None
+        run = SequenceRun(macro_id, steps, repeat)
+        with self._cv:
+            self._ensure_thread()
+            self._active[id(run)] = run
+            self.started += 1
+            heapq.heappush(self._heap, (run.started + steps[0][0], next(self._seq), run))
+            self._cv.notify()
+        return run
+
+    def cancel(self, macro_id: Optional[str] = None) -> int:
+        """Cancel running sequences (all, or those of one macro)."""
+        n = 0
+        with self._cv:
+            for key, run in list(self._active.items()):
+                if macro_id is None or run.macro_id == macro_id:
+                    run.cancelled = True
+                    del self._active[key]
+                    n += 1
+            self.cancelled += n
+            self._cv.notify()
+        return n
+
+    def active(self) -> int:
+        return len(self._active)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "active": len(self._active),
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "max_late_ms": self.max_late_s * 1000.0,
+        }
+
+    # ---- Scheduler thread ----
+    def _loop(self) -> None:
+        heap = self._heap
+        while True:
+            with self._cv:
+                while True:
+                    if self._stop:
+                        return
+                    # Cancelled runs are dropped lazily when they reach the top
+                    while heap and heap[0][2].cancelled:
+                        heapq.heappop(heap)
+                    if not heap:
+                        self._cv.wait()
+                        continue
+                    due = heap[0][0]
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cv.wait(wait)
+                due, _, run = heapq.heappop(heap)
+
+            late = time.monotonic() - due
+            if late > self.max_late_s:
+                self.max_late_s = late
+
+            _, action = run.steps[run.index]
+            try:
+                self._run_action(action)
+            except Exception as e:
+                logger.exception(f"Sequence {run.macro_id} step {run.index} failed: {e}")
+                run.cancelled = True
+
+            with self._cv:
+                if run.cancelled:
+                    self._active.pop(id(run), None)
+                    continue
+                run.index += 1
+                if run.index >= len(run.steps):
+                    run.remaining -= 1
+                    if run.remaining <= 0:
+                        self._active.pop(id(run), None)
+                        self.completed += 1
+                        continue
+                    run.index = 0
+                delay = run.steps[run.index][0]
+                heapq.heappush(heap, (due + delay, next(self._seq), run))
@@ -0,0 +1,110 @@
+# tests/conftest.py
+"""
+Shared fixtures. Device tests run the real PicoSerialClient against the
+PTY-backed VirtualPico, so they need a POSIX pty and no hardware.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from PyQt6.QtCore import QCoreApplication, QObject, pyqtSignal  # noqa: E402
+
+from src.device.hotplug import AutoReconnector, HotplugMonitor, PortBackend  # noqa: E402
+
+
+class StaticBackend(PortBackend):
+    def snapshot(self):
+        return {}
+
+
+class FakeScanner(QObject):
+    """Stands in for DeviceScanner: "finds" whatever port the test points it at."""
+
+    found = pyqtSignal(str)
+    not_found = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.port = None
+        self.scans = 0
+
+    def is_busy(self) -> bool:
+        return False
+
+    def scan(self) -> None:
+        self.scans += 1
+        if self.port:
+            self.found.emit(self.port)
+        else:
+            self.not_found.emit()
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    yield app
+
+
+@pytest.fixture
+def wait_until(qapp):
+    """wait_until(cond, timeout=2.0): pump the Qt event loop until cond() is true."""
+
+    def wait(cond, timeout: float = 2.0) -> bool:
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            qapp.processEvents()
+            if cond():
+                return True
+            time.sleep(0.005)
+        qapp.processEvents()
+        return bool(cond())
+
+    return wait
+
+
+@pytest.fixture
+def pump(qapp):
+    """pump(seconds): run the Qt event loop for a fixed time."""
+
+    def run(seconds: float) -> None:
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            qapp.processEvents()
+            time.sleep(0.005)
+
+    return run
+
+
+@pytest.fixture
+def sim():
+    pytest.importorskip("pty")
+    from src.device.simulator import SimConfig, VirtualPico
+
+    pico = VirtualPico(SimConfig(hb_interval_s=0.0, caps=[]))
+    yield pico
+    pico.stop()
+
+
+@pytest.fixture
+def reconnector_for(qapp):
+    """reconnector_for(client) -> (scanner, reconnector) wired the way MainWindow does."""
+    made = []
+
+    def make(client):
+        scanner = FakeScanner()
+        monitor = HotplugMonitor(backend=StaticBackend())
+        reconnector = AutoReconnector(client, scanner, monitor, debounce_ms=10, initial_backoff_s=0.05)
+        scanner.found.connect(reconnector.attach)
+        reconnector.start()
+        made.append(reconnector)
+        return scanner, reconnector
+
+    yield make
+    for reconnector in made:
+        reconnector.suspend()
+        reconnector.stop()
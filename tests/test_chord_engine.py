@@ -0,0 +1,88 @@
+# tests/test_chord_engine.py
+import pytest
+
+from src.device.chord_engine import ChordEngine, parse_chord
+
+
+def engine(*chords, window_ms=50.0):
+    e = ChordEngine(window_ms)
+    e.configure({name: "macro_x" for name in chords})
+    return e
+
+
+def test_parse_chord():
+    assert parse_chord("K1+K3") == 0b101
+    assert parse_chord(" k2 + k4 ") == 0b1010
+    assert parse_chord("K1") is None
+    assert parse_chord("K1+K1") is None
+    assert parse_chord("K0+K1") is None
+    assert parse_chord("E0_CW+K1") is None
+
+
+def test_keys_outside_chords_pass_straight_through():
+    e = engine("K1+K2")
+    assert e.on_key(3, True, "k4", now=0.0) == [("key", "k4")]
+    assert e.next_deadline() is None
+
+
+def test_window_timeout_releases_a_plain_press():
+    e = engine("K1+K2")
+    assert e.on_key(0, True, "k1", now=0.0) == []
+    assert e.next_deadline() == pytest.approx(0.05)
+    assert e.poll(now=0.049) == []
+    assert e.poll(now=0.05) == [("key", "k1")]
+    assert e.next_deadline() is None
+    assert e.on_key(0, False, "k1 up", now=0.1) == []
+
+
+def test_complete_chord_fires_at_once_and_swallows_its_ups():
+    e = engine("K1+K2")
+    e.on_key(0, True, "k1", now=0.0)
+    assert e.on_key(1, True, "k2", now=0.01) == [("chord", "K1+K2", "k2")]
+    assert e.next_deadline() is None
+    assert e.on_key(0, False, "k1 up", now=0.02) == []
+    assert e.on_key(1, False, "k2 up", now=0.03) == []
+    assert e.chords_fired == 1
+
+
+def test_release_inside_the_window():
+    e = engine("K1+K2")
+    e.on_key(0, True, "k1", now=0.0)
+    assert e.on_key(0, False, "k1 up", now=0.02) == [("key", "k1")]
+    assert e.next_deadline() is None
+    assert e.poll(now=1.0) == []
+
+
+def test_press_that_rules_the_chord_out():
+    e = engine("K1+K2", "K3+K4")
+    e.on_key(0, True, "k1", now=0.0)
+    assert e.on_key(2, True, "k3", now=0.01) == [("key", "k1")]
+    # K3 starts its own window
+    assert e.on_key(3, True, "k4", now=0.02) == [("chord", "K3+K4", "k4")]
+
+
+def test_prefix_chord_waits_for_the_longer_one():
+    e = engine("K1+K2", "K1+K2+K3")
+    e.on_key(0, True, "k1", now=0.0)
+    assert e.on_key(1, True, "k2", now=0.01) == []  # K1+K2 could still become K1+K2+K3
+    assert e.next_deadline() == pytest.approx(0.05)  # window runs from the first press
+    assert e.on_key(2, True, "k3", now=0.02) == [("chord", "K1+K2+K3", "k3")]
+
+
+def test_prefix_chord_fires_at_the_deadline():
+    e = engine("K1+K2", "K1+K2+K3")
+    e.on_key(0, True, "k1", now=0.0)
+    e.on_key(1, True, "k2", now=0.01)
+    assert e.poll(now=0.05) == [("chord", "K1+K2", "k2")]
+
+
+def test_flush_resolves_pending_keys_now():
+    e = engine("K1+K2", "K1+K2+K3")
+    e.on_key(0, True, "k1", now=0.0)
+    assert e.flush(now=0.001) == [("key", "k1")]
+    assert e.next_deadline() is None
+
+    e.on_key(0, True, "k1", now=1.0)
+    e.on_key(1, True, "k2", now=1.001)
+    assert e.flush(now=1.002) == [("chord", "K1+K2", "k2")]
+    assert e.flush(now=1.003) == []
@@ -0,0 +1,65 @@
+# tests/test_config_manager.py
+import json
+import os
+
+import pytest
+
+import src.utils.config_manager as cm
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    path = tmp_path / "config" / "macros.json"
+    monkeypatch.setattr(cm, "CONFIG_PATH", str(path))
+    cm.invalidate_cache()
+    yield path
+    cm.invalidate_cache()
+
+
+def test_save_then_load(config):
+    cm.save_macros("default", {"K1": "macro_copy"})
+    assert cm.load_macros("default") == {"K1": "macro_copy"}
+    assert json.loads(config.read_text())["default"] == {"K1": "macro_copy"}
+
+
+def test_external_edit_is_picked_up(config):
+    cm.save_macros("default", {"K1": "macro_copy"})
+    config.write_text(json.dumps({"default": {"K1": "macro_paste", "K2": "macro_cut"}}))
+    assert cm.load_macros("default") == {"K1": "macro_paste", "K2": "macro_cut"}
+
+
+def test_loaded_maps_are_copies(config):
+    cm.save_macros("default", {"K1": "macro_copy"})
+    cm.load_macros("default")["K1"] = "changed"
+    assert cm.load_macros("default") == {"K1": "macro_copy"}
+
+
+def test_failed_write_leaves_cache_and_file_alone(config):
+    cm.save_macros("default", {"K1": "macro_copy"})
+    with pytest.raises(TypeError):
+        cm.save_macros("default", {"K1": object()})  # not JSON serializable
+    assert cm.load_macros("default") == {"K1": "macro_copy"}
+    assert json.loads(config.read_text())["default"] == {"K1": "macro_copy"}
+    assert not os.path.exists(str(config) + ".tmp")
+
+
+def test_failed_replace_leaves_cache_alone(config, monkeypatch):
+    cm.save_macros("default", {"K1": "macro_copy"})
+
+    def fail(src, dst):
+        raise OSError(28, "No space left on device")
+
+    with monkeypatch.context() as m:
+        m.setattr(cm.os, "replace", fail)
+        with pytest.raises(OSError):
+            cm.save_macros("gaming", {"K1": "macro_paste"})
+
+    assert cm.load_all_macros() == {"default": {"K1": "macro_copy"}}
+    assert not os.path.exists(str(config) + ".tmp")
+
+
+def test_profiles_that_are_not_objects_are_skipped(config):
+    config.parent.mkdir(parents=True)
+    config.write_text(json.dumps({"default": {"K1": "macro_copy"}, "broken": ["K1"], "_note": "hi"}))
+    assert cm.load_all_macros() == {"default": {"K1": "macro_copy"}}
+    assert cm.load_macros("broken") == {}
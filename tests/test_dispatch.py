@@ -0,0 +1,204 @@
+# tests/test_dispatch.py
+import pytest
+
+import src.utils.macro_executor as mx
+from src.data.macro_library import MACRO_LIBRARY
+from src.device.protocol import ButtonEvent, KeyEvent
+from src.utils.input_dispatcher import InputDispatcher
+from src.utils.profile_store import ProfileStore
+
+
+class RecordingQueue:
+    """Stands in for InjectionQueue: keeps what would have been injected."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, macro_id, source, rx=None, repeat=1, plan=None, wait=True):
+        self.jobs.append((macro_id, source, plan))
+        return True
+
+
+@pytest.fixture
+def dispatcher():
+    store = ProfileStore()
+    store.load({"default": {"K1": "macro_copy", "_rate_limits": {"*": {"policy": "none"}}}})
+    d = InputDispatcher(RecordingQueue(), store)
+    d.select("default")
+    mx.add_plans_listener(d.recompile)
+    yield d
+    mx.remove_plans_listener(d.recompile)
+
+
+def press(d, k):
+    d.handle(KeyEvent(k=k, edge="down"))
+    d.handle(KeyEvent(k=k, edge="up"))
+
+
+def test_key_fires_its_plan(dispatcher):
+    press(dispatcher, 0)
+    macro_id, source, plan = dispatcher._queue.jobs[-1]
+    assert (macro_id, source) == ("macro_copy", "K1")
+    assert plan is mx.get_macro_plan("macro_copy")
+
+
+def test_rebuilt_plans_reach_the_tables(dispatcher, monkeypatch):
+    entry = next(m for group in MACRO_LIBRARY.values() for m in group if m["id"] == "macro_copy")
+    monkeypatch.setitem(entry, "keys", ["Ctrl", "Shift", "C"])
+    try:
+        mx.rebuild_macro_plans()
+        press(dispatcher, 0)
+        plan = dispatcher._queue.jobs[-1][2]
+        assert plan is mx.get_macro_plan("macro_copy")
+        assert (True, "c") in plan.steps and len(plan.held) == 2
+    finally:
+        monkeypatch.undo()
+        mx.rebuild_macro_plans()
+
+
+def test_profile_switch_flushes_held_chord_keys():
+    store = ProfileStore()
+    store.load({
+        "default": {"K1": "macro_copy", "K1+K2": "macro_paste", "_chord_window_ms": 5000,
+                    "_rate_limits": {"*": {"policy": "none"}}},
+        "other": {"K1": "macro_cut", "_rate_limits": {"*": {"policy": "none"}}},
+    })
+    d = InputDispatcher(RecordingQueue(), store)
+    d.select("default")
+
+    d.handle(KeyEvent(k=0, edge="down"))
+    assert d._queue.jobs == []  # held: K1+K2 may follow
+    d.select("other")
+    # Resolved as a plain press on the profile it was pressed in
+    assert [job[:2] for job in d._queue.jobs] == [("macro_copy", "K1")]
+
+    d.handle(KeyEvent(k=0, edge="up"))
+    press(d, 0)
+    assert [job[:2] for job in d._queue.jobs] == [("macro_copy", "K1"), ("macro_cut", "K1")]
+
+
+# ---- Layers ----
+NO_LIMITS = {"*": {"policy": "none"}}
+
+
+@pytest.fixture
+def layered():
+    store = ProfileStore()
+    store.load({
+        "default": {"K1": "layer:fn", "K3": "macro_copy", "K4": "layer_toggle:nav",
+                    "E0_BTN": "layer:fn", "_rate_limits": NO_LIMITS},
+        "fn": {"K2": "layer:sym", "K3": "macro_paste", "_rate_limits": NO_LIMITS},
+        "sym": {"K3": "macro_cut", "_rate_limits": NO_LIMITS},
+        "nav": {"K1": "layer:fn", "K3": "macro_undo", "K4": "macro_redo", "_rate_limits": NO_LIMITS},
+    })
+    switches = []
+    d = InputDispatcher(RecordingQueue(), store, on_layer=lambda active, base: switches.append(active))
+    d.select("default")
+    switches.clear()
+    return d, switches
+
+
+def key(d, k, edge):
+    d.handle(KeyEvent(k=k, edge=edge))
+
+
+def fired(d):
+    return [job[0] for job in d._queue.jobs]
+
+
+def test_momentary_hold_and_release(layered):
+    d, switches = layered
+    key(d, 0, "down")
+    assert d.active == "fn"
+    press(d, 2)
+    key(d, 0, "up")
+    assert d.active == "default"
+    press(d, 2)
+    assert fired(d) == ["macro_paste", "macro_copy"]
+    assert switches == ["fn", "default"]
+
+
+def test_nested_holds_released_out_of_order(layered):
+    d, switches = layered
+    key(d, 0, "down")                     # default -> fn
+    key(d, 1, "down")                     # fn -> sym
+    assert d.active == "sym"
+
+    key(d, 0, "up")                       # the outer hold goes first: sym stays
+    assert d.active == "sym"
+    press(d, 2)
+
+    key(d, 1, "up")                       # ...and the inner one restores default, not fn
+    assert d.active == "default"
+    press(d, 2)
+    assert fired(d) == ["macro_cut", "macro_copy"]
+    assert switches == ["fn", "sym", "default"]
+
+
+def test_nested_holds_released_in_order(layered):
+    d, _ = layered
+    key(d, 0, "down")
+    key(d, 1, "down")
+    key(d, 1, "up")
+    assert d.active == "fn"
+    key(d, 0, "up")
+    assert d.active == "default"
+
+
+def test_key_and_button_holds_nest(layered):
+    d, _ = layered
+    d.handle(ButtonEvent(id=0, edge="down"))  # default -> fn
+    key(d, 1, "down")                          # fn -> sym
+    d.handle(ButtonEvent(id=0, edge="up"))
+    assert d.active == "sym"
+    key(d, 1, "up")
+    assert d.active == "default"
+
+
+def test_toggle_with_a_momentary_hold(layered):
+    d, switches = layered
+    press(d, 3)                           # toggle into nav
+    assert d.active == "nav"
+    press(d, 2)
+
+    key(d, 0, "down")                     # hold fn on top of nav
+    assert d.active == "fn"
+    press(d, 2)
+    key(d, 0, "up")                       # back to the toggled layer, not default
+    assert d.active == "nav"
+
+    press(d, 3)                           # the toggle key leaves nav (even though nav binds K4)
+    assert d.active == "default"
+    press(d, 2)
+    assert fired(d) == ["macro_undo", "macro_paste", "macro_copy"]
+    assert switches == ["nav", "fn", "nav", "default"]
+
+
+def test_select_drops_layer_state(layered):
+    d, _ = layered
+    press(d, 3)
+    key(d, 0, "down")
+    d.select("default")
+    assert d.active == "default"
+    key(d, 0, "up")                       # stale hold: no switch
+    press(d, 3)                           # toggles in again instead of back
+    assert d.active == "nav"
+
+
+def test_layer_switch_flushes_held_chord_keys():
+    store = ProfileStore()
+    store.load({
+        "default": {"K1": "macro_copy", "K1+K2": "macro_paste", "K3": "layer:fn",
+                    "_chord_window_ms": 5000, "_rate_limits": NO_LIMITS},
+        "fn": {"K1": "macro_cut", "_rate_limits": NO_LIMITS},
+    })
+    d = InputDispatcher(RecordingQueue(), store)
+    d.select("default")
+
+    key(d, 0, "down")                     # held: K1+K2 may follow
+    key(d, 2, "down")                     # layer key: K1 resolves on default first
+    assert d.active == "fn"
+    assert fired(d) == ["macro_copy"]
+    key(d, 0, "up")
+    key(d, 1, "down")                     # no stale chord state carried into fn
+    assert fired(d) == ["macro_copy"]
@@ -0,0 +1,141 @@
+# tests/test_encoder_engine.py
+import pytest
+
+from src.device.encoder_engine import EncoderEngine, compile_curve
+
+
+def feed_all(e, events, eid=0):
+    """events: (d, pos, ts) tuples; returns the deltas applied."""
+    return [e.feed(eid, d, pos, ts) for d, pos, ts in events]
+
+
+# ---- pos recovery ----
+def test_lost_deltas_are_recovered_from_pos():
+    e = EncoderEngine(1)
+    # pos is trusted once it has moved by d
+    assert feed_all(e, [(1, 10, 0.0), (1, 11, 1.0)]) == [1, 1]
+    # Two events were dropped between these
+    assert e.feed(0, 1, 14, 2.0) == 3
+    assert e.recovered[0] == 2
+    assert e.pending(0) == 5
+
+
+def test_recovery_needs_a_tracked_pos_first():
+    e = EncoderEngine(1)
+    assert e.feed(0, 1, 10, 0.0) == 1
+    assert e.feed(0, 1, 13, 1.0) == 1  # pos not proven yet: trust d
+    assert e.recovered[0] == 0
+
+
+@pytest.mark.parametrize("pos", [9, 11 + 40, 11 - 3], ids=["backwards", "too_far", "wrong_direction"])
+def test_implausible_pos_jumps_are_ignored(pos):
+    e = EncoderEngine(1, max_gap=32)
+    feed_all(e, [(1, 10, 0.0), (1, 11, 1.0)])
+    assert e.feed(0, 1, pos, 2.0) == 1
+    assert e.resyncs[0] == 1
+    assert e.recovered[0] == 0
+
+    # Resynced to the new pos: one consistent step re-arms recovery
+    assert e.feed(0, 1, pos + 1, 3.0) == 1
+    assert e.feed(0, 1, pos + 3, 4.0) == 2
+    assert e.recovered[0] == 1
+
+
+def test_pos_that_never_moves_is_ignored():
+    e = EncoderEngine(1)
+    assert feed_all(e, [(1, 0, 0.0), (1, 0, 1.0), (-1, 0, 2.0)]) == [1, 1, -1]
+    assert e.recovered[0] == 0
+
+
+# ---- Curves ----
+def test_curve_multipliers():
+    assert set(compile_curve({"curve": "none"})) == {1.0}
+
+    linear = compile_curve({"curve": "linear", "threshold": 8, "gain": 0.25, "max": 8})
+    assert (linear[0], linear[8], linear[12], linear[200]) == (1.0, 1.0, 2.0, 8.0)
+
+    power = compile_curve({"curve": "power", "threshold": 8, "exponent": 2, "max": 8})
+    assert (power[4], power[8], power[16], power[100]) == (1.0, 1.0, 4.0, 8.0)
+
+    table = compile_curve({"curve": "table", "points": [[0, 1], [20, 2], [60, 6]], "max": 5})
+    assert table[10] == pytest.approx(1.5)
+    assert table[40] == pytest.approx(4.0)
+    assert table[100] == 5.0  # capped
+
+
+@pytest.mark.parametrize("spec", [
+    {"curve": "spiral"},
+    {"curve": "table"},
+    {"curve": "power", "threshold": 0},
+    {"curve": "linear", "max": 0.5},
+])
+def test_invalid_curves(spec):
+    with pytest.raises(ValueError):
+        compile_curve(spec)
+
+
+def test_velocity_scales_the_delta():
+    e = EncoderEngine(1, smoothing=1.0, idle_ms=150)
+    e.configure({"curve": "linear", "threshold": 8, "gain": 0.25})
+    e.feed(0, 1, None, 0.0)                 # from rest: x1
+    e.feed(0, 1, None, 0.05)                # 20 detents/s: x4
+    assert e.velocity(0) == pytest.approx(20.0)
+    assert e.pending(0) == 5
+    e.feed(0, 1, None, 1.0)                 # after a pause: from rest again
+    assert e.velocity(0) == 0.0
+    assert e.pending(0) == 6
+
+
+def test_per_encoder_override_and_invalid_config():
+    e = EncoderEngine(2, smoothing=1.0)
+    e.configure({"curve": "linear", "threshold": 0, "gain": 1.0, "E1": {"curve": "bogus"}})
+    for eid in (0, 1):
+        e.feed(eid, 1, None, 0.0)
+        e.feed(eid, 1, None, 0.1)           # 10 detents/s
+    assert e.pending(0) == 1 + 8            # x8: 1 + 10, capped at max
+    assert e.pending(1) == 2                # bad config falls back to no curve
+
+
+def test_firmware_ts_wraparound():
+    e = EncoderEngine(1, smoothing=1.0)
+    wrap = 2 ** 32 / 1000.0
+    e.feed(0, 1, None, wrap - 0.05)
+    e.feed(0, 1, None, 0.05)                # u32 ms counter wrapped: 0.1 s later
+    assert e.velocity(0) == pytest.approx(10.0)
+
+
+# ---- Quantization ----
+def test_steps_per_action_quantizes():
+    e = EncoderEngine(1, steps_per_action=4)
+    for t in range(3):
+        e.feed(0, 1, None, t)
+    assert e.pending(0) == 0
+    e.feed(0, 1, None, 3)
+    assert e.take(0) == 1
+    assert e.pending(0) == 0
+
+    for t in range(4, 10):                  # 6 more: one action, 2 left over
+        e.feed(0, 1, None, t)
+    assert e.take(0) == 1
+    e.feed(0, 1, None, 10)
+    e.feed(0, 1, None, 11)
+    assert e.take(0) == 1
+
+
+def test_direction_change_drops_the_partial_step():
+    e = EncoderEngine(1, steps_per_action=4)
+    for t in range(3):
+        e.feed(0, 1, None, t)
+    for t in range(3, 7):
+        e.feed(0, -1, None, t)
+    assert e.take(0) == -1
+    assert e.pending(0) == 0
+
+
+def test_profile_steps_per_action():
+    e = EncoderEngine(2)
+    e.configure({"steps_per_action": 2, "E1": {"steps_per_action": 4}})
+    for t in range(4):
+        e.feed(0, 1, None, t)
+        e.feed(1, 1, None, t)
+    assert (e.pending(0), e.pending(1)) == (2, 1)
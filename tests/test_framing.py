@@ -0,0 +1,103 @@
+# tests/test_framing.py
+import pytest
+
+from src.device.binary_protocol import (
+    SYNC, FrameError, _frame, decode_frame, encode_btn, encode_enc, encode_hb, encode_key,
+)
+from src.device.framing import LineFramer, decode_lines
+from src.device.protocol import ButtonEvent, EncoderEvent, Heartbeat, KeyEvent
+
+KEY = encode_key(2, "down", 1.5)
+ENC = encode_enc(0, -1, 7, 2.0)
+HELLO = b'{"t":"hello","keys":3}\n'
+
+
+def test_frames_and_lines_interleave():
+    framer = LineFramer()
+    lines, events, errors = framer.feed_mixed(KEY + HELLO + ENC + encode_btn(1, "up") + encode_hb(3.0), rx=9.0)
+    assert lines == [HELLO.rstrip()]
+    assert events == [
+        KeyEvent(2, "down", 1.5),
+        EncoderEvent(0, -1, 7, 2.0),
+        ButtonEvent(1, "up", 0.0),
+        Heartbeat(3.0),
+    ]
+    assert events[0].rx == 9.0
+    assert not errors
+    assert framer.pending() == 0
+
+
+def test_crc_mismatch_is_reported_and_skipped():
+    bad = bytearray(KEY)
+    bad[4] ^= 0x01  # a payload bit
+    lines, events, errors = LineFramer().feed_mixed(bytes(bad) + ENC)
+    assert [reason for _, reason in errors] == ["crc mismatch"]
+    assert errors[0][0] == bytes(bad)
+    assert events == [EncoderEvent(0, -1, 7, 2.0)]
+
+
+def test_unknown_frame_type():
+    unknown = _frame(0x7F, b"\x01\x02")
+    _, events, errors = LineFramer().feed_mixed(unknown + KEY)
+    assert [reason for _, reason in errors] == ["unknown frame type 0x7f"]
+    assert events == [KeyEvent(2, "down", 1.5)]
+
+
+def test_bad_payload_length():
+    short = _frame(KEY[1], KEY[3:-3])
+    _, events, errors = LineFramer().feed_mixed(short + KEY)
+    assert "bad payload length" in errors[0][1]
+    assert events == [KeyEvent(2, "down", 1.5)]
+
+
+def test_resync_after_noise():
+    noise = b"\x00\x13garbage\xff"
+    lines, events, errors = LineFramer().feed_mixed(noise + KEY + b"\x7f\x7f" + HELLO)
+    assert events == [KeyEvent(2, "down", 1.5)]
+    assert lines == [HELLO.rstrip()]
+    assert not errors
+
+
+def test_stray_sync_byte_resyncs_on_the_next_one():
+    # A lone 0xA5 reads as a header over the real frame: rejected, then resync
+    _, events, errors = LineFramer().feed_mixed(bytes((SYNC, 0x13, 0x00)) + KEY)
+    assert len(errors) == 1
+    assert events == [KeyEvent(2, "down", 1.5)]
+
+
+def test_frame_split_across_reads():
+    framer = LineFramer()
+    stream = KEY + HELLO + ENC
+    seen_events, seen_lines = [], []
+    for i in range(len(stream)):
+        lines, events, errors = framer.feed_mixed(stream[i:i + 1])
+        assert not errors
+        seen_events += events
+        seen_lines += lines
+        if i < len(KEY) - 1:
+            assert framer.pending() == i + 1  # incomplete frame is kept, not dropped
+    assert seen_events == [KeyEvent(2, "down", 1.5), EncoderEvent(0, -1, 7, 2.0)]
+    assert seen_lines == [HELLO.rstrip()]
+    assert framer.pending() == 0
+
+
+def test_overlong_line_is_dropped_in_mixed_mode():
+    framer = LineFramer(max_line=16)
+    lines, events, _ = framer.feed_mixed(b"{" + b"x" * 32)
+    assert (lines, events, framer.dropped) == ([], [], 1)
+    lines, events, _ = framer.feed_mixed(b"\n" + KEY)
+    assert events == [KeyEvent(2, "down", 1.5)]
+
+
+def test_decode_frame():
+    assert decode_frame(ENC) == EncoderEvent(0, -1, 7, 2.0)
+    with pytest.raises(FrameError, match="bad sync byte"):
+        decode_frame(b"\x00" + ENC[1:])
+    with pytest.raises(FrameError, match="length mismatch"):
+        decode_frame(ENC + b"\x00")
+
+
+def test_decode_lines_keeps_the_good_lines():
+    msgs, errors = decode_lines([b'{"t":"hb"}', b'{"t":', b"[1]", b'{"t":"key"}'])
+    assert msgs == [{"t": "hb"}, {"t": "key"}]
+    assert [raw for raw, _ in errors] == [b'{"t":', b"[1]"]
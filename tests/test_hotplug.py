@@ -0,0 +1,84 @@
+# tests/test_hotplug.py
+import pytest
+
+from src.device.hotplug import PortBackend
+from src.device.pico_serial import PicoSerialClient
+
+
+@pytest.fixture
+def rig(sim, reconnector_for):
+    client = PicoSerialClient()
+    scanner, reconnector = reconnector_for(client)
+    yield client, scanner, reconnector
+    client.stop()
+
+
+def test_port_backend_is_abstract():
+    class Half(PortBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Half()
+
+
+def test_restart_on_live_link_is_not_a_loss(rig, sim, wait_until, pump):
+    client, scanner, reconnector = rig
+    port = scanner.port = sim.start()
+    client.start(port)
+    assert wait_until(lambda: reconnector.state == "connected")
+
+    # Link reset / Connect pressed while connected
+    client.start(port)
+    client.start(port)
+    pump(0.5)
+
+    assert reconnector.state == "connected"
+    assert reconnector.reconnects == 0
+    assert scanner.scans == 0
+
+
+def test_unplug_reattaches_once(rig, sim, wait_until, pump):
+    client, scanner, reconnector = rig
+    client.start(sim.start())
+    assert wait_until(lambda: reconnector.state == "connected")
+
+    sim.stop()
+    assert wait_until(lambda: reconnector.state == "lost")
+    scanner.port = sim.start()
+    assert wait_until(lambda: reconnector.state == "connected")
+    pump(0.5)
+
+    assert reconnector.reconnects == 1
+    assert scanner.scans == 1
+    assert client.is_open
+
+
+def test_user_stop_is_not_fought(rig, sim, wait_until, pump):
+    client, scanner, reconnector = rig
+    scanner.port = sim.start()
+    client.start(scanner.port)
+    assert wait_until(lambda: reconnector.state == "connected")
+
+    reconnector.suspend()
+    client.stop()
+    pump(0.3)
+
+    assert not client.is_open
+    assert scanner.scans == 0
+
+
+def test_port_that_cannot_be_opened_keeps_retrying(rig, sim, wait_until):
+    client, scanner, reconnector = rig
+    client.start(sim.start())
+    assert wait_until(lambda: reconnector.state == "connected")
+
+    sim.stop()
+    assert wait_until(lambda: reconnector.state == "lost")
+    # The scan finds a port that's gone again by the time it's opened
+    scanner.port = "/dev/mnav-test-missing"
+    assert wait_until(lambda: scanner.scans >= 2)
+    assert reconnector.state == "lost"
+
+    scanner.port = sim.start()
+    assert wait_until(lambda: reconnector.state == "connected")
+    assert client.is_open
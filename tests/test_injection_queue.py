@@ -0,0 +1,161 @@
+# tests/test_injection_queue.py
+import threading
+import time
+
+import src.utils.macro_executor as mx
+from src.device.protocol import KeyEvent
+from src.utils.injection_backends import NullBackend
+from src.utils.injection_queue import InjectionQueue
+from src.utils.input_dispatcher import InputDispatcher
+from src.utils.profile_store import ProfileStore
+
+
+def make_queue(policy, max_depth=2, run=None, repeatable=("scroll",), **kw):
+    """A queue whose consumer isn't started unless the test does it."""
+    ran = []
+
+    def record(macro_id, rx, t_submit, repeat, plan):
+        ran.append((macro_id, repeat))
+
+    q = InjectionQueue(
+        max_depth=max_depth,
+        policy=policy,
+        run=run or record,
+        repeatable=lambda macro_id: macro_id in repeatable,
+        **kw,
+    )
+    return q, ran
+
+
+def queued(q):
+    return [(j.macro_id, j.source, j.repeat) for j in q._q]
+
+
+def test_drop_oldest_makes_room():
+    q, _ = make_queue("drop_oldest")
+    assert q.submit("a", "K1")
+    assert q.submit("b", "K2")
+    assert q.submit("c", "K3")
+    assert queued(q) == [("b", "K2", 1), ("c", "K3", 1)]
+    assert q.dropped == 1
+
+
+def test_coalesce_folds_into_a_queued_job():
+    q, _ = make_queue("coalesce")
+    q.submit("a", "K1")
+    q.submit("b", "K2")
+    assert q.submit("a", "K1")
+    assert queued(q) == [("a", "K1", 2), ("b", "K2", 1)]
+    assert (q.coalesced, q.dropped) == (1, 0)
+
+    # Nothing to fold into: falls back to drop_oldest
+    assert q.submit("c", "K3")
+    assert queued(q) == [("b", "K2", 1), ("c", "K3", 1)]
+    assert q.dropped == 1
+
+
+def test_block_drops_the_new_job_after_the_timeout():
+    q, _ = make_queue("block", max_depth=1, block_timeout_s=0.1)
+    q.submit("a", "K1")
+    t0 = time.monotonic()
+    assert not q.submit("b", "K2")
+    assert time.monotonic() - t0 >= 0.09
+    assert queued(q) == [("a", "K1", 1)]
+    assert q.dropped == 1
+
+
+def test_block_without_wait_drops_right_away():
+    q, _ = make_queue("block", max_depth=1, block_timeout_s=5.0)
+    q.submit("a", "K1")
+    t0 = time.monotonic()
+    assert not q.submit("b", "K2", wait=False)
+    assert time.monotonic() - t0 < 0.5
+    assert q.dropped == 1
+
+
+def test_block_waits_for_room():
+    gate = threading.Event()
+    q, ran = make_queue("block", max_depth=1, block_timeout_s=2.0)
+    record = q._run
+
+    def slow(*args):
+        gate.wait(2.0)
+        record(*args)
+
+    q._run = slow
+    q.start()
+    try:
+        q.submit("a", "K1")
+        deadline = time.monotonic() + 1.0
+        while q.depth() and time.monotonic() < deadline:
+            time.sleep(0.005)  # consumer took "a" and is stuck on the gate
+        q.submit("b", "K2")
+        threading.Timer(0.05, gate.set).start()
+        assert q.submit("c", "K3")  # room once "b" is taken
+        deadline = time.monotonic() + 1.0
+        while len(ran) < 3 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert ran == [("a", 1), ("b", 1), ("c", 1)]
+        assert q.dropped == 0
+    finally:
+        gate.set()
+        q.stop()
+
+
+def test_dispatcher_never_waits_on_a_full_queue():
+    store = ProfileStore()
+    store.load({"default": {"K1": "macro_copy", "_rate_limits": {"*": {"policy": "none"}}}})
+    queue = InjectionQueue(max_depth=1, policy="block", block_timeout_s=5.0)
+    d = InputDispatcher(queue, store)
+    d.select("default")
+
+    t0 = time.monotonic()
+    for _ in range(3):
+        d.handle(KeyEvent(k=0, edge="down"))
+        d.handle(KeyEvent(k=0, edge="up"))
+    assert time.monotonic() - t0 < 1.0
+    assert queue.depth() == 1
+    assert queue.dropped == 2
+
+
+def test_repeatable_jobs_merge_into_one_operation():
+    prev = mx.set_backend(NullBackend())
+    backend = mx._backend
+    q = InjectionQueue(max_depth=32)
+    try:
+        plan = mx.get_macro_plan
+        for _ in range(3):
+            q.submit("macro_scroll_down", "E0_CCW", plan=plan("macro_scroll_down"))
+        q.submit("macro_scroll_down", "E1_CCW", plan=plan("macro_scroll_down"))  # other input
+        q.submit("macro_vol_up", "E1_CW", plan=plan("macro_vol_up"), repeat=2)
+        q.submit("macro_vol_up", "E1_CW", plan=plan("macro_vol_up"))
+        # Not repeatable: one job per fire, in order
+        q.submit("macro_copy", "K1", plan=plan("macro_copy"))
+        q.submit("macro_copy", "K1", plan=plan("macro_copy"))
+        q.submit("macro_scroll_down", "E0_CCW", plan=plan("macro_scroll_down"))  # not next to the first run
+
+        assert queued(q) == [
+            ("macro_scroll_down", "E0_CCW", 3),
+            ("macro_scroll_down", "E1_CCW", 1),
+            ("macro_vol_up", "E1_CW", 3),
+            ("macro_copy", "K1", 1),
+            ("macro_copy", "K1", 1),
+            ("macro_scroll_down", "E0_CCW", 1),
+        ]
+        assert q.merged == 3
+
+        q.start()
+        deadline = time.monotonic() + 2.0
+        while q.executed < 6 and time.monotonic() < deadline:
+            time.sleep(0.005)
+    finally:
+        q.stop()
+        mx.set_backend(prev or NullBackend())
+
+    vol = mx.get_macro_plan("macro_vol_up").steps
+    copy = mx.get_macro_plan("macro_copy").steps
+    expected = [("scroll", -3), ("scroll", -1)]
+    expected += [("press" if down else "release", k) for down, k in vol * 3]
+    expected += [("press" if down else "release", k) for down, k in copy * 2]
+    expected += [("scroll", -1)]
+    assert backend.ops == expected
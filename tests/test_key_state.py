@@ -0,0 +1,42 @@
+# tests/test_key_state.py
+import uuid
+from multiprocessing import shared_memory
+
+import pytest
+
+from src.device.key_state import KeyState, KeyStateShm, read_shm_snapshot
+
+
+@pytest.fixture
+def shm_name():
+    return f"mnav_test_{uuid.uuid4().hex[:8]}"
+
+
+def test_owner_mirrors_and_unlinks(shm_name):
+    ks = KeyState(3, shm_name=shm_name)
+    ks.set(1, True)
+    reader = shared_memory.SharedMemory(name=shm_name)
+    try:
+        assert read_shm_snapshot(reader.buf)[1:] == (3, 0b010)
+    finally:
+        reader.close()
+    ks.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shm_name)
+
+
+def test_attaching_leaves_the_segment_alone(shm_name):
+    owner = KeyStateShm(shm_name)
+    try:
+        owner.write(7, 4, 0b1001)
+        guest = KeyStateShm(shm_name)
+        assert not guest._owner
+        assert read_shm_snapshot(owner._buf) == (7, 4, 0b1001)  # not zeroed
+        guest.close()
+
+        # Still there for the process that created it
+        assert read_shm_snapshot(owner._buf) == (7, 4, 0b1001)
+        probe = shared_memory.SharedMemory(name=shm_name)
+        probe.close()
+    finally:
+        owner.close()
@@ -0,0 +1,61 @@
+# tests/test_launcher.py
+import os
+import time
+
+import pytest
+
+from src.utils.launcher import Launcher, LaunchSpec
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="helper path needs fork")
+
+
+@pytest.fixture
+def launcher():
+    lx = Launcher()
+    lx.start()
+    yield lx
+    lx.shutdown()
+
+
+def run(launcher: Launcher, macro_id: str, spec: LaunchSpec, timeout: float = 5.0):
+    assert launcher.launch(macro_id, spec)
+    end = time.monotonic() + timeout
+    while launcher.running(macro_id) and time.monotonic() < end:
+        time.sleep(0.01)
+    assert launcher.running(macro_id) == 0
+    return launcher.last_exit.get(macro_id)
+
+
+def test_script_exit_code_passes_through(launcher, tmp_path):
+    script = tmp_path / "exit3.py"
+    script.write_text("import sys\nsys.exit(3)\n")
+    assert run(launcher, "m", LaunchSpec(script=str(script))) == (3, None)
+    assert launcher.failed == 0 and launcher.nonzero == 1
+
+
+def test_script_exception_is_not_a_start_failure(launcher, tmp_path):
+    script = tmp_path / "boom.py"
+    script.write_text("raise ValueError('bad input')\n")
+    code, text = run(launcher, "m", LaunchSpec(script=str(script)))
+    assert code == 1
+    assert text == "ValueError: bad input"
+    assert launcher.failed == 0
+
+
+def test_missing_command_is_a_start_failure(launcher):
+    code, text = run(launcher, "m", LaunchSpec(argv=("definitely-not-a-command-mnav",)))
+    assert code == 127
+    assert "definitely-not-a-command-mnav" in text
+    assert launcher.failed == 1
+
+
+def test_relative_paths_resolve_against_our_cwd(launcher, tmp_path, monkeypatch):
+    (tmp_path / "tools").mkdir()
+    (tmp_path / "tools" / "touch.py").write_text("open('touched', 'w').close()\n")
+    monkeypatch.chdir(tmp_path)
+
+    assert run(launcher, "m", LaunchSpec(script="tools/touch.py")) == (0, None)
+    assert (tmp_path / "touched").exists()
+
+    assert run(launcher, "m", LaunchSpec(script="touch.py", cwd="tools")) == (0, None)
+    assert (tmp_path / "tools" / "touched").exists()
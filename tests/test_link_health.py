@@ -0,0 +1,45 @@
+# tests/test_link_health.py
+import pytest
+
+from src.device.link_health import LinkHealthMonitor
+from src.device.pico_serial import PicoSerialClient
+
+
+@pytest.fixture
+def hung_rig(reconnector_for):
+    pytest.importorskip("pty")
+    from src.device.simulator import SimConfig, VirtualPico
+
+    sim = VirtualPico(SimConfig(hb_interval_s=0.05, hang_after_s=0.5, caps=[]))
+    client = PicoSerialClient()
+    scanner, reconnector = reconnector_for(client)
+    health = LinkHealthMonitor(client, expected_period_s=0.05)
+    client.heartbeat.connect(health.on_heartbeat)
+    yield sim, client, scanner, reconnector, health
+    client.stop()
+    sim.stop()
+
+
+def test_reset_is_not_a_device_loss(hung_rig, wait_until, pump):
+    sim, client, scanner, reconnector, health = hung_rig
+    client.start(sim.start())
+    assert wait_until(lambda: health.hb_count >= 3)
+
+    # The sim goes silent with the port open: one stall, one link reset
+    assert wait_until(lambda: health.stalls == 1, timeout=3.0)
+    assert health.reconnects == 1
+    assert reconnector.state == "connected"
+    assert reconnector.reconnects == 0
+    assert scanner.scans == 0
+
+
+def test_silent_after_reset_hands_over_to_reconnect(hung_rig, wait_until, pump):
+    sim, client, scanner, reconnector, health = hung_rig
+    client.start(sim.start())
+    assert wait_until(lambda: health.stalls == 1, timeout=3.0)
+
+    # Still silent after the reset: the client is closed and reconnect scans
+    assert wait_until(lambda: reconnector.state == "lost", timeout=3.0)
+    assert not client.is_open
+    assert wait_until(lambda: scanner.scans >= 1)
+    assert health.stalls == 1
@@ -0,0 +1,55 @@
+# tests/test_macro_plans.py
+import pytest
+
+import src.utils.macro_executor as mx
+from src.data.macro_library import MACRO_LIBRARY
+from src.utils.injection_backends import KeyName, NullBackend
+
+
+class FewKeysBackend(NullBackend):
+    """A backend without F21-F24, like pynput on most platforms."""
+
+    def has_key(self, key) -> bool:
+        return not (isinstance(key, KeyName) and key.name in ("f21", "f22", "f23", "f24"))
+
+
+@pytest.fixture
+def backend():
+    prev = mx.set_backend(FewKeysBackend())
+    yield mx._backend
+    mx.set_backend(prev or NullBackend())
+
+
+def test_keys_the_backend_lacks_fail_at_compile_time(backend):
+    with pytest.raises(ValueError, match="f21"):
+        mx._compile_macro("t", {"type": "hotkey", "keys": ["Ctrl", "F21"]})
+    with pytest.raises(ValueError, match="f24"):
+        mx._compile_macro("t", {"type": "sequence", "steps": [{"keys": ["F24"]}]})
+    assert mx._compile_macro("t", {"type": "hotkey", "keys": ["Ctrl", "F20"]}) is not None
+
+
+def test_backend_swap_relists_invalid_macros(monkeypatch):
+    entry = next(m for group in MACRO_LIBRARY.values() for m in group if m["id"] == "macro_copy")
+    monkeypatch.setitem(entry, "keys", ["Ctrl", "F22"])
+    prev = mx.set_backend(NullBackend())
+    try:
+        assert "macro_copy" not in mx.INVALID_MACROS
+        mx.set_backend(FewKeysBackend())
+        assert "macro_copy" in mx.INVALID_MACROS
+        assert mx.get_macro_plan("macro_copy") is None
+    finally:
+        monkeypatch.undo()
+        mx.set_backend(prev or NullBackend())
+    assert "macro_copy" not in mx.INVALID_MACROS
+
+
+def test_pynput_key_set():
+    pytest.importorskip("pynput")
+    from src.utils.injection_backends import PynputBackend
+
+    try:
+        pynput = PynputBackend()
+    except Exception as e:  # no display and no PYNPUT_BACKEND=dummy
+        pytest.skip(f"pynput unavailable: {e}")
+    assert pynput.has_key(KeyName("ctrl")) and pynput.has_key("x")
+    assert not pynput.has_key(KeyName("no_such_key"))
@@ -0,0 +1,220 @@
+# tests/test_pico_serial.py
+"""PicoSerialClient end to end against the PTY virtual Pico."""
+import pytest
+
+from src.device.binary_protocol import CAP_BIN1
+from src.device.pico_serial import PicoSerialClient
+from src.device.protocol import ButtonEvent, EncoderEvent, HelloInfo, KeyEvent
+
+
+class Recorder:
+    """Collects everything the client emits."""
+
+    def __init__(self, client: PicoSerialClient):
+        self.events = []
+        self.errors = []
+        self.connected = []
+        self.disconnected = 0
+        client.hello.connect(self.events.append)
+        client.heartbeat.connect(lambda ts: self.events.append(("hb", ts)))
+        client.key_event.connect(self.events.append)
+        client.encoder_event.connect(self.events.append)
+        client.button_event.connect(self.events.append)
+        client.events_batch.connect(self.events.extend)
+        client.parse_error.connect(self.errors.append)
+        client.connected.connect(self.connected.append)
+        client.disconnected.connect(self._on_disconnected)
+
+    def _on_disconnected(self):
+        self.disconnected += 1
+
+    def of(self, cls):
+        return [e for e in self.events if isinstance(e, cls)]
+
+
+@pytest.fixture(params=["bulk", "line"])
+def link(request, qapp, sim, wait_until):
+    client = PicoSerialClient(read_mode=request.param)
+    rec = Recorder(client)
+    client.start(sim.start())
+    sim.send_hello()  # opening the port flushed the boot-time hello
+    assert wait_until(lambda: rec.of(HelloInfo))
+    yield client, rec
+    client.stop()
+
+
+def test_hello(link):
+    client, rec = link
+    info = rec.of(HelloInfo)[0]
+    assert info.type == "pico-macropad-backend"
+    assert info.keys == 3
+    assert len(client.key_state) == 3
+    assert not client.binary_active  # the default sim doesn't advertise bin1
+
+
+def test_heartbeat(link, sim, wait_until):
+    _, rec = link
+    sim.send_hb()
+    assert wait_until(lambda: [e for e in rec.events if isinstance(e, tuple)])
+    _, ts = [e for e in rec.events if isinstance(e, tuple)][0]
+    assert isinstance(ts, float) and ts > 0
+
+
+def test_input_events(link, sim, wait_until):
+    client, rec = link
+    sim.send_key(1, "down")
+    sim.send_enc(0, 1)
+    sim.send_enc(0, 1)
+    sim.send_enc(0, -1)
+    sim.send_btn(0, "down")
+    assert wait_until(lambda: rec.of(ButtonEvent))
+
+    key = rec.of(KeyEvent)[0]
+    assert (key.k, key.edge) == (1, "down")
+    assert client.key_state.is_down(1)
+    assert [(e.id, e.d, e.pos) for e in rec.of(EncoderEvent)] == [(0, 1, 1), (0, 1, 2), (0, -1, 1)]
+    assert (rec.of(ButtonEvent)[0].id, rec.of(ButtonEvent)[0].edge) == (0, "down")
+    # The decoder stamps the host read time
+    assert all(e.rx is not None for e in rec.of((KeyEvent, EncoderEvent, ButtonEvent)))
+    assert not rec.errors
+
+
+def test_malformed_lines_are_reported_and_skipped(link, sim, wait_until):
+    _, rec = link
+    sim.config.malformed_rate = 1.0
+    for _ in range(3):
+        sim.send_key(0, "down")
+    sim.config.malformed_rate = 0.0
+    sim.send_key(2, "down")
+    assert wait_until(lambda: rec.of(KeyEvent))
+
+    assert [e.k for e in rec.of(KeyEvent)] == [2]
+    assert len(rec.errors) == 3
+
+
+def test_handler_error_does_not_drop_the_read(link, sim, wait_until):
+    client, rec = link
+
+    def fail_on_first(ev):
+        if ev.k == 0:
+            raise RuntimeError("boom")
+        rec.events.append(ev)
+
+    client.register_handler(KeyEvent, fail_on_first)
+    for k in (0, 1, 2):
+        sim.send_key(k, "down")
+    assert wait_until(lambda: len(rec.of(KeyEvent)) == 2)
+    assert [e.k for e in rec.of(KeyEvent)] == [1, 2]
+    assert any("boom" in e for e in rec.errors)
+
+
+def test_unplug_emits_one_disconnect(link, sim, wait_until, pump):
+    client, rec = link
+    sim.unplug()
+    assert wait_until(lambda: rec.disconnected)
+    pump(0.3)
+    assert rec.disconnected == 1
+    assert not client.is_open
+
+    client.stop()  # already closed: nothing more to report
+    pump(0.1)
+    assert rec.disconnected == 1
+
+
+def test_restart_is_not_a_disconnect(link, sim, wait_until, pump):
+    client, rec = link
+    port = rec.connected[0]
+    client.start(port)
+    client.start(port)
+    pump(0.5)
+    assert rec.disconnected == 0
+    assert rec.connected == [port] * 3
+
+    # The new session still reads
+    sim.send_key(2, "down")
+    assert wait_until(lambda: rec.of(KeyEvent))
+
+    client.stop()
+    pump(0.3)
+    assert rec.disconnected == 1
+
+
+def test_failed_restart_reports_the_loss(link, sim, pump):
+    client, rec = link
+    with pytest.raises(Exception):
+        client.start("/dev/nonexistent-pico")
+    pump(0.1)
+    assert rec.disconnected == 1
+    assert not client.is_open
+
+
+def test_bin1_switch(qapp, wait_until):
+    pytest.importorskip("pty")
+    from src.device.simulator import SimConfig, VirtualPico
+
+    sim = VirtualPico(SimConfig(hb_interval_s=0.0, caps=[CAP_BIN1]))
+    client = PicoSerialClient()
+    rec = Recorder(client)
+    try:
+        client.start(sim.start())
+        sim.send_hello()
+        assert wait_until(lambda: client.binary_active and sim.binary)
+
+        sim.send_key(1, "down")
+        sim.send_enc(0, -1)
+        sim.send_btn(0, "up")
+        assert wait_until(lambda: rec.of(ButtonEvent))
+        assert (rec.of(KeyEvent)[0].k, rec.of(KeyEvent)[0].edge) == (1, "down")
+        assert rec.of(EncoderEvent)[0].d == -1
+        assert rec.of(ButtonEvent)[0].edge == "up"
+        assert all(e.rx is not None for e in rec.of((KeyEvent, EncoderEvent, ButtonEvent)))
+        assert not rec.errors
+    finally:
+        client.stop()
+        sim.stop()
+
+
+def test_bin1_not_requested_in_json_mode(qapp, wait_until, pump):
+    pytest.importorskip("pty")
+    from src.device.simulator import SimConfig, VirtualPico
+
+    sim = VirtualPico(SimConfig(hb_interval_s=0.0, caps=[CAP_BIN1]))
+    client = PicoSerialClient(wire="json")
+    rec = Recorder(client)
+    try:
+        client.start(sim.start())
+        sim.send_hello()
+        assert wait_until(lambda: rec.of(HelloInfo))
+        pump(0.2)
+        assert not client.binary_active and not sim.binary
+    finally:
+        client.stop()
+        sim.stop()
+
+
+def test_bin1_corrupt_frames_are_reported(qapp, wait_until):
+    pytest.importorskip("pty")
+    from src.device.simulator import SimConfig, VirtualPico
+
+    sim = VirtualPico(SimConfig(hb_interval_s=0.0, caps=[CAP_BIN1], seed=3))
+    client = PicoSerialClient()
+    rec = Recorder(client)
+    try:
+        client.start(sim.start())
+        sim.send_hello()
+        assert wait_until(lambda: client.binary_active and sim.binary)
+
+        sim.config.malformed_rate = 1.0
+        for _ in range(12):
+            sim.send_enc(0, 1)
+        sim.config.malformed_rate = 0.0
+        sim.send_key(2, "down")
+
+        assert wait_until(lambda: rec.of(KeyEvent))
+        assert sim.sent["bad"] == 12
+        assert rec.errors  # crc / unknown type / stray sync
+        assert rec.of(KeyEvent)[0].k == 2
+        assert client.is_open
+    finally:
+        client.stop()
+        sim.stop()
@@ -0,0 +1,86 @@
+# tests/test_rate_limiter.py
+import pytest
+
+from src.utils.rate_limiter import RateLimiter
+
+
+def limiter(overrides, defaults=None):
+    r = RateLimiter(defaults)
+    r.configure(overrides)
+    return r
+
+
+def fires(r, name, times):
+    return [r.allow_name(name, t) for t in times]
+
+
+def test_cooldown_fires_once_per_window():
+    r = limiter({"K1": {"policy": "cooldown", "ms": 100}})
+    assert fires(r, "K1", [0.0, 0.05, 0.099, 0.1, 0.15, 0.25]) == [True, False, False, True, False, True]
+
+
+def test_debounce_counts_every_event():
+    r = limiter({"K1": {"policy": "debounce", "ms": 30}})
+    # Events 20 ms apart keep pushing the window out, fired or not
+    assert fires(r, "K1", [0.0, 0.02, 0.04, 0.06, 0.1]) == [True, False, False, False, True]
+
+
+def test_token_bucket_burst_then_rate():
+    r = limiter({"E0_CW": {"policy": "token_bucket", "rate": 10, "burst": 3}})
+    assert fires(r, "E0_CW", [0.0, 0.0, 0.0, 0.0]) == [True, True, True, False]
+    assert fires(r, "E0_CW", [0.05, 0.1, 0.15]) == [False, True, False]
+    assert fires(r, "E0_CW", [10.0] * 4) == [True, True, True, False]  # refills to burst, not beyond
+
+
+def test_none_never_limits():
+    r = limiter({"*": {"policy": "none"}})
+    assert all(fires(r, "K1", [0.0] * 10))
+
+
+def test_exact_name_beats_patterns():
+    r = limiter({
+        "K1": {"policy": "none"},
+        "K*": {"policy": "cooldown", "ms": 1000},
+    })
+    assert fires(r, "K1", [0.0, 0.0]) == [True, True]
+    assert fires(r, "K2", [0.0, 0.0]) == [True, False]
+
+
+def test_later_pattern_beats_earlier_one():
+    r = limiter({
+        "*": {"policy": "cooldown", "ms": 1000},
+        "E*_CW": {"policy": "none"},
+    })
+    assert fires(r, "E0_CW", [0.0, 0.0]) == [True, True]
+    assert fires(r, "E0_BTN", [0.0, 0.0]) == [True, False]
+
+
+def test_defaults_cover_what_the_profile_leaves_out():
+    r = limiter({"K1": {"policy": "none"}})
+    assert fires(r, "K1", [0.0, 0.0]) == [True, True]
+    assert fires(r, "K2", [0.0, 0.1, 0.15]) == [True, False, True]      # K*: 150 ms
+    assert fires(r, "E0_CW", [0.0, 0.04, 0.05]) == [True, False, True]  # E*_CW: 50 ms
+    assert fires(r, "X9", [0.0, 0.0]) == [True, True]                   # uncovered: none
+
+
+@pytest.mark.parametrize("spec", [
+    {"policy": "sometimes"},
+    {"policy": "cooldown", "ms": -5},
+    {"policy": "token_bucket", "rate": 0},
+    {"policy": "token_bucket", "rate": 5, "burst": 0.5},
+    {"policy": "cooldown", "ms": "fast"},
+    "cooldown",
+])
+def test_invalid_spec_falls_back_to_defaults(spec):
+    r = limiter({"K1": spec})
+    assert fires(r, "K1", [0.0, 0.1, 0.15]) == [True, False, True]  # default K*: 150 ms
+
+
+def test_reconfigure_reresolves_existing_slots():
+    r = limiter({"K1": {"policy": "none"}})
+    slot = r.slot("K1")
+    assert fires(r, "K1", [0.0, 0.0]) == [True, True]
+    r.configure({"K1": {"policy": "cooldown", "ms": 100}})
+    assert r.slot("K1") == slot
+    assert fires(r, "K1", [1.0, 1.0]) == [True, False]
+    assert r.stats()["K1"] == {"allowed": 3, "limited": 1}
@@ -0,0 +1,132 @@
+# tests/test_text_macros.py
+import os
+import time
+
+import pytest
+
+import src.utils.clipboard as clipboard
+import src.utils.macro_executor as mx
+from src.utils.injection_backends import NullBackend
+
+
+@pytest.fixture
+def fake_clipboard(monkeypatch):
+    """Replaces the platform tools with an in-memory clipboard."""
+    board = {"text": "user's data", "writes": []}
+
+    def get(timeout_s=1.0):
+        return board["text"]
+
+    def put(text, timeout_s=1.0):
+        board["text"] = text
+        board["writes"].append(text)
+        return True
+
+    monkeypatch.setattr(clipboard, "get_clipboard_text", get)
+    monkeypatch.setattr(clipboard, "set_clipboard_text", put)
+    yield board
+    clipboard.restore_clipboard_now()
+
+
+@pytest.fixture
+def backend():
+    prev = mx.set_backend(NullBackend())
+    yield mx._backend
+    mx.set_backend(prev)
+
+
+def test_borrow_restores_the_user_clipboard(fake_clipboard):
+    assert clipboard.borrow_clipboard("macro text", restore_after_s=0.05)
+    assert fake_clipboard["text"] == "macro text"
+    time.sleep(0.2)
+    assert fake_clipboard["text"] == "user's data"
+
+
+def test_back_to_back_borrows_restore_the_original(fake_clipboard):
+    clipboard.borrow_clipboard("first", restore_after_s=0.1)
+    clipboard.borrow_clipboard("second", restore_after_s=0.1)
+    time.sleep(0.3)
+    assert fake_clipboard["text"] == "user's data"
+    assert fake_clipboard["writes"] == ["first", "second", "user's data"]
+
+
+def test_unreadable_clipboard_is_not_borrowed(fake_clipboard, monkeypatch):
+    monkeypatch.setattr(clipboard, "get_clipboard_text", lambda timeout_s=1.0: None)
+    assert not clipboard.borrow_clipboard("macro text")
+    assert fake_clipboard["writes"] == []
+
+
+def test_paste_plan_pastes_and_restores(fake_clipboard, backend, monkeypatch):
+    monkeypatch.setattr(mx, "TEXT_PASTE_RESTORE_S", 0.05)
+    plan = mx._compile_text("t", {"text": "x" * 10, "strategy": "paste"})
+    mx.run_plan(plan)
+    assert [op for op, _ in backend.ops] == ["press", "press", "release", "release"]
+    assert fake_clipboard["writes"] == ["x" * 10]
+    time.sleep(0.2)
+    assert fake_clipboard["text"] == "user's data"
+
+
+def test_paste_falls_back_to_typing(fake_clipboard, backend, monkeypatch):
+    monkeypatch.setattr(clipboard, "get_clipboard_text", lambda timeout_s=1.0: None)
+    plan = mx._compile_text("t", {"text": "hello", "strategy": "paste"})
+    mx.run_plan(plan)
+    assert backend.ops == [("type", "hello")]
+
+
+def _uinput_keys(fd):
+    """Key edges written to fd as ("+" / "-", KEY_NAME), SYN_REPORTs dropped."""
+    from evdev import ecodes
+    from src.utils.injection_backends import _INPUT_EVENT
+
+    data = os.read(fd, 1 << 16)
+    edges = []
+    for _sec, _usec, etype, code, value in _INPUT_EVENT.iter_unpack(data):
+        if etype == ecodes.EV_KEY:
+            edges.append(("+" if value else "-", ecodes.KEY[code]))
+    return edges
+
+
+def test_uinput_shift_only_for_shifted_chars():
+    pytest.importorskip("evdev")
+    from src.utils.injection_backends import UinputBackend
+
+    r, w = os.pipe()
+    try:
+        uinput = UinputBackend(fd=w)
+        uinput.type_text("hI!")
+        assert _uinput_keys(r) == [
+            ("+", "KEY_H"), ("-", "KEY_H"),
+            ("+", "KEY_LEFTSHIFT"), ("+", "KEY_I"), ("-", "KEY_I"), ("-", "KEY_LEFTSHIFT"),
+            ("+", "KEY_LEFTSHIFT"), ("+", "KEY_1"), ("-", "KEY_1"), ("-", "KEY_LEFTSHIFT"),
+        ]
+    finally:
+        os.close(r)
+        os.close(w)
+
+
+def test_uinput_untypable_text(fake_clipboard, monkeypatch):
+    pytest.importorskip("evdev")
+    from src.utils.injection_backends import UinputBackend
+
+    r, w = os.pipe()
+    try:
+        uinput = UinputBackend(fd=w)
+        assert uinput.can_type("Hello, World!")
+        assert not uinput.can_type("héllo")
+        uinput.type_text("héllo")  # skips the é instead of failing partway
+        assert uinput.writes == 1
+        assert _uinput_keys(r) == [
+            (edge, f"KEY_{c}") for c in "HLLO" for edge in "+-"
+        ]
+
+        # Through the executor, text the backend can't type is pasted
+        prev = mx.set_backend(uinput)
+        monkeypatch.setattr(mx, "TEXT_PASTE_RESTORE_S", 0.01)
+        try:
+            mx.run_plan(mx._compile_text("t", {"text": "naïve", "strategy": "type"}))
+        finally:
+            mx.set_backend(prev)
+        assert fake_clipboard["writes"][0] == "naïve"
+    finally:
+        os.close(r)
+        os.close(w)